@@ -0,0 +1,475 @@
+import argparse
+import contextlib
+import datetime
+import fnmatch
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+DEFAULT_OUTPUT_DIR = "Data/Benchmarks"
+MAX_CELLS = 1 << 24  # Найбільша кількість значень (кроки × сенсори) в одному випадку
+MIN_MEASURE_TIME = 0.2  # Мінімальний сумарний час вимірювань одного випадку (с)
+MAX_REPEATS = 20
+
+# Масштаби параметрів для профілів запуску
+PROFILES = {
+    "quick": {
+        "time_steps": [100, 10_000],
+        "sensors": [4, 16],
+        "event_count": [1, 100],
+        "format": [".csv", ".npy"],
+    },
+    "full": {
+        "time_steps": [100, 1_000, 10_000, 100_000, 1_000_000],
+        "sensors": [4, 16, 64, 256],
+        "event_count": [1, 100, 10_000],
+        "format": [".csv", ".parquet", ".npy"],
+    },
+}
+
+PIPELINE_LENGTH = 300_000
+WAVE_SPEED = 1000
+
+
+def _sensors(count):
+    """
+    Рівномірно розставляє сенсори вздовж трубопроводу.
+    """
+    return np.linspace(0, PIPELINE_LENGTH, count).astype(np.int64).tolist()
+
+
+def _normal_flow(time_steps, sensors, seed=0):
+    """
+    Генерує дані стабільного потоку для випадку бенчмарку.
+    """
+    from Pipeline import Pipeline
+    pipeline = Pipeline(PIPELINE_LENGTH, 1.02, _sensors(sensors), 34.0, 3.5)
+    pipeline.generate_normal_flow(time_steps, 0.01, seed=seed)
+    return pipeline.data
+
+
+def _simulator(data, sensors, logger):
+    """
+    Створює PressureWaveSimulator над копією даних.
+    """
+    from DataHandler import DataHandler
+    from PressureWaveSimulator import PressureWaveSimulator
+    handler = DataHandler()
+    handler.data = data.copy()
+    return PressureWaveSimulator(handler, _sensors(sensors), WAVE_SPEED, [PIPELINE_LENGTH // 2], logger)
+
+
+_case_loggers = []  # Логери поточного випадку; закриваються після його вимірювання
+
+
+def _silent_logger(workdir):
+    """
+    Створює логер без виводу на екран (бенчмарк вимірює обчислення, а не вивід).
+
+    Логер закривається після вимірювання випадку (див. _close_case_loggers).
+    """
+    from Logger import Logger
+    logger = Logger(os.path.join(workdir, "benchmark.log"), console=False)
+    _case_loggers.append(logger)
+    return logger
+
+
+def _close_case_loggers():
+    """
+    Закриває логери, створені під час налаштування випадку, та зупиняє їхні фонові потоки.
+    """
+    while _case_loggers:
+        _case_loggers.pop().close()
+
+
+# Кожна функція налаштування отримує параметри випадку і робочий каталог та повертає
+# (prepare, run): prepare (або None) викликається перед кожним вимірюванням поза таймером.
+
+def _setup_generate_normal_flow(params, workdir):
+    from Pipeline import Pipeline
+    pipeline = Pipeline(PIPELINE_LENGTH, 1.02, _sensors(params["sensors"]), 34.0, 3.5)
+    return None, lambda: pipeline.generate_normal_flow(params["time_steps"], 0.01, seed=0)
+
+
+def _setup_apply_long_term_failure(params, workdir):
+    data = _normal_flow(params["time_steps"], params["sensors"])
+    logger = _silent_logger(workdir)
+    state = {}
+
+    def prepare():
+        state["simulator"] = _simulator(data, params["sensors"], logger)
+
+    return prepare, lambda: state["simulator"].apply_long_term_failure(PIPELINE_LENGTH // 3, 0.1)
+
+
+def _setup_apply_pressure_wave(params, workdir):
+    data = _normal_flow(params["time_steps"], params["sensors"])
+    logger = _silent_logger(workdir)
+    positions = np.random.default_rng(0).uniform(0, PIPELINE_LENGTH, params["event_count"])
+    state = {}
+
+    def prepare():
+        state["simulator"] = _simulator(data, params["sensors"], logger)
+
+    def run():
+        for position in positions:
+            state["simulator"].apply_pressure_wave(position, 1.0)
+
+    return prepare, run
+
+
+def _setup_apply_pressure_waves(params, workdir):
+    data = _normal_flow(params["time_steps"], params["sensors"])
+    logger = _silent_logger(workdir)
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(0, PIPELINE_LENGTH, params["event_count"])
+    start_times = rng.uniform(0, params["time_steps"], params["event_count"])
+    state = {}
+
+    def prepare():
+        state["simulator"] = _simulator(data, params["sensors"], logger)
+
+    return prepare, lambda: state["simulator"].apply_pressure_waves(positions, 1.0, start_times=start_times)
+
+
+def _setup_load_data(params, workdir):
+    from DataHandler import DataHandler, write_frame
+    path = os.path.join(workdir, f"load_data{params['format']}")
+    write_frame(_normal_flow(params["time_steps"], params["sensors"]), path)
+    handler = DataHandler()
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            handler.load_data(path)
+
+    return None, run
+
+
+def _setup_logger_log(params, workdir):
+    logger = _silent_logger(workdir)
+    count = params["time_steps"]
+
+    def run():
+        for step in range(count):
+            logger.log("Сплеск тиску досягає сенсора на кроці %d.", step)
+        logger.flush()
+
+    return None, run
+
+
+def _labelled_data(time_steps, sensors):
+    """
+    Генерує дані з мітками для навчання та перевірки моделі.
+    """
+    data = _normal_flow(time_steps, sensors)
+    labels = (np.arange(time_steps) >= time_steps // 2).astype(np.int64)
+    pressure = [column for column in data.columns if column.startswith("Pressure_")]
+    data[pressure] = data[pressure].to_numpy() - 0.1 * labels[:, None]
+    data.insert(1, "Anomaly", labels)
+    return data
+
+
+def _train_model(workdir, sensors):
+    """
+    Навчає невелику модель на синтетичних даних і зберігає її у робочий каталог.
+    """
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+    from CompiledForest import export_forest
+
+    path = os.path.join(workdir, f"model_{sensors}.pkl")
+    if not os.path.exists(path):
+        data = _labelled_data(2_000, sensors)
+        model = RandomForestClassifier(n_estimators=20, random_state=0)
+        model.fit(data.drop(columns=["Anomaly", "Time"]), data["Anomaly"])
+        joblib.dump(model, path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            export_forest(model, os.path.splitext(path)[0] + "_compiled")
+    return path
+
+
+def _setup_check_data(params, workdir):
+    from check_anomalies import AnomalyChecker
+    from DataHandler import write_frame
+    checker = AnomalyChecker(_train_model(workdir, params["sensors"]))
+    path = os.path.join(workdir, "check_data.npy")
+    write_frame(_labelled_data(params["time_steps"], params["sensors"]), path)
+    return None, lambda: checker.check_data(path, evaluate=False, plot=False)
+
+
+def _setup_cascade_check(params, workdir):
+    from CascadeDetector import CascadeChecker, ChangeDetector
+    from DataHandler import write_frame
+    # Стабільний потік з аварією в останньому відсотку рядків (типовий трафік для каскаду)
+    data = _normal_flow(params["time_steps"], params["sensors"])
+    labels = (np.arange(params["time_steps"]) >= params["time_steps"] * 99 // 100).astype(np.int64)
+    pressure = [column for column in data.columns if column.startswith("Pressure_")]
+    data[pressure] = data[pressure].to_numpy() - 0.1 * labels[:, None]
+    data.insert(1, "Anomaly", labels)
+
+    detector = ChangeDetector.from_columns(data.columns)
+    detector.fit(_normal_flow(2_000, params["sensors"], seed=1)[detector.columns].to_numpy())
+    checker = CascadeChecker(_train_model(workdir, params["sensors"]), detector=detector)
+    path = os.path.join(workdir, "cascade_check.npy")
+    write_frame(data, path)
+    return None, lambda: checker.check_data(path, evaluate=False, plot=False)
+
+
+def _setup_stream_score(params, workdir):
+    from check_anomalies import AnomalyChecker
+    path = os.path.splitext(_train_model(workdir, params["sensors"]))[0] + "_compiled"
+    scorer = AnomalyChecker(path).scorer()
+    rows = _labelled_data(params["time_steps"], params["sensors"])[scorer.columns].to_numpy()
+
+    def run():
+        for row in rows:
+            scorer.score(row)
+
+    return None, run
+
+
+def _setup_feature_transform(params, workdir):
+    from FeatureEngine import FeatureEngine
+    data = _normal_flow(params["time_steps"], params["sensors"])
+    feature_engine = FeatureEngine.from_frame(data)
+    return None, lambda: feature_engine.transform(data)
+
+
+def _setup_leak_localize(params, workdir):
+    from LeakLocalizer import LeakLocalizer
+    data = _normal_flow(params["time_steps"], params["sensors"])
+    localizer = LeakLocalizer(_sensors(params["sensors"]), WAVE_SPEED, pump_positions=[PIPELINE_LENGTH // 2])
+    window = min(params["time_steps"] - 1, 4096)
+    return None, lambda: localizer.localize(data, window=window)
+
+
+# Назва випадку → (осі параметрів, функція налаштування, допустимий діапазон кількості кроків)
+BENCHMARKS = {
+    "generate_normal_flow": (("time_steps", "sensors"), _setup_generate_normal_flow, (None, None)),
+    "apply_long_term_failure": (("time_steps", "sensors"), _setup_apply_long_term_failure, (None, None)),
+    # Початковий поподієвий алгоритм із .loc: обмежено невеликими масштабами
+    "apply_pressure_wave": (("time_steps", "sensors", "event_count"), _setup_apply_pressure_wave, (None, 10_000)),
+    "apply_pressure_waves": (("time_steps", "sensors", "event_count"), _setup_apply_pressure_waves, (None, None)),
+    "load_data": (("time_steps", "sensors", "format"), _setup_load_data, (None, None)),
+    "logger_log": (("time_steps",), _setup_logger_log, (None, None)),
+    "check_data": (("time_steps", "sensors"), _setup_check_data, (None, None)),
+    "cascade_check": (("time_steps", "sensors"), _setup_cascade_check, (None, None)),
+    "stream_score": (("time_steps", "sensors"), _setup_stream_score, (None, 10_000)),
+    "feature_transform": (("time_steps", "sensors"), _setup_feature_transform, (None, None)),
+    # Вікно кореляції має бути довшим за затримку між сусідніми сенсорами (до 100 кроків)
+    "leak_localize": (("time_steps", "sensors"), _setup_leak_localize, (1_000, None)),
+}
+
+
+def case_id(name, params):
+    """
+    Будує ідентифікатор випадку, наприклад "load_data[time_steps=100,sensors=4,format=.csv]".
+    """
+    return f"{name}[" + ",".join(f"{key}={value}" for key, value in params.items()) + "]"
+
+
+def iter_cases(profile="quick", pattern="*"):
+    """
+    Перелічує випадки бенчмарку для профілю.
+
+    Parameters:
+    - profile (str): Назва профілю з PROFILES.
+    - pattern (str): Шаблон ідентифікаторів випадків (fnmatch).
+
+    Yields:
+    tuple: (name, params).
+    """
+    scales = PROFILES[profile]
+    for name, (axes, _, (min_time_steps, max_time_steps)) in BENCHMARKS.items():
+        for values in itertools.product(*(scales[axis] for axis in axes)):
+            params = dict(zip(axes, values))
+            time_steps, sensors = params.get("time_steps", 1), params.get("sensors", 1)
+            if time_steps * sensors > MAX_CELLS or (max_time_steps and time_steps > max_time_steps) \
+                    or (min_time_steps and time_steps < min_time_steps):
+                continue
+            if params.get("format") == ".parquet" and not _has_pyarrow():
+                continue
+            if fnmatch.fnmatchcase(case_id(name, params), pattern):
+                yield name, params
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def measure(prepare, run):
+    """
+    Вимірює час виконання і пікове виділення пам'яті.
+
+    Час вимірюється без tracemalloc (він сповільнює виконання); пікова пам'ять —
+    окремим запуском під tracemalloc (враховує і буфери NumPy).
+
+    Returns:
+    dict: wall_min, wall_median (с), repeats і peak_bytes.
+    """
+    timings = []
+    while len(timings) < MAX_REPEATS and (len(timings) < 3 or sum(timings) < MIN_MEASURE_TIME):
+        if prepare is not None:
+            prepare()
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+        if timings[0] > MIN_MEASURE_TIME * 5:
+            break  # Довгий випадок вимірюється один раз
+
+    if prepare is not None:
+        prepare()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {"wall_min": min(timings), "wall_median": statistics.median(timings),
+            "repeats": len(timings), "peak_bytes": peak}
+
+
+def git_commit():
+    """
+    Повертає хеш поточного коміту та ознаку незакомічених змін.
+    """
+    repository = os.path.dirname(os.path.abspath(__file__))  # Коміт коду бенчмарку, а не поточного каталогу
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                                cwd=repository).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                capture_output=True, text=True, check=True, cwd=repository).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def run_benchmarks(profile="quick", pattern="*", output_dir=DEFAULT_OUTPUT_DIR):
+    """
+    Виконує бенчмарки і зберігає результати у JSON-файл із назвою коміту.
+
+    Parameters:
+    - profile (str): Назва профілю з PROFILES.
+    - pattern (str): Шаблон ідентифікаторів випадків (fnmatch).
+    - output_dir (str): Каталог для файлів результатів.
+
+    Returns:
+    str: Шлях до файлу результатів.
+    """
+    commit, dirty = git_commit()
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, params in iter_cases(profile, pattern):
+            identifier = case_id(name, params)
+            try:
+                prepare, run = BENCHMARKS[name][1](params, workdir)
+                results[identifier] = {"name": name, "params": params, **measure(prepare, run)}
+            finally:
+                _close_case_loggers()
+            result = results[identifier]
+            print(f"{identifier:<70} {result['wall_min'] * 1000:>12.3f} мс {result['peak_bytes'] / 2**20:>10.1f} МБ")
+
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "profile": profile,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.processor(), "cpu_count": os.cpu_count(), "numpy": np.__version__},
+        "results": results,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{commit[:12]}{'-dirty' if dirty else ''}-{profile}.json")
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Результати збережено у файл: {path}")
+    return path
+
+
+def _resolve_report(reference, output_dir):
+    """
+    Знаходить файл результатів за шляхом або префіксом коміту.
+    """
+    if os.path.exists(reference):
+        return reference
+    matches = sorted(name for name in os.listdir(output_dir) if name.startswith(reference) and name.endswith(".json"))
+    if len(matches) != 1:
+        raise ValueError(f"Не вдалося однозначно знайти результати для '{reference}': {matches}")
+    return os.path.join(output_dir, matches[0])
+
+
+def compare(base, head, threshold=0.1, output_dir=DEFAULT_OUTPUT_DIR):
+    """
+    Порівнює два запуски бенчмарків і виводить випадки, що сповільнилися або
+    потребують більше пам'яті більш ніж на threshold.
+
+    Parameters:
+    - base (str): Файл результатів або префікс коміту базового запуску.
+    - head (str): Файл результатів або префікс коміту нового запуску.
+    - threshold (float): Допустиме відносне погіршення (0.1 — 10%).
+    - output_dir (str): Каталог із файлами результатів.
+
+    Returns:
+    list: Ідентифікатори випадків із регресіями.
+    """
+    with open(_resolve_report(base, output_dir), encoding="utf-8") as file:
+        base_results = json.load(file)["results"]
+    with open(_resolve_report(head, output_dir), encoding="utf-8") as file:
+        head_results = json.load(file)["results"]
+
+    regressions = []
+    for identifier in sorted(set(base_results) & set(head_results)):
+        old, new = base_results[identifier], head_results[identifier]
+        time_ratio = new["wall_min"] / old["wall_min"] if old["wall_min"] else 1.0
+        memory_ratio = new["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] else 1.0
+        regressed = time_ratio > 1 + threshold or memory_ratio > 1 + threshold
+        if regressed:
+            regressions.append(identifier)
+        print(f"{identifier:<70} час ×{time_ratio:>6.2f} пам'ять ×{memory_ratio:>6.2f}{'  РЕГРЕСІЯ' if regressed else ''}")
+
+    print(f"Порівняно {len(set(base_results) & set(head_results))} випадків, регресій: {len(regressions)}.")
+    return regressions
+
+
+def main(argv=None):
+    """
+    Точка входу командного рядка: run — виконати бенчмарки, compare — порівняти два запуски.
+    """
+    parser = argparse.ArgumentParser(description="Бенчмарки симуляції, вводу-виводу та виявлення аномалій.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Виконати бенчмарки.")
+    run_parser.add_argument("--profile", default="quick", choices=sorted(PROFILES), help="Профіль масштабів.")
+    run_parser.add_argument("--filter", default="*", help="Шаблон ідентифікаторів випадків.")
+    run_parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Каталог для результатів.")
+
+    compare_parser = subparsers.add_parser("compare", help="Порівняти два запуски.")
+    compare_parser.add_argument("base", help="Файл або префікс коміту базового запуску.")
+    compare_parser.add_argument("head", help="Файл або префікс коміту нового запуску.")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Допустиме погіршення (частка).")
+    compare_parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Каталог із результатами.")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run_benchmarks(args.profile, args.filter, args.output_dir)
+        return 0
+    return 1 if compare(args.base, args.head, args.threshold, args.output_dir) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,508 @@
+import collections
+import json
+import os
+import time
+
+import numpy as np
+
+from check_anomalies import LATENCY_WINDOW, AnomalyChecker
+from DataHandler import read_frame
+from FeatureEngine import SIGNAL_PREFIXES
+from Metrics import METRICS, STAGE_SECONDS
+
+# Пороги вищі за класичні (k = 0.5, h = 5, L = 3): аварії зміщують тиск на десятки
+# стандартних відхилень шуму, а хибні сигнали на стабільному потоці мають бути рідкісними
+CUSUM_DRIFT = 1.0  # Допустиме зміщення k для CUSUM (у стандартних відхиленнях)
+CUSUM_THRESHOLD = 8.0  # Поріг h для CUSUM (у стандартних відхиленнях)
+CUSUM_CAP = 16.0  # Верхня межа CUSUM: після аварії сигнал згасає за (межа - поріг) / k кроків
+EWMA_LAMBDA = 0.2  # Коефіцієнт згладжування EWMA
+EWMA_LIMIT = 4.0  # Межа EWMA у стандартних відхиленнях згладженого ряду
+HOLD_STEPS = 20  # Скільки кроків після сигналу рядки ще передаються моделі
+BLOCK_ROWS = 8192  # Кількість рядків, для яких CUSUM обчислюється одним векторним кроком
+CALIBRATION_ROWS = 50  # Початкові рядки для калібрування, якщо збереженої конфігурації немає
+MIN_STD = 1e-9  # Нижня межа стандартного відхилення (для рядів без шуму)
+
+
+def cascade_config_path(model_path):
+    """
+    Повертає шлях до файлу конфігурації детектора змін, що зберігається поруч із моделлю.
+
+    Parameters:
+    - model_path (str): Шлях до моделі (.pkl) або каталогу скомпільованої моделі.
+
+    Returns:
+    str: Шлях до файлу .cascade.json.
+    """
+    if os.path.isdir(model_path):
+        return os.path.join(model_path, "cascade.json")
+    return os.path.splitext(model_path)[0] + ".cascade.json"
+
+
+def _cusum(sums, initial, cap):
+    """
+    Обчислює половину CUSUM S_t = min(cap, max(0, S_{t-1} + a_t)) для блоку без циклу за рядками.
+
+    Поки межа не досягається (стабільний потік), обмежений CUSUM збігається з розв'язком
+    рекурсії Ліндлі S_t = C_t - min(-S_0, min_{s<=t} C_s), де C — кумулятивна сума приростів.
+    Інакше кожен крок — функція x -> clip(x + a_t, 0, cap), а композиція таких функцій має
+    той самий вигляд clip(x + b, lo, hi). Тому префіксні композиції після першого
+    перевищення межі обчислюються паралельним скануванням (Гілліс—Стіл) за log2(рядки)
+    векторних проходів.
+
+    Parameters:
+    - sums (np.ndarray): Кумулятивні суми приростів C_t (ряди × рядки, рядки суцільні в пам'яті).
+    - initial (np.ndarray): Значення S_0 для кожного ряду.
+    - cap (float): Верхня межа S_t.
+
+    Returns:
+    np.ndarray: Значення S_t (ряди × рядки).
+    """
+    lowest = np.minimum.accumulate(sums, axis=1)
+    np.minimum(lowest, -initial[:, np.newaxis], out=lowest)
+    unbounded = np.subtract(sums, lowest, out=lowest)
+    if unbounded.max(initial=0.0) <= cap:
+        return unbounded
+
+    # До першого рядка, де межа перевищується, розв'язок Ліндлі точний; сканування — лише далі
+    first = int(np.argmax((unbounded > cap).any(axis=0)))
+    start = unbounded[:, first - 1:first].copy() if first else initial[:, np.newaxis]
+    shift = np.diff(sums, axis=1, prepend=0.0)[:, first:]
+    low = np.zeros_like(shift)
+    high = np.full_like(shift, cap)
+    step = 1
+    while step < shift.shape[1]:
+        # Композиція з функцією на step рядків раніше: спочатку раніша, потім поточна
+        later_low, later_high = low[:, step:], high[:, step:]
+        combined = (shift[:, :-step] + shift[:, step:],
+                    np.clip(low[:, :-step] + shift[:, step:], later_low, later_high),
+                    np.clip(high[:, :-step] + shift[:, step:], later_low, later_high))
+        shift[:, step:], low[:, step:], high[:, step:] = combined
+        step *= 2
+    unbounded[:, first:] = np.clip(start + shift, low, high)
+    return unbounded
+
+
+class ChangeDetector:
+    """
+    Клас для дешевого виявлення змін у рядах сенсорів: двобічний CUSUM і контрольна карта EWMA.
+
+    Ряди нормуються середнім і стандартним відхиленням стабільного потоку (fit).
+    Усі ряди (тиск і витрата кожного сенсора) оновлюються разом без циклу за рядками:
+    EWMA — рекурсивним фільтром по всьому масиву, CUSUM (обмежений зверху cusum_cap,
+    щоб сигнал згасав невдовзі після аварії) — кумулятивними сумами блоками по
+    BLOCK_ROWS рядків, а паралельним скануванням лише в блоках, де досягається межа.
+    Стан зберігається між викликами update, тож потоковий і пакетний режими дають
+    однакові сигнали. Після сигналу рядки ще hold кроків вважаються підозрілими (route).
+    """
+    def __init__(self, columns, mean=None, std=None, count=0, cusum_drift=CUSUM_DRIFT,
+                 cusum_threshold=CUSUM_THRESHOLD, cusum_cap=CUSUM_CAP, ewma_lambda=EWMA_LAMBDA,
+                 ewma_limit=EWMA_LIMIT, hold=HOLD_STEPS):
+        """
+        Ініціалізує об'єкт ChangeDetector.
+
+        Parameters:
+        - columns (list): Стовпці сенсорів (Pressure_*, FlowRate_*) у порядку вхідних рядків.
+        - mean (list): Середні стабільного потоку; None — детектор ще не калібровано.
+        - std (list): Стандартні відхилення стабільного потоку.
+        - count (int): Кількість рядків, за якими обчислено mean і std.
+        - cusum_drift (float): Допустиме зміщення k (у стандартних відхиленнях).
+        - cusum_threshold (float): Поріг h (у стандартних відхиленнях).
+        - cusum_cap (float): Верхня межа CUSUM (не менша за поріг).
+        - ewma_lambda (float): Коефіцієнт згладжування EWMA (0 < lambda <= 1).
+        - ewma_limit (float): Межа EWMA у стандартних відхиленнях згладженого ряду.
+        - hold (int): Скільки кроків після сигналу рядки передаються моделі (не менше 1).
+        """
+        if not 0 < ewma_lambda <= 1:
+            raise ValueError("Коефіцієнт згладжування EWMA має лежати в межах (0, 1].")
+        if cusum_cap < cusum_threshold:
+            raise ValueError("Верхня межа CUSUM має бути не меншою за поріг.")
+        if hold < 1:
+            raise ValueError("Тривалість утримання сигналу має бути не меншою за 1.")
+
+        self.columns = list(columns)
+        self.cusum_drift = float(cusum_drift)
+        self.cusum_threshold = float(cusum_threshold)
+        self.cusum_cap = float(cusum_cap)
+        self.ewma_lambda = float(ewma_lambda)
+        self.ewma_limit = float(ewma_limit)
+        self.hold = int(hold)
+        self.count = int(count)
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float64)
+        self._m2 = None if std is None else np.asarray(std, dtype=np.float64) ** 2 * self.count
+
+        self._decay = 1.0 - self.ewma_lambda
+        self._ewma_bound = self.ewma_limit * np.sqrt(self.ewma_lambda / (2 - self.ewma_lambda))
+
+        self.reset()
+
+    @classmethod
+    def from_columns(cls, columns, **kwargs):
+        """
+        Створює ChangeDetector для стовпців сенсорів із переліку (інші стовпці пропускаються).
+        """
+        return cls([column for column in columns if str(column).startswith(SIGNAL_PREFIXES)], **kwargs)
+
+    @property
+    def std(self):
+        """
+        Стандартні відхилення стабільного потоку (не менші за MIN_STD).
+        """
+        if self._m2 is None:
+            return None
+        return np.maximum(np.sqrt(self._m2 / max(self.count, 1)), MIN_STD)
+
+    @property
+    def fitted(self):
+        return self.mean is not None and self.count > 0
+
+    def reset(self):
+        """
+        Скидає стан CUSUM, EWMA та утримання сигналу (наступний рядок вважається першим).
+        """
+        self._high = np.zeros(len(self.columns))
+        self._low = np.zeros(len(self.columns))
+        self._ewma = np.zeros(len(self.columns))
+        self._remaining = 0  # Скільки ще рядків передається моделі після останнього сигналу
+
+    def partial_fit(self, values):
+        """
+        Уточнює середні та стандартні відхилення стабільного потоку за новими рядками.
+
+        Частини поєднуються за формулою Чана, тож калібрування можна виконувати
+        частинами (наприклад, по шардах навчальних даних).
+
+        Parameters:
+        - values (np.ndarray): Рядки стабільного потоку × self.columns.
+
+        Returns:
+        ChangeDetector: Цей самий об'єкт.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return self
+        count = len(values)
+        mean = values.mean(axis=0)
+        m2 = ((values - mean) ** 2).sum(axis=0)
+        if not self.fitted:
+            self.mean, self._m2, self.count = mean, m2, count
+            return self
+        total = self.count + count
+        delta = mean - self.mean
+        self._m2 = self._m2 + m2 + delta * delta * self.count * count / total
+        self.mean = self.mean + delta * count / total
+        self.count = total
+        return self
+
+    def fit(self, values):
+        """
+        Калібрує детектор заново за рядками стабільного потоку.
+        """
+        self.mean, self._m2, self.count = None, None, 0
+        self.reset()
+        return self.partial_fit(values)
+
+    def update(self, values):
+        """
+        Додає рядки до стану детектора і повертає сигнали для кожного ряду.
+
+        Parameters:
+        - values (np.ndarray): Рядки × self.columns.
+
+        Returns:
+        np.ndarray: Маска сигналів (рядки × ряди): CUSUM вище порогу або EWMA поза межами.
+        """
+        if not self.fitted:
+            raise ValueError("Детектор змін не калібровано: викличте fit на даних стабільного потоку.")
+        # Обчислення ведуться в розкладці ряди × рядки: накопичувальні операції вздовж
+        # суцільних у пам'яті рядків значно швидші (DataFrame.to_numpy уже дає таку розкладку)
+        values = np.asarray(values)
+        scores = np.subtract(values.T, self.mean[:, np.newaxis], dtype=np.float64, order="C")
+        scores /= self.std[:, np.newaxis]
+        rows = scores.shape[1]
+        if rows == 0:
+            return np.zeros(values.shape, dtype=bool)
+
+        # EWMA e_t = lambda z_t + (1 - lambda) e_{t-1} одним рекурсивним фільтром по всіх рядках
+        # (scipy.signal імпортується лише тут, щоб не сповільнювати запуск cli)
+        from scipy.signal import lfilter
+
+        ewma, state = lfilter([self.ewma_lambda], [1.0, -self._decay], scores, axis=1,
+                              zi=(self._decay * self._ewma)[:, np.newaxis])
+        self._ewma = state[:, 0]
+        flags = np.abs(ewma, out=ewma) > self._ewma_bound
+
+        # Кумулятивні суми приростів обох половин CUSUM: Z_t - k t (зростання) і -Z_t - k t (падіння)
+        trend = self.cusum_drift * np.arange(1, min(rows, BLOCK_ROWS) + 1)
+        for start in range(0, rows, BLOCK_ROWS):
+            sums = np.cumsum(scores[:, start:start + BLOCK_ROWS], axis=1)
+            drift = trend[:sums.shape[1]]
+            high = _cusum(sums - drift, self._high, self.cusum_cap)
+            np.negative(sums, out=sums)
+            low = _cusum(np.subtract(sums, drift, out=sums), self._low, self.cusum_cap)
+            self._high, self._low = high[:, -1].copy(), low[:, -1].copy()
+            block = flags[:, start:start + sums.shape[1]]
+            block |= high > self.cusum_threshold
+            block |= low > self.cusum_threshold
+        return flags.T
+
+    def route(self, flags):
+        """
+        Визначає рядки, що передаються моделі: рядок із сигналом і hold - 1 наступних рядків.
+
+        Parameters:
+        - flags (np.ndarray): Сигнали рядків (одновимірна маска) або рядків × рядів.
+
+        Returns:
+        np.ndarray: Маска рядків для моделі.
+        """
+        flags = np.asarray(flags, dtype=bool)
+        if flags.ndim == 2:
+            flags = flags.any(axis=1)
+        steps = np.arange(len(flags))
+        last = np.maximum.accumulate(np.where(flags, steps, -1)) if len(flags) else steps
+        routed = ((last >= 0) & (steps - last < self.hold)) | (steps < self._remaining)
+        if flags.any():
+            self._remaining = max(0, self.hold - (len(flags) - int(last[-1])))
+        else:
+            self._remaining = max(0, self._remaining - len(flags))
+        return routed
+
+    def to_dict(self):
+        """
+        Повертає конфігурацію та калібрування детектора для збереження.
+        """
+        return {
+            "columns": self.columns,
+            "mean": None if self.mean is None else self.mean.tolist(),
+            "std": None if self._m2 is None else np.sqrt(self._m2 / max(self.count, 1)).tolist(),
+            "count": self.count,
+            "cusum_drift": self.cusum_drift,
+            "cusum_threshold": self.cusum_threshold,
+            "cusum_cap": self.cusum_cap,
+            "ewma_lambda": self.ewma_lambda,
+            "ewma_limit": self.ewma_limit,
+            "hold": self.hold,
+        }
+
+    def copy(self):
+        """
+        Повертає детектор із тим самим калібруванням і початковим станом.
+        """
+        return ChangeDetector(**self.to_dict())
+
+    def save(self, path):
+        """
+        Зберігає конфігурацію детектора у JSON-файл.
+
+        Parameters:
+        - path (str): Шлях до файлу (див. cascade_config_path).
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
+        print(f"Конфігурацію детектора змін збережено у файл: {path}")
+
+    @classmethod
+    def load(cls, path):
+        """
+        Завантажує конфігурацію детектора з JSON-файлу.
+        """
+        with open(path, encoding="utf-8") as file:
+            return cls(**json.load(file))
+
+
+class CascadeScorer:
+    """
+    Клас для потокової каскадної оцінки: детектор змін для кожного рядка, модель — лише для підозрілих рядків.
+
+    Інтерфейс (score, latency_stats, columns) той самий, що в StreamingScorer, тому
+    каскад можна передати TelemetryServer чи циклу Coordinator замість звичайного оцінювача.
+    Часові ознаки оновлюються для всіх рядків, щоб стан FeatureEngine не залежав від маршрутизації.
+    """
+    def __init__(self, scorer, detector):
+        """
+        Ініціалізує об'єкт CascadeScorer.
+
+        Parameters:
+        - scorer (StreamingScorer): Оцінювач моделі.
+        - detector (ChangeDetector): Калібрований детектор змін (стан копіюється).
+        """
+        self.scorer = scorer
+        self.detector = detector.copy()
+        self.columns = scorer.columns
+        self.classes = scorer.classes
+
+        positions = {name: i for i, name in enumerate(scorer.input_names)}
+        missing = [column for column in self.detector.columns if column not in positions]
+        if missing:
+            raise ValueError(f"Стовпці детектора змін {missing} відсутні серед вхідних стовпців моделі.")
+        self._signal_indices = np.array([positions[column] for column in self.detector.columns], dtype=np.int64)
+        normal = np.flatnonzero(self.classes == 0)
+        self._normal_index = int(normal[0]) if len(normal) else 0
+
+        self.rows = 0
+        self.routed_rows = 0
+        self.model_calls = 0
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+
+    def score(self, rows):
+        """
+        Оцінює рядок або мікропакет даних.
+
+        Рядки без сигналу детектора отримують нормальний клас з імовірністю 1.
+
+        Parameters:
+        - rows: Масив форми (стовпці,) чи (рядки, стовпці), словник або список словників.
+
+        Returns:
+        tuple: (predictions, probabilities) — прогнозовані класи та ймовірності класів.
+        """
+        started = time.perf_counter()
+        inputs, features = self.scorer.features(rows)
+        routed = self.detector.route(self.detector.update(inputs[:, self._signal_indices]))
+
+        probabilities = np.zeros((len(inputs), len(self.classes)))
+        probabilities[:, self._normal_index] = 1.0
+        if routed.any():
+            _, probabilities[routed] = self.scorer.predict(features[routed])
+            self.model_calls += 1
+        predictions = self.classes.take(np.argmax(probabilities, axis=1))
+
+        self.rows += len(inputs)
+        self.routed_rows += int(routed.sum())
+        elapsed = time.perf_counter() - started
+        self._latencies.append(elapsed)
+        METRICS.observe(STAGE_SECONDS, elapsed, stage="cascade.score")
+        METRICS.add_rows("cascade.score", len(inputs))
+        METRICS.count("cascade_routed_rows_total", int(routed.sum()))
+        return predictions, probabilities
+
+    def latency_stats(self):
+        """
+        Повертає статистику затримки та частку рядків, переданих моделі.
+
+        Returns:
+        dict: Кількість викликів, перцентилі p50/p99 у мілісекундах, рядки та виклики моделі.
+        """
+        stats = {"calls": len(self._latencies), "p50_ms": None, "p99_ms": None}
+        if self._latencies:
+            p50, p99 = np.percentile(np.fromiter(self._latencies, dtype=float), [50, 99]) * 1000
+            stats.update(p50_ms=float(p50), p99_ms=float(p99))
+        stats.update(rows=self.rows, routed_rows=self.routed_rows, model_calls=self.model_calls)
+        return stats
+
+
+class CascadeChecker(AnomalyChecker):
+    """
+    Клас для каскадної перевірки даних: детектор змін відбирає підозрілі рядки, модель оцінює лише їх.
+
+    Калібрування детектора зберігається поруч із моделлю під час навчання
+    (див. cascade_config_path). Без нього детектор калібрується для кожної перевірки
+    окремо за першими CALIBRATION_ROWS рядками її даних, які мають бути стабільним потоком.
+    """
+    def __init__(self, model_path, detector=None):
+        """
+        Ініціалізує об'єкт CascadeChecker.
+
+        Parameters:
+        - model_path (str): Шлях до збереженої моделі (.pkl) або каталогу скомпільованої моделі.
+        - detector (ChangeDetector): Детектор змін; за замовчуванням завантажується з cascade_config_path.
+        """
+        super().__init__(model_path)
+        config_path = cascade_config_path(model_path)
+        if detector is None and os.path.exists(config_path):
+            detector = ChangeDetector.load(config_path)
+        self.detector = detector
+        self.rows = 0
+        self.routed_rows = 0
+
+    def _detector_for(self, data):
+        """
+        Повертає детектор для даних.
+
+        Без збереженої конфігурації детектор калібрується за початковими рядками саме цих
+        даних і не запам'ятовується: калібрування одного файлу не переноситься на інші.
+        """
+        if self.detector is not None:
+            return self.detector
+        print(f"Конфігурацію детектора змін не знайдено: калібрування за першими {CALIBRATION_ROWS} рядками даних.")
+        columns = self.feature_engine.columns if self.feature_engine is not None else self.expected_features
+        detector = ChangeDetector.from_columns(columns)
+        return detector.fit(data.reindex(columns=detector.columns, fill_value=0).to_numpy(dtype=float)[:CALIBRATION_ROWS])
+
+    def scorer(self, columns=None):
+        """
+        Створює потоковий каскадний оцінювач із власним станом часових ознак і детектора.
+
+        Returns:
+        CascadeScorer: Оцінювач рядків і мікропакетів.
+        """
+        if self.detector is None:
+            raise ValueError(f"Потоковий каскад потребує калібрування детектора змін "
+                             f"(файл {cascade_config_path(self.model_path)}).")
+        return CascadeScorer(super().scorer(columns=columns), self.detector)
+
+    def route(self, data):
+        """
+        Визначає рядки даних, що передаються моделі.
+
+        Parameters:
+        - data (pd.DataFrame): Дані зі стовпцями сенсорів.
+
+        Returns:
+        np.ndarray: Маска рядків для моделі.
+        """
+        detector = self._detector_for(data).copy()
+        values = data.reindex(columns=detector.columns, fill_value=0).to_numpy(dtype=float)
+        return detector.route(detector.update(values))
+
+    @METRICS.timed("cascade.check_data", rows=len)
+    def check_data(self, data_path, evaluate=True, plot=True):
+        """
+        Перевіряє дані на наявність аномалій каскадом.
+
+        З evaluate модель окремо оцінює також усі рядки, і повнота каскаду
+        порівнюється з повнотою самої моделі.
+
+        Parameters:
+        - data_path (str): Шлях до файлу з даними (.csv, .parquet або .npy).
+        - evaluate (bool): Чи порівнювати прогнози зі стовпцем 'Anomaly' і виводити звіт.
+        - plot (bool): Чи будувати матрицю плутанини (лише разом з evaluate).
+
+        Returns:
+        np.ndarray: Прогнози каскаду для кожного рядка.
+        """
+        data = read_frame(data_path)
+        if evaluate and "Anomaly" not in data.columns:
+            raise ValueError("Стовпець 'Anomaly' відсутній у даних. Перевірте структуру файлу.")
+
+        routed = self.route(data)
+        features = self.features(data)
+        classes = np.asarray(self.model.classes_)
+        predictions = np.full(len(data), 0 if (classes == 0).any() else classes[0], dtype=classes.dtype)
+        if routed.any():
+            predictions[routed] = self.model.predict(features[routed])
+
+        self.rows += len(data)
+        self.routed_rows += int(routed.sum())
+        METRICS.count("cascade_routed_rows_total", int(routed.sum()))
+
+        if evaluate:
+            self.compare(data["Anomaly"].to_numpy(), predictions, self.model.predict(features))
+            self.evaluate(data["Anomaly"], predictions, plot=plot)
+        return predictions
+
+    @staticmethod
+    def compare(true_labels, cascade_predictions, model_predictions):
+        """
+        Порівнює повноту (recall) каскаду і самої моделі на аномальних рядках.
+
+        Returns:
+        dict: Кількість аномальних рядків, повнота каскаду і моделі.
+        """
+        anomalies = np.asarray(true_labels) == 1
+        count = int(anomalies.sum())
+        cascade_recall = float((np.asarray(cascade_predictions)[anomalies] == 1).mean()) if count else None
+        model_recall = float((np.asarray(model_predictions)[anomalies] == 1).mean()) if count else None
+        if count:
+            print(f"Повнота: каскад {cascade_recall:.4f}, лише модель {model_recall:.4f} ({count} аномальних рядків).")
+        return {"anomaly_rows": count, "cascade_recall": cascade_recall, "model_recall": model_recall}
@@ -0,0 +1,182 @@
+import json
+import os
+
+import numpy as np
+
+ARRAYS = ("feature", "threshold", "left", "right", "missing_left", "value", "roots")  # Файли масивів артефакту
+
+
+def export_forest(model, path):
+    """
+    Експортує навчений RandomForestClassifier у каталог із суцільними масивами вузлів.
+
+    Вузли всіх дерев об'єднуються в спільні масиви (ознака, поріг, дочірні вузли,
+    ймовірності класів у листках). Листки посилаються самі на себе, тож обхід
+    можна виконувати фіксовану кількість кроків, що дорівнює найбільшій глибині дерева.
+
+    Parameters:
+    - model (RandomForestClassifier): Навчена модель з одним виходом.
+    - path (str): Каталог для збереження артефакту.
+    """
+    if getattr(model, "n_outputs_", 1) != 1:
+        raise ValueError("Експорт підтримує лише моделі з одним виходом.")
+
+    features, thresholds, lefts, rights, missing_lefts, values, roots = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        node_count = tree.node_count
+        nodes = np.arange(node_count) + offset
+        is_leaf = tree.children_left == -1
+
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(np.where(is_leaf, nodes, tree.children_left + offset))
+        rights.append(np.where(is_leaf, nodes, tree.children_right + offset))
+        missing_left = getattr(tree, "missing_go_to_left", np.zeros(node_count, dtype=np.uint8))
+        missing_lefts.append(np.asarray(missing_left, dtype=bool))
+
+        # Ймовірності класів у листках нормуються так само, як у DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(value / normalizer)
+
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += node_count
+
+    arrays = {
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts).astype(np.int32),
+        "right": np.concatenate(rights).astype(np.int32),
+        "missing_left": np.concatenate(missing_lefts),
+        "value": np.ascontiguousarray(np.concatenate(values)),
+        "roots": np.array(roots, dtype=np.int32),
+    }
+
+    os.makedirs(path, exist_ok=True)
+    for name in ARRAYS:
+        np.save(os.path.join(path, f"{name}.npy"), arrays[name])
+
+    metadata = {
+        "classes": np.asarray(model.classes_).tolist(),
+        "classes_dtype": str(np.asarray(model.classes_).dtype),
+        "feature_names": [str(name) for name in getattr(model, "feature_names_in_", [])],
+        "n_features": int(model.n_features_in_),
+        "n_trees": len(model.estimators_),
+        "max_depth": int(max_depth),
+        "n_nodes": int(offset),
+    }
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as file:
+        json.dump(metadata, file, ensure_ascii=False, indent=2)
+    print(f"Скомпільовану модель збережено у каталог: {path}")
+
+
+class CompiledForest:
+    """
+    Клас для швидкого прогнозування лісом дерев рішень, експортованим функцією export_forest.
+
+    Усі дерева обходяться одночасно для всього пакета рядків векторними операціями
+    NumPy, без об'єктів sklearn. Результати збігаються з RandomForestClassifier.
+    """
+    def __init__(self, arrays, metadata):
+        """
+        Ініціалізує об'єкт CompiledForest.
+
+        Parameters:
+        - arrays (dict): Масиви вузлів (див. ARRAYS).
+        - metadata (dict): Метадані артефакту.
+        """
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.missing_left = arrays["missing_left"]
+        self.value = arrays["value"]
+        self.roots = np.asarray(arrays["roots"], dtype=np.int64)
+
+        self.classes_ = np.array(metadata["classes"], dtype=metadata["classes_dtype"])
+        self.n_features_in_ = metadata["n_features"]
+        self.max_depth = metadata["max_depth"]
+        if metadata["feature_names"]:
+            self.feature_names_in_ = np.array(metadata["feature_names"], dtype=object)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Завантажує артефакт, відображаючи масиви вузлів у пам'ять.
+
+        Parameters:
+        - path (str): Каталог артефакту.
+
+        Returns:
+        CompiledForest: Завантажена модель.
+        """
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as file:
+            metadata = json.load(file)
+        # np.asarray знімає обгортку np.memmap, залишаючи дані відображеними у пам'ять
+        arrays = {name: np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")) for name in ARRAYS}
+        return cls(arrays, metadata)
+
+    def apply(self, X):
+        """
+        Визначає листок кожного дерева для кожного рядка.
+
+        Parameters:
+        - X (array-like): Матриця ознак (рядки × ознаки).
+
+        Returns:
+        np.ndarray: Індекси листків форми рядки × дерева.
+        """
+        # Як і sklearn, порівнюємо значення ознак, приведені до float32
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Очікується {self.n_features_in_} ознак, отримано {X.shape[1]}.")
+
+        flat = X.ravel()
+        has_missing = np.isnan(flat).any()
+        row_offsets = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.max_depth):
+            left, right = self.left[nodes], self.right[nodes]
+            if np.array_equal(left, nodes):
+                break  # Усі дерева вже дійшли до листків
+            values = flat[row_offsets + self.feature[nodes]]
+            go_left = values <= self.threshold[nodes]
+            if has_missing:
+                go_left |= np.isnan(values) & self.missing_left[nodes]
+            nodes = np.where(go_left, left, right)
+        return nodes
+
+    def predict_proba(self, X):
+        """
+        Обчислює ймовірності класів як середнє ймовірностей листків усіх дерев.
+
+        Parameters:
+        - X (array-like): Матриця ознак (рядки × ознаки).
+
+        Returns:
+        np.ndarray: Ймовірності класів (рядки × класи).
+        """
+        leaves = self.apply(X)
+        # cumsum підсумовує послідовно в порядку дерев, як і накопичення у sklearn
+        probabilities = np.cumsum(self.value[leaves], axis=1)[:, -1]
+        probabilities /= leaves.shape[1]
+        return probabilities
+
+    def predict(self, X):
+        """
+        Прогнозує клас для кожного рядка.
+
+        Parameters:
+        - X (array-like): Матриця ознак (рядки × ознаки).
+
+        Returns:
+        np.ndarray: Прогнозовані класи.
+        """
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
@@ -1,7 +1,15 @@
+import argparse
+import os
+import sys
+import time
+
 from DataGenerator import SimulationDataGenerator
 from check_anomalies import AnomalyChecker
-from Visualization import Visualization
-from DataHandler import DataHandler
+from Visualization import Visualization, LiveView
+from DataHandler import DataHandler, FrameWriter, SegmentStore, write_frame
+from Metrics import METRICS
+
+LOOP_STREAM_LENGTH = sys.maxsize  # Потік генератора в циклі необмежений: ітерації зупиняють цикл
 
 class Coordinator:
     """
@@ -15,6 +23,7 @@ class Coordinator:
         - model_path (str): Шлях до файлу моделі.
         """
         self.model_path = model_path
+        self._checker = None  # Модель, завантажена один раз для режиму циклу
 
     def simulate_single_iteration(self, sensors):
         """
@@ -23,37 +32,200 @@ class Coordinator:
         Parameters:
         - sensors (list): Позиції сенсорів.
         """
-        # Генерація одиничного набору даних
+        with METRICS.span("coordinator.iteration", rows=1):
+            # Генерація одиничного набору даних
+            with METRICS.span("coordinator.generate", rows=1):
+                generator = SimulationDataGenerator()
+                generator.generate_data(time_steps=1, sensors=sensors, include_failure=False, include_theft=False)
+                single_data = generator.data
+
+            # Зберігаємо одиничний набір даних у тимчасовий файл
+            temp_file = "Data/Single_Iteration.csv"
+            with METRICS.span("coordinator.write", rows=len(single_data)):
+                write_frame(single_data, temp_file)
+            print(f"Дані для одиничної ітерації збережено у файл: {temp_file}")
+
+            print("Дані для одиничної ітерації:")
+            print(single_data)
+            single_data.to_csv("debug_single_iteration.csv", index=False)
+
+            # Створення та завантаження даних у DataHandler
+            with METRICS.span("coordinator.read", rows=len(single_data)):
+                data_handler = DataHandler()
+                data_handler.load_data(temp_file)
+
+            # Візуалізація даних
+            with METRICS.span("coordinator.plot"):
+                viz = Visualization(data_handler)
+                viz.plot_single_iteration(sensors)
+
+            # Перевірка на аномалії
+            with METRICS.span("coordinator.load_model"):
+                checker = AnomalyChecker(model_path=self.model_path)
+            with METRICS.span("coordinator.predict", rows=len(single_data)):
+                checker.check_data(temp_file)
+
+    def checker(self):
+        """
+        Повертає AnomalyChecker, завантажуючи модель лише під час першого виклику.
+
+        Використовується скомпільована модель поруч із моделлю .pkl (каталог {назва}_compiled,
+        див. CompiledForest); якщо її ще немає, вона створюється під час першого
+        завантаження (див. ModelTraining.resolve_model_path). Прогнози ті самі, а оцінка
+        одного рядка в десятки разів швидша, що потрібно для циклу на 100+ ітерацій/с.
+        """
+        if self._checker is None:
+            from ModelTraining import resolve_model_path  # sklearn потрібен лише під час компіляції моделі
+
+            with METRICS.span("coordinator.load_model"):
+                self._checker = AnomalyChecker(model_path=resolve_model_path(self.model_path))
+        return self._checker
+
+    def run_loop(self, sensors, iterations=None, duration=None, target_rate=100.0, batch_size=1,
+                 plot_every=0, debug_dump=None, store=None, report_interval=1.0, seed=None):
+        """
+        Запускає безперервний цикл: генерація рядків, оцінка моделлю та звіт про частоту.
+
+        Модель і генератор залишаються в пам'яті, дані передаються між етапами
+        без тимчасових файлів. Цикл тримає цільову частоту; якщо ітерації не
+        встигають, про це повідомляється у звіті, а розклад не надолужується пакетом.
+
+        Parameters:
+        - sensors (list): Позиції сенсорів.
+        - iterations (int): Кількість ітерацій; None — без обмеження.
+        - duration (float): Тривалість роботи (с); None — без обмеження.
+        - target_rate (float): Цільова кількість ітерацій за секунду; None — без обмеження.
+        - batch_size (int): Кількість рядків, що генеруються й оцінюються за ітерацію.
+        - plot_every (int): Оновлювати графік останнього вікна кожні plot_every ітерацій (0 — без графіків).
+        - debug_dump (str): Файл для запису всіх згенерованих рядків (None — без запису).
+          Для формату .npy потрібна кількість ітерацій (iterations) без обмеження тривалості.
+        - store (str): Каталог сховища SegmentStore, у яке дописуються всі рядки (None — без запису).
+          Час нових рядків продовжує збережений ряд.
+        - report_interval (float): Інтервал між звітами про частоту (с).
+        - seed (int): Зерно генератора даних.
+
+        Returns:
+        dict: Кількість ітерацій, фактична частота, кількість запізнень і виявлених аномалій.
+        """
+        if debug_dump and os.path.splitext(debug_dump)[1].lower() == ".npy" and \
+                (iterations is None or duration is not None):
+            raise ValueError("Для запису у файл .npy потрібно задати кількість ітерацій без обмеження тривалості "
+                             "(розмір файлу визначається заздалегідь); для циклу без меж використовуйте .csv або .parquet.")
+        checker = self.checker()
         generator = SimulationDataGenerator()
-        generator.generate_data(time_steps=1, sensors=sensors, include_failure=False, include_theft=False)
-        single_data = generator.data
+        frames = generator.iter_normal_flow(LOOP_STREAM_LENGTH, sensors, chunk_size=batch_size, seed=seed)
+        first = next(frames)
+        scorer = checker.scorer(columns=list(first.columns))
+
+        # Графік останнього вікна оновлюється на місці, без побудови нової фігури
+        live_view = LiveView(sensors) if plot_every else None
+        writer = FrameWriter(debug_dump, total_rows=iterations * batch_size if iterations is not None else None) \
+            if debug_dump else None
+        store = SegmentStore(store) if store else None
+        time_offset = 0.0
+        if store is not None and store.last_time is not None:
+            time_offset = store.last_time + 1.0  # Генератор починає з Time = 0
 
-        # Зберігаємо одиничний набір даних у тимчасовий файл
-        temp_file = "Data/Single_Iteration.csv"
-        single_data.to_csv(temp_file, index=False)
-        print(f"Дані для одиничної ітерації збережено у файл: {temp_file}")
+        period = 1.0 / target_rate if target_rate else 0.0
+        started = time.perf_counter()
+        deadline = started
+        report_started, report_iterations, report_late = started, 0, 0
+        count, late, anomalies = 0, 0, 0
+        frame = first
 
-        print("Дані для одиничної ітерації:")
-        print(single_data)
-        single_data.to_csv("debug_single_iteration.csv", index=False)
+        try:
+            while (iterations is None or count < iterations) and \
+                    (duration is None or time.perf_counter() - started < duration):
+                with METRICS.span("coordinator.loop_iteration", rows=len(frame)):
+                    if time_offset:
+                        frame["Time"] += time_offset
+                    predictions, _ = scorer.score(frame.to_numpy(dtype=float))
+                    anomalies += int((predictions == 1).sum())
+                    if writer is not None:
+                        writer.write(frame)
+                    if store is not None:
+                        store.append(frame)
+                    if live_view is not None:
+                        live_view.append(frame)
+                        if count % plot_every == 0:
+                            live_view.render()
+                    frame = next(frames)
 
-        # Створення та завантаження даних у DataHandler
-        data_handler = DataHandler()
-        data_handler.load_data(temp_file)
+                count += 1
+                report_iterations += 1
+                now = time.perf_counter()
+                if period:
+                    deadline += period
+                    if now > deadline + period:
+                        # Ітерація запізнилася більш ніж на період: розклад зсувається, а не надолужується
+                        late += 1
+                        report_late += 1
+                        deadline = now
+                    elif deadline > now:
+                        time.sleep(deadline - now)
 
-        # Візуалізація даних
-        viz = Visualization(data_handler)
-        viz.plot_single_iteration(sensors)
+                if now - report_started >= report_interval:
+                    rate = report_iterations / (now - report_started)
+                    latency = scorer.latency_stats()
+                    message = (f"Цикл: {rate:.1f} ітерацій/с, затримка оцінки p99 {latency['p99_ms']:.2f} мс, "
+                               f"аномалій {anomalies}.")
+                    if target_rate and (report_late or rate < target_rate * 0.95):
+                        message += f" Відставання від цільової частоти {target_rate:.0f} ітерацій/с: " \
+                                   f"{report_late} запізнілих ітерацій."
+                    print(message)
+                    METRICS.set_gauge("coordinator_loop_rate", rate)
+                    report_started, report_iterations, report_late = now, 0, 0
+        except KeyboardInterrupt:
+            print("Цикл зупинено користувачем.")
+        finally:
+            if writer is not None:
+                # Файл .npy, перерваний до кінця, закривається без перевірки кількості рядків
+                complete = writer.total_rows is None or writer.rows_written == writer.total_rows
+                if not complete:
+                    print(f"Цикл перервано: у файлі {debug_dump} записано {writer.rows_written} "
+                          f"з {writer.total_rows} рядків.")
+                writer.close(validate=complete)
+            if store is not None:
+                store.close()
+            if live_view is not None:
+                live_view.close()
 
-        # Перевірка на аномалії
-        checker = AnomalyChecker(model_path=self.model_path)
-        checker.check_data(temp_file)
+        elapsed = time.perf_counter() - started
+        summary = {
+            "iterations": count,
+            "seconds": elapsed,
+            "rate": count / elapsed if elapsed else None,
+            "late_iterations": late,
+            "anomalies": anomalies,
+            **scorer.latency_stats(),
+        }
+        print(f"Цикл завершено: {count} ітерацій за {elapsed:.2f} с ({summary['rate']:.1f} ітерацій/с), "
+              f"запізнень {late}, аномалій {anomalies}.")
+        return summary
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Імітація роботи системи виявлення аномалій.")
+    parser.add_argument("--loop", action="store_true", help="Безперервний цикл замість одиничної ітерації.")
+    parser.add_argument("--rate", type=float, default=100.0, help="Цільова кількість ітерацій за секунду.")
+    parser.add_argument("--iterations", type=int, default=None, help="Кількість ітерацій циклу.")
+    parser.add_argument("--duration", type=float, default=None, help="Тривалість циклу (с).")
+    parser.add_argument("--plot-every", type=int, default=0, help="Будувати графік кожні N ітерацій.")
+    parser.add_argument("--debug-dump", default=None, help="Файл для запису згенерованих рядків.")
+    parser.add_argument("--store", default=None, help="Каталог сховища для дописування згенерованих рядків.")
+    args = parser.parse_args()
+
     # Приклад використання Coordinator
+    METRICS.enable()
     coordinator = Coordinator()
-
-    # Симуляція одиничної ітерації
     sensors = [0, 150_000, 250_000, 300_000]
-    coordinator.simulate_single_iteration(sensors=sensors)
+
+    if args.loop:
+        coordinator.run_loop(sensors, iterations=args.iterations, duration=args.duration, target_rate=args.rate,
+                             plot_every=args.plot_every, debug_dump=args.debug_dump, store=args.store)
+    else:
+        # Симуляція одиничної ітерації
+        coordinator.simulate_single_iteration(sensors=sensors)
+
+    # Зведення метрик (JSON) і файл для збирача метрик Prometheus
+    METRICS.export("Data/Metrics")
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 
+from DataHandler import FrameWriter
+
 # Константи для генерації даних
 D = 1.02  # Діаметр труби у метрах
 rho = 850  # Густина нафти в кг/м³
@@ -18,7 +20,7 @@ class SimulationDataGenerator:
     def __init__(self):
         self.data = None
 
-    def generate_data(self, time_steps, sensors, include_failure=False, include_theft=False):
+    def generate_data(self, time_steps, sensors, include_failure=False, include_theft=False, seed=None):
         """
         Генерує дані трубопроводу.
 
@@ -27,28 +29,88 @@ class SimulationDataGenerator:
         - sensors (list): Позиції сенсорів.
         - include_failure (bool): Чи включати аварії.
         - include_theft (bool): Чи включати крадіжки.
+        - seed (int | np.random.Generator | None): Зерно або генератор випадкових чисел.
         """
-        self.generate_normal_flow(time_steps, sensors)
+        self.generate_normal_flow(time_steps, sensors, seed=seed)
         if include_failure or include_theft:
             self.add_anomalies(sensors)
 
-    def generate_normal_flow(self, time_steps, sensors):
+    def generate_normal_flow(self, time_steps, sensors, seed=None):
         """
         Генерує нормальні дані потоку.
 
         Parameters:
         - time_steps (int): Кількість часових кроків.
         - sensors (list): Позиції сенсорів.
+        - seed (int | np.random.Generator | None): Зерно або генератор випадкових чисел.
+        """
+        rng = np.random.default_rng(seed)
+        self.data = self._normal_flow_chunk(rng, 0, time_steps, sensors)
+
+    def iter_normal_flow(self, time_steps, sensors, chunk_size=100_000, seed=None):
+        """
+        Генерує нормальні дані потоку частинами фіксованого розміру.
+
+        Для однакового зерна об'єднання всіх частин збігається з результатом generate_normal_flow.
+
+        Parameters:
+        - time_steps (int): Загальна кількість часових кроків.
+        - sensors (list): Позиції сенсорів.
+        - chunk_size (int): Кількість рядків в одній частині.
+        - seed (int | np.random.Generator | None): Зерно або генератор випадкових чисел.
+
+        Yields:
+        pd.DataFrame: Чергова частина даних із неперервними значеннями Time.
+        """
+        rng = np.random.default_rng(seed)
+        for start in range(0, time_steps, chunk_size):
+            yield self._normal_flow_chunk(rng, start, min(start + chunk_size, time_steps), sensors)
+
+    def write_normal_flow(self, file_path, time_steps, sensors, chunk_size=100_000, seed=None):
+        """
+        Генерує нормальні дані потоку частинами та одразу дописує їх у файл.
+
+        Формат визначається розширенням: .csv, .parquet або .npy.
+
+        Parameters:
+        - file_path (str): Шлях до файлу.
+        - time_steps (int): Загальна кількість часових кроків.
+        - sensors (list): Позиції сенсорів.
+        - chunk_size (int): Кількість рядків в одній частині.
+        - seed (int | np.random.Generator | None): Зерно або генератор випадкових чисел.
+        """
+        chunks = self.iter_normal_flow(time_steps, sensors, chunk_size=chunk_size, seed=seed)
+        with FrameWriter(file_path, total_rows=time_steps) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+        print(f"Дані збережено у файл {file_path}")
+
+    def _normal_flow_chunk(self, rng, start, stop, sensors):
         """
+        Будує частину нормальних даних потоку для рядків [start, stop).
+
+        Parameters:
+        - rng (np.random.Generator): Генератор випадкових чисел.
+        - start (int): Перший рядок частини.
+        - stop (int): Рядок, що йде за останнім рядком частини.
+        - sensors (list): Позиції сенсорів.
+
+        Returns:
+        pd.DataFrame: Частина даних.
+        """
+        # Шум у порядку час × сенсор × (тиск, витрата), щоб частини відтворювали генерацію за один раз
+        noise = rng.uniform(-NOISE_LEVEL, NOISE_LEVEL, (stop - start, len(sensors), 2))
+        values = np.array([PRESSURE_NORM, FLOW_RATE_NORM]) + noise
+
         data = {
-            "Time": np.arange(time_steps),
-            "Anomaly": [0] * time_steps
+            "Time": np.arange(start, stop),
+            "Anomaly": np.zeros(stop - start, dtype=np.int64)
         }
-        for sensor in sensors:
-            data[f"Pressure_{sensor}m"] = 34.0 + np.random.uniform(-0.02, 0.02, time_steps)
-            data[f"FlowRate_{sensor}m"] = 3.5 + np.random.uniform(-0.02, 0.02, time_steps)
+        for i, sensor in enumerate(sensors):
+            data[f"Pressure_{sensor}m"] = values[:, i, 0]
+            data[f"FlowRate_{sensor}m"] = values[:, i, 1]
 
-        self.data = pd.DataFrame(data)
+        return pd.DataFrame(data)
 
     def add_anomalies(self, sensors):
         """
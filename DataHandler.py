@@ -1,8 +1,708 @@
+import fnmatch
+import json
+import os
+
+import numpy as np
 import pandas as pd
 
+from Metrics import METRICS
+from SensorFrame import SensorFrame
+
+PARQUET_ROW_GROUP_SIZE = 65_536  # Кількість рядків в одній групі рядків Parquet
+SEGMENT_ROWS = 100_000  # Кількість рядків у сегменті сховища SegmentStore
+INDEX_STRIDE = 1024  # Крок розрідженого індексу Time у сегменті (рядків)
+COMPACTION_FACTOR = 10  # У скільки разів сегмент після ущільнення більший за звичайний
+
+
+def _extension(file_name):
+    """
+    Повертає розширення файлу в нижньому регістрі, за яким обирається формат збереження.
+    """
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension not in (".csv", ".parquet", ".npy"):
+        raise ValueError(f"Непідтримуваний формат файлу {file_name}. Використовуйте .csv, .parquet або .npy.")
+    return extension
+
+
+def _metadata_path(file_name):
+    """
+    Повертає шлях до файлу метаданих для сирого блоку .npy.
+    """
+    return os.path.splitext(file_name)[0] + ".meta.json"
+
+
+def _parquet():
+    """
+    Імпортує pyarrow.parquet лише тоді, коли потрібен формат Parquet.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Для формату Parquet потрібен пакет pyarrow.") from e
+    return pq
+
+
+def _select_columns(available, columns):
+    """
+    Визначає стовпці для читання.
+
+    Parameters:
+    - available (list): Стовпці, наявні у файлі.
+    - columns (list): Імена стовпців або шаблони (наприклад, "Pressure_*"); None — усі стовпці.
+
+    Returns:
+    list: Вибрані стовпці у порядку, в якому вони записані у файлі.
+    """
+    if columns is None:
+        return list(available)
+    if isinstance(columns, str):
+        columns = [columns]
+    selected = [name for name in available if any(fnmatch.fnmatchcase(name, pattern) for pattern in columns)]
+    missing = [pattern for pattern in columns if not any(fnmatch.fnmatchcase(name, pattern) for name in available)]
+    if missing:
+        raise KeyError(f"Стовпці {missing} відсутні у файлі.")
+    return selected
+
+
+def _row_range(rows, total_rows=None):
+    """
+    Перетворює діапазон рядків (start, stop) або slice на пару (start, stop).
+    """
+    if rows is None:
+        return 0, total_rows
+    if isinstance(rows, slice):
+        if rows.step not in (None, 1):
+            raise ValueError("Крок діапазону рядків не підтримується.")
+        rows = (rows.start, rows.stop)
+    start, stop = rows
+    start = 0 if start is None else start
+    if total_rows is not None:
+        stop = total_rows if stop is None else min(stop, total_rows)
+    return start, stop
+
+
+@METRICS.timed("datahandler.read_frame", rows=len)
+def read_frame(file_name, columns=None, rows=None):
+    """
+    Читає дані з файлу CSV, Parquet або сирого блоку .npy (формат за розширенням).
+
+    Для Parquet читаються лише потрібні стовпці та групи рядків, для .npy файл
+    відображається в пам'ять, тож копіюється тільки запитаний фрагмент.
+
+    Parameters:
+    - file_name (str): Ім'я файлу.
+    - columns (list): Імена стовпців або шаблони (наприклад, ["Pressure_*"]); None — усі стовпці.
+    - rows (tuple | slice): Діапазон рядків (start, stop); None — усі рядки.
+
+    Returns:
+    pd.DataFrame: Завантажені дані.
+    """
+    extension = _extension(file_name)
+
+    if extension == ".csv":
+        header = pd.read_csv(file_name, nrows=0).columns
+        selected = _select_columns(header, columns)
+        start, stop = _row_range(rows)
+        METRICS.count("datahandler_bytes_read_total", os.path.getsize(file_name), format="csv")
+        return pd.read_csv(
+            file_name,
+            usecols=selected,
+            skiprows=range(1, start + 1) if start else None,
+            nrows=None if stop is None else max(stop - start, 0),
+        )[selected]
+
+    if extension == ".parquet":
+        parquet_file = _parquet().ParquetFile(file_name)
+        metadata = parquet_file.metadata
+        selected = _select_columns(parquet_file.schema_arrow.names, columns)
+        start, stop = _row_range(rows, metadata.num_rows)
+
+        # Читаємо лише групи рядків, що перетинаються із запитаним діапазоном
+        groups, offset, first_row = [], 0, None
+        for i in range(metadata.num_row_groups):
+            group_rows = metadata.row_group(i).num_rows
+            if offset < stop and offset + group_rows > start:
+                groups.append(i)
+                first_row = offset if first_row is None else first_row
+            offset += group_rows
+        if not groups:
+            return parquet_file.schema_arrow.empty_table().select(selected).to_pandas()
+
+        METRICS.count("datahandler_bytes_read_total",
+                      sum(metadata.row_group(i).total_byte_size for i in groups), format="parquet")
+        table = parquet_file.read_row_groups(groups, columns=selected)
+        table = table.slice(start - first_row, stop - start)
+        return table.to_pandas()
+
+    with open(_metadata_path(file_name), encoding="utf-8") as file:
+        metadata = json.load(file)
+    block = np.load(file_name, mmap_mode="r")
+    selected = _select_columns(metadata["columns"], columns)
+    indices = [metadata["columns"].index(name) for name in selected]
+    start, stop = _row_range(rows, block.shape[0])
+
+    values = np.array(block[start:stop, indices])  # Копіюємо лише запитаний фрагмент
+    METRICS.count("datahandler_bytes_read_total", values.nbytes, format="npy")
+    data = pd.DataFrame(values, columns=selected)
+    return data.astype({name: metadata["dtypes"][name] for name in selected})
+
+
+@METRICS.timed("datahandler.read_sensor_frame", rows=len)
+def read_sensor_frame(file_name, columns=None, rows=None, dtype=np.float64):
+    """
+    Читає дані з файлу у SensorFrame (масив час × сенсори × канали).
+
+    Блок .npy перетворюється напряму, без проміжного DataFrame; CSV і Parquet
+    читаються через read_frame.
+
+    Parameters:
+    - file_name (str): Ім'я файлу.
+    - columns (list): Імена стовпців або шаблони; None — усі стовпці.
+    - rows (tuple | slice): Діапазон рядків (start, stop); None — усі рядки.
+    - dtype: Тип значень сенсорів (np.float64 або np.float32).
+
+    Returns:
+    SensorFrame: Завантажені дані.
+    """
+    if _extension(file_name) != ".npy":
+        return SensorFrame.from_frame(read_frame(file_name, columns=columns, rows=rows), dtype=dtype)
+
+    with open(_metadata_path(file_name), encoding="utf-8") as file:
+        metadata = json.load(file)
+    block = np.load(file_name, mmap_mode="r")
+    selected = _select_columns(metadata["columns"], columns)
+    indices = [metadata["columns"].index(name) for name in selected]
+    start, stop = _row_range(rows, block.shape[0])
+
+    values = np.array(block[start:stop, indices])
+    METRICS.count("datahandler_bytes_read_total", values.nbytes, format="npy")
+    return SensorFrame.from_matrix(selected, values, dtype=dtype, dtypes=metadata["dtypes"])
+
+
+@METRICS.timed("datahandler.write_frame")
+def write_frame(data, file_name):
+    """
+    Записує дані у файл CSV, Parquet або сирий блок .npy (формат за розширенням).
+
+    Parameters:
+    - data (pd.DataFrame | SensorFrame): Дані для збереження.
+    - file_name (str): Ім'я файлу.
+    """
+    METRICS.add_rows("datahandler.write_frame", len(data))
+    with FrameWriter(file_name, total_rows=len(data)) as writer:
+        writer.write(data)
+
+
+class FrameWriter:
+    """
+    Клас для послідовного запису даних частинами у файл CSV, Parquet або .npy.
+
+    Для формату .npy потрібно заздалегідь знати загальну кількість рядків:
+    файл створюється відразу потрібного розміру і заповнюється через відображення в пам'ять.
+    """
+
+    def __init__(self, file_name, total_rows=None):
+        """
+        Ініціалізує об'єкт FrameWriter.
+
+        Parameters:
+        - file_name (str): Ім'я файлу.
+        - total_rows (int): Загальна кількість рядків (обов'язкова для .npy).
+        """
+        self.file_name = file_name
+        self.extension = _extension(file_name)
+        self.total_rows = total_rows
+        if self.extension == ".npy" and total_rows is None:
+            raise ValueError("Для формату .npy потрібно вказати загальну кількість рядків.")
+        self.rows_written = 0
+        self._writer = None  # ParquetWriter або відображений у пам'ять масив .npy
+        self._columns = None
+        self._dtypes = None
+
+    def write(self, chunk):
+        """
+        Дописує частину даних у файл.
+
+        Parameters:
+        - chunk (pd.DataFrame | SensorFrame): Частина даних з однаковими стовпцями для всіх викликів.
+        """
+        if isinstance(chunk, SensorFrame) and self.extension != ".npy":
+            chunk = chunk.to_frame()  # CSV і Parquet записуються через pandas; .npy — напряму з масиву
+        if self._columns is None:
+            self._columns = list(chunk.columns)
+            self._dtypes = {name: str(dtype) for name, dtype in chunk.dtypes.items()}
+        elif list(chunk.columns) != self._columns:
+            raise ValueError("Стовпці частини не збігаються зі стовпцями попередніх частин.")
+
+        if self.extension == ".csv":
+            first = self.rows_written == 0
+            chunk.to_csv(self.file_name, mode="w" if first else "a", header=first, index=False)
+
+        elif self.extension == ".parquet":
+            pq = _parquet()
+            import pyarrow as pa
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.file_name, table.schema)
+            self._writer.write_table(table, row_group_size=PARQUET_ROW_GROUP_SIZE)
+
+        else:
+            if self._writer is None:
+                self._writer = np.lib.format.open_memmap(
+                    self.file_name, mode="w+", dtype=np.float64, shape=(self.total_rows, len(self._columns))
+                )
+            stop = self.rows_written + len(chunk)
+            if stop > self.total_rows:
+                raise ValueError(f"Перевищено заявлену кількість рядків {self.total_rows}.")
+            self._writer[self.rows_written:stop] = chunk.to_numpy(dtype=np.float64)
+
+        self.rows_written += len(chunk)
+
+    def close(self, validate=True):
+        """
+        Завершує запис і для .npy зберігає файл метаданих (стовпці й типи).
+
+        Parameters:
+        validate (bool): Чи перевіряти для .npy, що записано рівно total_rows рядків.
+            Якщо False, файл лише закривається без перевірки і без метаданих
+            (використовується, коли запис перервано винятком).
+        """
+        if self.extension == ".parquet" and self._writer is not None:
+            self._writer.close()
+        elif self.extension == ".npy":
+            if self._writer is not None:
+                self._writer.flush()
+            if not validate:
+                self._writer = None
+                return
+            if self.rows_written != self.total_rows:
+                raise ValueError(f"Записано {self.rows_written} рядків замість {self.total_rows}.")
+            metadata = {"columns": self._columns or [], "dtypes": self._dtypes or {}, "rows": self.rows_written}
+            with open(_metadata_path(self.file_name), "w", encoding="utf-8") as file:
+                json.dump(metadata, file, ensure_ascii=False)
+        if METRICS.enabled and os.path.exists(self.file_name):
+            METRICS.count("datahandler_bytes_written_total", os.path.getsize(self.file_name),
+                          format=self.extension.lstrip("."))
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Якщо запис перервано винятком, не маскуємо його помилкою неповного файлу
+        self.close(validate=exc_type is None)
+
+
+def _write_json_atomic(path, data):
+    """
+    Записує JSON через тимчасовий файл, щоб після збою залишилася повна стара або нова версія.
+    """
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+class SegmentStore:
+    """
+    Клас для дописуваного сховища часових рядів із сегментами фіксованого розміру.
+
+    Нові рядки дописуються в кінець активного файлу active.bin (сирі float64 без заголовка).
+    Щойно в ньому набирається segment_rows рядків, він закривається як сегмент .npy,
+    а в index.json додається запис сегмента: межі Time, розріджений індекс
+    Time → зміщення (кожен index_stride-й рядок) та мінімум/максимум/середнє кожного
+    стовпця. Запити за діапазоном часу читають через відображення в пам'ять лише
+    потрібні сегменти й рядки, а пошук за значеннями пропускає сегменти, чий
+    діапазон значень не перетинається з умовою.
+
+    Значення Time мають строго зростати між усіма дописаними рядками.
+    """
+
+    def __init__(self, directory, segment_rows=SEGMENT_ROWS, index_stride=INDEX_STRIDE):
+        """
+        Відкриває або створює сховище.
+
+        Parameters:
+        - directory (str): Каталог сховища.
+        - segment_rows (int): Кількість рядків у сегменті (для нового сховища).
+        - index_stride (int): Крок розрідженого індексу Time (для нового сховища).
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._index_path = os.path.join(directory, "index.json")
+        self._active_path = os.path.join(directory, "active.bin")
+        if os.path.exists(self._index_path):
+            with open(self._index_path, encoding="utf-8") as file:
+                self._index = json.load(file)
+        else:
+            self._index = {"columns": None, "dtypes": None, "segment_rows": segment_rows,
+                           "index_stride": index_stride, "next_segment": 0, "segments": []}
+        self._active_file = None
+        self._active_rows = 0
+        self._last_time = None
+        self._recover()
+
+    @property
+    def columns(self):
+        return self._index["columns"]
+
+    @property
+    def segments(self):
+        """
+        Записи закритих сегментів (межі Time, кількість рядків, зведення стовпців).
+        """
+        return self._index["segments"]
+
+    @property
+    def last_time(self):
+        """
+        Останнє дописане значення Time (None для порожнього сховища).
+        """
+        return self._last_time
+
+    def __len__(self):
+        return sum(segment["rows"] for segment in self.segments) + self._active_rows
+
+    def _row_bytes(self):
+        return 8 * len(self.columns)
+
+    def _time_column(self):
+        return self.columns.index("Time")
+
+    def _recover(self):
+        """
+        Відновлює стан активного файлу після відкриття.
+
+        Неповний останній рядок (збій під час запису) відкидається. Рядки, що вже є
+        в останньому закритому сегменті (збій між закриттям сегмента й очищенням
+        активного файлу), також відкидаються.
+        """
+        if self.segments:
+            self._last_time = self.segments[-1]["time_max"]
+        if self.columns is None or not os.path.exists(self._active_path):
+            return
+        rows = os.path.getsize(self._active_path) // self._row_bytes()
+        active = self._read_active(rows)
+        if rows and self._last_time is not None:
+            keep = active[:, self._time_column()] > self._last_time
+            if not keep.all():
+                active = np.ascontiguousarray(active[keep])
+                rows = len(active)
+        with open(self._active_path, "wb") as file:
+            file.write(active.tobytes())
+        self._active_rows = rows
+        if rows:
+            self._last_time = float(active[-1, self._time_column()])
+
+    def _read_active(self, rows=None):
+        """
+        Повертає рядки активного файлу як масив рядки × стовпці.
+        """
+        rows = self._active_rows if rows is None else rows
+        if not rows:
+            return np.empty((0, len(self.columns)))
+        return np.fromfile(self._active_path, dtype=np.float64, count=rows * len(self.columns)).reshape(rows, -1)
+
+    def append(self, data):
+        """
+        Дописує рядки в кінець сховища.
+
+        Parameters:
+        - data (pd.DataFrame | SensorFrame): Рядки з тими самими стовпцями, що й попередні, включно з Time.
+        """
+        if isinstance(data, SensorFrame):
+            columns, matrix = data.columns, data.to_numpy(dtype=np.float64)
+        else:
+            columns, matrix = list(data.columns), data.to_numpy(dtype=np.float64)
+        if not len(matrix):
+            return
+        if self.columns is None:
+            if "Time" not in columns:
+                raise ValueError("Дані для сховища повинні містити стовпець Time.")
+            self._index["columns"] = columns
+            self._index["dtypes"] = {name: str(dtype) for name, dtype in data.dtypes.items()}
+            _write_json_atomic(self._index_path, self._index)
+        elif columns != self.columns:
+            raise ValueError("Стовпці даних не збігаються зі стовпцями сховища.")
+
+        times = matrix[:, self._time_column()]
+        if not np.isfinite(times).all() or (np.diff(times) <= 0).any() or \
+                (self._last_time is not None and times[0] <= self._last_time):
+            raise ValueError("Значення Time мають бути скінченними і строго зростати.")
+
+        segment_rows = self._index["segment_rows"]
+        position = 0
+        while position < len(matrix):
+            if self._active_file is None:
+                self._active_file = open(self._active_path, "ab")
+            take = min(len(matrix) - position, segment_rows - self._active_rows)
+            self._active_file.write(matrix[position:position + take].tobytes())
+            self._active_rows += take
+            position += take
+            if self._active_rows == segment_rows:
+                self._seal()
+        if self._active_file is not None:
+            self._active_file.flush()
+        self._last_time = float(times[-1])
+        METRICS.count("store_rows_appended_total", len(matrix))
+
+    def _seal(self):
+        """
+        Закриває активний файл як новий сегмент .npy і додає його до індексу.
+        """
+        if self._active_file is not None:
+            self._active_file.close()
+            self._active_file = None
+        block = self._read_active()
+        name = f"segment_{self._index['next_segment']:06d}.npy"
+        self._write_segment(name, block)
+        self._index["segments"].append(self._describe(name, block))
+        self._index["next_segment"] += 1
+        _write_json_atomic(self._index_path, self._index)
+        # Активний файл очищується після запису індексу; дублікати після збою відкидає _recover
+        open(self._active_path, "wb").close()
+        self._active_rows = 0
+
+    def _write_segment(self, name, block):
+        path = os.path.join(self.directory, name)
+        with open(path + ".tmp", "wb") as file:
+            np.save(file, block)
+        os.replace(path + ".tmp", path)
+
+    def _describe(self, name, block):
+        """
+        Будує запис сегмента: межі Time, розріджений індекс і зведення стовпців.
+        """
+        times = block[:, self._time_column()]
+        offsets = np.arange(0, len(block), self._index["index_stride"])
+        with np.errstate(all="ignore"):
+            minimums, maximums, means = np.nanmin(block, axis=0), np.nanmax(block, axis=0), np.nanmean(block, axis=0)
+        summary = {
+            name: {"min": _json_number(low), "max": _json_number(high), "mean": _json_number(mean)}
+            for name, low, high, mean in zip(self.columns, minimums, maximums, means)
+        }
+        return {"file": name, "rows": len(block), "time_min": float(times[0]), "time_max": float(times[-1]),
+                "sparse_index": [[float(times[offset]), int(offset)] for offset in offsets], "summary": summary}
+
+    def _time_bounds(self, segment, block, start, stop):
+        """
+        Визначає рядки сегмента [lo, hi) з start <= Time < stop за розрідженим індексом.
+
+        Зі стовпця Time читаються лише ділянки між сусідніми точками індексу.
+        """
+        sparse = np.asarray(segment["sparse_index"])
+        sparse_times, sparse_offsets = sparse[:, 0], sparse[:, 1].astype(np.int64)
+        column = self._time_column()
+
+        def locate(value):
+            i = max(int(np.searchsorted(sparse_times, value, side="left")) - 1, 0)
+            lo = sparse_offsets[i]
+            hi = sparse_offsets[i + 1] if i + 1 < len(sparse_offsets) else segment["rows"]
+            return lo + int(np.searchsorted(block[lo:hi, column], value, side="left"))
+
+        lo = 0 if start is None else locate(start)
+        hi = segment["rows"] if stop is None else locate(stop)
+        return lo, hi
+
+    def _blocks(self, start=None, stop=None):
+        """
+        Перебирає закриті сегменти, що перетинаються з [start, stop), та активний файл.
+
+        Yields:
+        tuple: (запис сегмента або None для активного файлу, масив рядки × стовпці).
+        """
+        for segment in self.segments:
+            if (stop is not None and segment["time_min"] >= stop) or \
+                    (start is not None and segment["time_max"] < start):
+                METRICS.count("store_segments_skipped_total", reason="time")
+                continue
+            yield segment, np.load(os.path.join(self.directory, segment["file"]), mmap_mode="r")
+        if self._active_rows:
+            if self._active_file is not None:
+                self._active_file.flush()
+            yield None, np.memmap(self._active_path, dtype=np.float64, mode="r",
+                                  shape=(self._active_rows, len(self.columns)))
+
+    def _frame(self, pieces, selected):
+        """
+        Збирає фрагменти рядків у DataFrame з початковими типами стовпців.
+        """
+        values = np.concatenate(pieces) if pieces else np.empty((0, len(selected)))
+        data = pd.DataFrame(values, columns=selected)
+        METRICS.count("store_rows_read_total", len(data))
+        return data.astype({name: self._index["dtypes"][name] for name in selected})
+
+    def query(self, start=None, stop=None, columns=None):
+        """
+        Повертає рядки з start <= Time < stop.
+
+        Parameters:
+        - start (float): Початок діапазону Time (None — від початку).
+        - stop (float): Кінець діапазону Time, не включно (None — до кінця).
+        - columns (list): Імена стовпців або шаблони (наприклад, ["Time", "Pressure_100000m"]).
+
+        Returns:
+        pd.DataFrame: Рядки діапазону.
+        """
+        if self.columns is None:
+            return pd.DataFrame()
+        selected = _select_columns(self.columns, columns)
+        indices = [self.columns.index(name) for name in selected]
+        pieces = []
+        for segment, block in self._blocks(start, stop):
+            if segment is None:
+                times = block[:, self._time_column()]
+                lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+                hi = len(block) if stop is None else int(np.searchsorted(times, stop, side="left"))
+            else:
+                lo, hi = self._time_bounds(segment, block, start, stop)
+            if hi > lo:
+                pieces.append(np.asarray(block[lo:hi])[:, indices])
+        return self._frame(pieces, selected)
+
+    def tail(self, duration, columns=None):
+        """
+        Повертає рядки з last_time - duration < Time <= last_time (наприклад, 600 — останні 10 хвилин).
+        """
+        if self._last_time is None:
+            return self.query(columns=columns)
+        return self.query(start=np.nextafter(self._last_time - duration, np.inf), columns=columns)
+
+    def scan(self, column, low=None, high=None, start=None, stop=None, columns=None):
+        """
+        Повертає рядки, де low <= column <= high, у діапазоні Time [start, stop).
+
+        Сегменти, чиї мінімум і максимум стовпця лежать поза [low, high], не читаються.
+
+        Parameters:
+        - column (str): Стовпець умови.
+        - low (float): Нижня межа (None — без обмеження).
+        - high (float): Верхня межа (None — без обмеження).
+        - start (float): Початок діапазону Time.
+        - stop (float): Кінець діапазону Time, не включно.
+        - columns (list): Стовпці результату; None — усі.
+
+        Returns:
+        pd.DataFrame: Рядки, що задовольняють умову.
+        """
+        if self.columns is None:
+            return pd.DataFrame()
+        selected = _select_columns(self.columns, columns)
+        indices = [self.columns.index(name) for name in selected]
+        position = self.columns.index(column)
+        pieces = []
+        for segment, block in self._blocks(start, stop):
+            if segment is not None:
+                summary = segment["summary"][column]
+                if (summary["max"] is None and (low is not None or high is not None)) or \
+                        (low is not None and summary["max"] < low) or (high is not None and summary["min"] > high):
+                    METRICS.count("store_segments_skipped_total", reason="summary")
+                    continue
+                lo, hi = self._time_bounds(segment, block, start, stop)
+            else:
+                times = block[:, self._time_column()]
+                lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+                hi = len(block) if stop is None else int(np.searchsorted(times, stop, side="left"))
+            rows = np.asarray(block[lo:hi])
+            values = rows[:, position]
+            mask = np.ones(len(rows), dtype=bool)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+            if mask.any():
+                pieces.append(rows[mask][:, indices])
+        return self._frame(pieces, selected)
+
+    def compact(self, before=None, target_rows=None, drop_before=None):
+        """
+        Ущільнює старі сегменти.
+
+        Сегменти, що повністю лежать до drop_before, видаляються. Послідовні сегменти,
+        що закінчуються до before, об'єднуються в сегменти до target_rows рядків.
+
+        Parameters:
+        - before (float): Ущільнювати сегменти з Time < before (None — усі закриті сегменти).
+        - target_rows (int): Найбільший розмір об'єднаного сегмента; за замовчуванням
+          segment_rows * COMPACTION_FACTOR.
+        - drop_before (float): Видалити сегменти з Time < drop_before (None — не видаляти).
+
+        Returns:
+        dict: Кількість видалених сегментів, об'єднаних сегментів і створених сегментів.
+        """
+        target_rows = target_rows or self._index["segment_rows"] * COMPACTION_FACTOR
+        obsolete = []
+        kept = []
+        for segment in self.segments:
+            if drop_before is not None and segment["time_max"] < drop_before:
+                obsolete.append(segment["file"])
+            else:
+                kept.append(segment)
+        dropped = len(obsolete)
+
+        # Групи послідовних старих сегментів, що вміщуються в target_rows
+        groups, current, current_rows = [], [], 0
+        for segment in kept:
+            if before is not None and segment["time_max"] >= before:
+                groups += [current, [segment]]
+                current, current_rows = [], 0
+                continue
+            if current and current_rows + segment["rows"] > target_rows:
+                groups.append(current)
+                current, current_rows = [], 0
+            current.append(segment)
+            current_rows += segment["rows"]
+        groups.append(current)
+
+        segments, merged, created = [], 0, 0
+        for group in groups:
+            if len(group) < 2:
+                segments.extend(group)
+                continue
+            block = np.concatenate([np.load(os.path.join(self.directory, s["file"]), mmap_mode="r") for s in group])
+            name = f"segment_{self._index['next_segment']:06d}.npy"
+            self._index["next_segment"] += 1
+            self._write_segment(name, block)
+            segments.append(self._describe(name, block))
+            obsolete.extend(s["file"] for s in group)
+            merged += len(group)
+            created += 1
+
+        self._index["segments"] = segments
+        _write_json_atomic(self._index_path, self._index)
+        for name in obsolete:  # Файли видаляються лише після запису нового індексу
+            os.remove(os.path.join(self.directory, name))
+        result = {"dropped": dropped, "merged": merged, "created": created}
+        print(f"Ущільнення сховища {self.directory}: видалено {dropped} сегм., "
+              f"об'єднано {merged} сегм. у {created}.")
+        return result
+
+    def close(self):
+        """
+        Закриває активний файл (дописані рядки вже збережені).
+        """
+        if self._active_file is not None:
+            self._active_file.close()
+            self._active_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _json_number(value):
+    """
+    Перетворює число на значення для JSON (NaN → None).
+    """
+    return None if np.isnan(value) else float(value)
+
+
 class DataHandler:
     """
-    Клас для роботи з даними: завантаження і збереження у форматі CSV.
+    Клас для роботи з даними: завантаження і збереження у форматах CSV, Parquet та .npy.
+
+    Атрибут data містить pd.DataFrame або SensorFrame (див. load_sensor_frame).
     """
 
     def __init__(self):
@@ -13,30 +713,91 @@ class DataHandler:
 
     def save_data(self, file_name):
         """
-        Зберігає дані у файл CSV.
+        Зберігає дані у файл. Формат визначається розширенням: .csv, .parquet або .npy.
 
         Parameters:
         file_name (str): Ім'я файлу для збереження даних.
         """
         if self.data is not None:  # Перевіряємо, чи є дані для збереження
-            self.data.to_csv(file_name, index=False)  # Зберігаємо у форматі CSV без індексів
+            write_frame(self.data, file_name)  # Зберігаємо без індексів
             print(f"Дані успішно збережені у файл: {file_name}")
         else:
             print("Дані відсутні. Немає чого зберігати.")  # Повідомлення, якщо даних немає
 
-    def load_data(self, file_name):
+    def load_data(self, file_name, columns=None, rows=None):
         """
-        Завантажує дані з файлу CSV.
+        Завантажує дані з файлу. Формат визначається розширенням: .csv, .parquet або .npy.
 
         Parameters:
         file_name (str): Ім'я файлу, з якого потрібно завантажити дані.
+        columns (list): Імена стовпців або шаблони (наприклад, ["Pressure_*"]); None — усі стовпці.
+        rows (tuple | slice): Діапазон рядків (start, stop); None — усі рядки.
         """
         try:
-            self.data = pd.read_csv(file_name)  # Завантаження даних у pandas DataFrame
+            self.data = read_frame(file_name, columns=columns, rows=rows)  # Завантаження даних у pandas DataFrame
             print(f"Дані успішно завантажені з файлу: {file_name}")
         except FileNotFoundError:
             print(f"Файл {file_name} не знайдено. Перевірте шлях до файлу.")  # Повідомлення про відсутність файлу
         except pd.errors.EmptyDataError:
             print(f"Файл {file_name} порожній. Завантаження неможливе.")  # Повідомлення про порожній файл
         except Exception as e:
-            print(f"Сталася помилка при завантаженні даних: {e}")  # Вивід будь-яких інших помилок
\ No newline at end of file
+            print(f"Сталася помилка при завантаженні даних: {e}")  # Вивід будь-яких інших помилок
+
+    def append_data(self, store_directory):
+        """
+        Дописує поточні дані в сховище SegmentStore.
+
+        Parameters:
+        store_directory (str): Каталог сховища.
+        """
+        if self.data is None:
+            print("Дані відсутні. Немає чого дописувати.")
+            return
+        with SegmentStore(store_directory) as store:
+            store.append(self.data)
+        print(f"Дані дописано у сховище: {store_directory}")
+
+    def load_range(self, store_directory, start=None, stop=None, columns=None):
+        """
+        Завантажує рядки сховища SegmentStore з start <= Time < stop.
+
+        Parameters:
+        store_directory (str): Каталог сховища.
+        start (float): Початок діапазону Time.
+        stop (float): Кінець діапазону Time, не включно.
+        columns (list): Імена стовпців або шаблони; None — усі стовпці.
+        """
+        with SegmentStore(store_directory) as store:
+            self.data = store.query(start=start, stop=stop, columns=columns)
+        print(f"Завантажено {len(self.data)} рядків зі сховища: {store_directory}")
+
+    def load_sensor_frame(self, file_name, columns=None, rows=None, dtype=np.float64):
+        """
+        Завантажує дані з файлу у SensorFrame (масив час × сенсори × канали).
+
+        Parameters:
+        file_name (str): Ім'я файлу, з якого потрібно завантажити дані.
+        columns (list): Імена стовпців або шаблони; None — усі стовпці.
+        rows (tuple | slice): Діапазон рядків (start, stop); None — усі рядки.
+        dtype: Тип значень сенсорів (np.float32 удвічі зменшує обсяг пам'яті).
+        """
+        try:
+            self.data = read_sensor_frame(file_name, columns=columns, rows=rows, dtype=dtype)
+            print(f"Дані успішно завантажені з файлу: {file_name}")
+        except FileNotFoundError:
+            print(f"Файл {file_name} не знайдено. Перевірте шлях до файлу.")
+        except pd.errors.EmptyDataError:
+            print(f"Файл {file_name} порожній. Завантаження неможливе.")
+        except Exception as e:
+            print(f"Сталася помилка при завантаженні даних: {e}")
+
+    def sensor_frame(self, dtype=np.float64):
+        """
+        Перетворює поточні дані на SensorFrame (якщо вони ще не в цьому форматі).
+
+        Returns:
+        SensorFrame: Поточні дані.
+        """
+        if self.data is not None and not isinstance(self.data, SensorFrame):
+            self.data = SensorFrame.from_frame(self.data, dtype=dtype)
+        return self.data
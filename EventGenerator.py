@@ -1,11 +1,13 @@
 import random
 
+import numpy as np
+
 class EventGenerator:
     """
     Клас для генерації позицій подій (наприклад, аварій) на трубопроводі.
     """
 
-    def __init__(self, pipeline_length, sensors, min_distance_from_sensors, logger):
+    def __init__(self, pipeline_length, sensors, min_distance_from_sensors, logger, rng=None):
         """
         Ініціалізує об'єкт EventGenerator з необхідними параметрами.
 
@@ -14,11 +16,93 @@ class EventGenerator:
         - sensors (list): Список позицій сенсорів уздовж трубопроводу.
         - min_distance_from_sensors (int): Мінімальна відстань від сенсора до події.
         - logger (Logger): Об'єкт логера для запису подій.
+        - rng (np.random.Generator): Генератор випадкових чисел; за замовчуванням зерно береться з модуля random.
         """
         self.pipeline_length = pipeline_length  # Довжина трубопроводу
         self.sensors = sensors  # Позиції сенсорів
         self.min_distance_from_sensors = min_distance_from_sensors  # Мінімальна відстань до сенсора
         self.logger = logger  # Логер для запису подій
+        self.rng = rng  # Генератор випадкових чисел для відтворюваних симуляцій
+
+        # Допустимі позиції подій: об'єднання відрізків [start, end] (цілі метри, включно)
+        self.interval_starts, self.interval_ends = self._valid_intervals()
+
+    def _valid_intervals(self):
+        """
+        Обчислює відрізки трубопроводу, що лежать не ближче min_distance_from_sensors до всіх сенсорів.
+
+        Returns:
+        tuple: (starts, ends) — масиви початків і кінців допустимих відрізків (включно).
+        """
+        starts, ends = [], []
+        current = 0  # Перша позиція, яка ще може бути допустимою
+        if self.min_distance_from_sensors > 0:
+            for sensor in sorted(self.sensors):
+                # Заборонені позиції: |position - sensor| < min_distance_from_sensors
+                forbidden_start = sensor - self.min_distance_from_sensors + 1
+                forbidden_end = sensor + self.min_distance_from_sensors - 1
+                if forbidden_start > current:
+                    starts.append(current)
+                    ends.append(min(forbidden_start - 1, self.pipeline_length))
+                current = max(current, forbidden_end + 1)
+                if current > self.pipeline_length:
+                    break
+        if current <= self.pipeline_length:
+            starts.append(current)
+            ends.append(self.pipeline_length)
+
+        starts, ends = np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64)
+        valid = starts <= ends
+        return starts[valid], ends[valid]
+
+    def generate_event_positions(self, n, min_separation=0):
+        """
+        Генерує n позицій подій, рівномірно розподілених по допустимих відрізках.
+
+        Позиції вибираються одним векторним запитом без відкидання невдалих спроб.
+        Якщо задано min_separation, позиції вибираються на «стиснутій» осі, що
+        складається лише з допустимих відрізків, із відстанню між сусідніми подіями
+        не менше min_separation; на реальній осі відстань між подіями не менша.
+
+        Parameters:
+        - n (int): Кількість подій.
+        - min_separation (int): Мінімальна відстань між подіями (м).
+
+        Returns:
+        np.ndarray: Позиції подій (цілі метри).
+        """
+        counts = self.interval_ends - self.interval_starts + 1
+        total = int(counts.sum())
+        if total == 0:
+            raise ValueError(
+                f"Немає допустимих позицій подій: усі точки трубопроводу лежать ближче "
+                f"{self.min_distance_from_sensors} м до сенсорів."
+            )
+
+        # Без явного генератора зерно береться з модуля random, щоб random.seed() зберігав відтворюваність
+        rng = self.rng if self.rng is not None else np.random.default_rng(random.getrandbits(64))
+
+        if min_separation > 0 and n > 1:
+            span = total - (n - 1) * min_separation
+            if span <= 0:
+                raise ValueError(
+                    f"Неможливо розмістити {n} подій з відстанню {min_separation} м на {total} м допустимих позицій."
+                )
+            offsets = np.sort(rng.integers(0, span, n)) + np.arange(n) * min_separation
+            offsets = rng.permutation(offsets)
+        else:
+            offsets = rng.integers(0, total, n)
+
+        # Перехід від позиції на стиснутій осі до реальної позиції на трубопроводі
+        cumulative = np.cumsum(counts)
+        intervals = np.searchsorted(cumulative, offsets, side="right")
+        positions = self.interval_starts[intervals] + offsets - (cumulative[intervals] - counts[intervals])
+
+        if n <= 10:
+            self.logger.log("Згенеровано події на позиціях: %s м", ", ".join(map(str, positions)))
+        else:
+            self.logger.log("Згенеровано %d подій на %d допустимих відрізках.", n, len(counts))
+        return positions
 
     def generate_event_position(self):
         """
@@ -27,18 +111,4 @@ class EventGenerator:
         Returns:
         int: Згенерована позиція події в межах трубопроводу.
         """
-        while True:
-            position = random.randint(0, self.pipeline_length)  # Генеруємо випадкову позицію
-            valid = True  # Припускаємо, що позиція є валідною
-
-            # Перевіряємо, чи знаходиться подія на допустимій відстані від усіх сенсорів
-            for sensor in self.sensors:
-                if abs(position - sensor) < self.min_distance_from_sensors:
-                    valid = False  # Позиція занадто близько до сенсора
-                    break
-
-            if valid:  # Якщо позиція валідна, виходимо з циклу
-                self.logger.log(f"Згенеровано подію на позиції: {position} м", level="INFO")
-                return position
-            else:
-                self.logger.log("Позиція події не відповідає умовам. Спроба знову.", level="WARNING")
+        return int(self.generate_event_positions(1)[0])
@@ -0,0 +1,282 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+SIGNAL_PREFIXES = ("Pressure_", "FlowRate_")  # Стовпці сенсорів, з яких будуються ознаки
+REBASE_ROWS = 4096  # Період (рядків), через який накопичені суми відраховуються заново
+
+
+def feature_config_path(model_path):
+    """
+    Повертає шлях до файлу конфігурації ознак, що зберігається поруч із моделлю.
+
+    Parameters:
+    - model_path (str): Шлях до моделі (.pkl) або каталогу скомпільованої моделі.
+
+    Returns:
+    str: Шлях до файлу .features.json.
+    """
+    if os.path.isdir(model_path):
+        return os.path.join(model_path, "features.json")
+    return os.path.splitext(model_path)[0] + ".features.json"
+
+
+class FeatureEngine:
+    """
+    Клас для обчислення часових ознак сенсорів: дельти, ковзного середнього і
+    стандартного відхилення, експоненційного згладжування (EWMA) та різниць
+    тиску між сусідніми сенсорами.
+
+    Пакетний режим (transform) обробляє весь DataFrame векторно, потоковий (update)
+    оновлює кільцеві буфери за O(1) на рядок. Обидва режими виконують однакові
+    арифметичні операції в однаковому порядку, тому їхні результати збігаються побітово.
+
+    Ковзні середнє і відхилення рахуються з накопичених сум відхилень від початку
+    відліку. Кожні rebase_rows рядків початок відліку переноситься на останній рядок,
+    а суми останніх window рядків перераховуються від нього: інакше на довгому потоці
+    суми ростуть, і різниця двох великих сум втрачає точність.
+    """
+    def __init__(self, columns, window=10, lag=1, ewma_alpha=0.2):
+        """
+        Ініціалізує об'єкт FeatureEngine.
+
+        Parameters:
+        - columns (list): Стовпці сенсорів (Pressure_*, FlowRate_*) у порядку вхідних рядків.
+        - window (int): Довжина ковзного вікна для середнього і стандартного відхилення.
+        - lag (int): Відставання (кроків) для дельти.
+        - ewma_alpha (float): Коефіцієнт згладжування EWMA (0 < alpha <= 1).
+        """
+        if window < 1 or lag < 1:
+            raise ValueError("Довжина вікна і відставання мають бути не меншими за 1.")
+        if not 0 < ewma_alpha <= 1:
+            raise ValueError("Коефіцієнт згладжування EWMA має лежати в межах (0, 1].")
+
+        self.columns = list(columns)
+        self.window = int(window)
+        self.lag = int(lag)
+        self.ewma_alpha = float(ewma_alpha)
+        self._decay = 1.0 - self.ewma_alpha
+        self.rebase_rows = max(REBASE_ROWS, self.window)
+
+        # Різниці тиску між сусідніми сенсорами (у порядку стовпців)
+        pressure = [i for i, column in enumerate(self.columns) if column.startswith("Pressure_")]
+        self._pairs = np.array(list(zip(pressure[:-1], pressure[1:])), dtype=np.int64).reshape(-1, 2)
+
+        self.feature_names = list(self.columns)
+        for suffix in ("Delta", "Mean", "Std", "EWMA"):
+            self.feature_names += [f"{column}_{suffix}" for column in self.columns]
+        self.feature_names += [
+            f"PressureDiff_{self.columns[a][len('Pressure_'):]}_{self.columns[b][len('Pressure_'):]}"
+            for a, b in self._pairs
+        ]
+
+        self.reset()
+
+    @classmethod
+    def from_frame(cls, data, **kwargs):
+        """
+        Створює FeatureEngine для всіх стовпців сенсорів DataFrame.
+
+        Parameters:
+        - data (pd.DataFrame): Дані з Pressure_* та FlowRate_* стовпцями.
+        - kwargs: Параметри FeatureEngine (window, lag, ewma_alpha).
+
+        Returns:
+        FeatureEngine: Новий об'єкт.
+        """
+        return cls([column for column in data.columns if column.startswith(SIGNAL_PREFIXES)], **kwargs)
+
+    def reset(self):
+        """
+        Скидає стан потокового режиму (наступний рядок вважається першим).
+        """
+        self._count = 0
+        self._origin = None  # Початок відліку: відносно нього накопичуються суми
+        self._lagged = None  # Кільцевий буфер останніх lag рядків
+        self._values = None  # Кільцевий буфер останніх window рядків
+        self._sums = None  # Кільцеві буфери накопичених сум відхилень і їх квадратів
+        self._squares = None
+        self._sum = None
+        self._square = None
+        self._ewma = None
+
+    def transform(self, data):
+        """
+        Обчислює ознаки для всього DataFrame (пакетний режим).
+
+        Стан потокового режиму не змінюється. Перший рядок даних є початком ряду:
+        до накопичення lag і window рядків використовуються наявні значення.
+
+        Parameters:
+        - data (pd.DataFrame): Дані зі стовпцями self.columns.
+
+        Returns:
+        pd.DataFrame: Ознаки у порядку feature_names з індексом вхідних даних.
+        """
+        values = data[self.columns].to_numpy(dtype=np.float64)
+        if len(values) == 0:
+            return pd.DataFrame(np.empty((0, len(self.feature_names))), columns=self.feature_names, index=data.index)
+        origin = values[0]
+
+        lagged = np.empty_like(values)
+        lagged[:self.lag] = origin
+        lagged[self.lag:] = values[:-self.lag]
+        delta = values - lagged
+
+        # Накопичені суми відхилень від початку відліку; суми вікна — різниці накопичених сум.
+        # Кожен блок rebase_rows рядків рахується від останнього рядка попереднього блоку
+        # разом із window рядками перед ним (як після _rebase у потоковому режимі)
+        counts = np.minimum(np.arange(1, len(values) + 1), self.window).astype(np.float64)[:, np.newaxis]
+        mean = np.empty_like(values)
+        std = np.empty_like(values)
+        for start in range(0, len(values), self.rebase_rows):
+            head = 0 if start == 0 else self.window
+            block_origin = origin if start == 0 else values[start - 1]
+            deviation = values[start - head:start + self.rebase_rows] - block_origin
+            sums = np.cumsum(deviation, axis=0)
+            squares = np.cumsum(deviation * deviation, axis=0)
+            window_sum = sums[head:].copy()
+            window_square = squares[head:].copy()
+            # Перші window рядків ряду не мають рядка, що виходить з вікна
+            first = 0 if start else self.window
+            if first < len(window_sum):
+                window_sum[first:] -= sums[head + first - self.window:len(sums) - self.window]
+                window_square[first:] -= squares[head + first - self.window:len(squares) - self.window]
+            stop = start + len(window_sum)
+            mean[start:stop], std[start:stop] = self._moments(block_origin, window_sum, window_square,
+                                                               counts[start:stop])
+
+        # Рекурсивний фільтр ewma[t] = alpha * x[t] + (1 - alpha) * ewma[t - 1] від першого рядка;
+        # scipy.signal імпортується тут, щоб не сповільнювати запуск команд, які його не використовують
+        from scipy.signal import lfilter
+
+        ewma = np.empty_like(values)
+        ewma[0] = origin
+        ewma[1:] = lfilter([self.ewma_alpha], [1.0, -self._decay], values[1:], axis=0,
+                           zi=(self._decay * origin)[np.newaxis])[0]
+
+        diff = values[:, self._pairs[:, 0]] - values[:, self._pairs[:, 1]]
+        features = np.hstack([values, delta, mean, std, ewma, diff])
+        return pd.DataFrame(features, columns=self.feature_names, index=data.index)
+
+    def update(self, row):
+        """
+        Додає один рядок до потокового стану і повертає його ознаки.
+
+        Parameters:
+        - row (array-like): Значення стовпців self.columns.
+
+        Returns:
+        np.ndarray: Ознаки рядка у порядку feature_names.
+        """
+        value = np.asarray(row, dtype=np.float64)
+        if self._count == 0:
+            self._origin = value.copy()
+            self._lagged = np.tile(value, (self.lag, 1))
+            self._values = np.empty((self.window, len(value)))
+            self._sums = np.zeros((self.window, len(value)))
+            self._squares = np.zeros((self.window, len(value)))
+            self._sum = np.zeros(len(value))
+            self._square = np.zeros(len(value))
+            self._ewma = value.copy()
+        else:
+            self._ewma = self.ewma_alpha * value + self._decay * self._ewma
+
+        slot = self._count % self.lag
+        delta = value - self._lagged[slot]
+        self._lagged[slot] = value
+
+        deviation = value - self._origin
+        self._sum = self._sum + deviation
+        self._square = self._square + deviation * deviation
+        slot = self._count % self.window
+        if self._count >= self.window:
+            window_sum = self._sum - self._sums[slot]
+            window_square = self._square - self._squares[slot]
+        else:
+            window_sum, window_square = self._sum, self._square
+        self._sums[slot] = self._sum
+        self._squares[slot] = self._square
+        self._values[slot] = value
+
+        self._count += 1
+        count = np.float64(min(self._count, self.window))
+        mean, std = self._moments(self._origin, window_sum, window_square, count)
+        if self._count % self.rebase_rows == 0:
+            self._rebase()
+
+        diff = value[self._pairs[:, 0]] - value[self._pairs[:, 1]]
+        return np.concatenate([value, delta, mean, std, self._ewma, diff])
+
+    def _rebase(self):
+        """
+        Переносить початок відліку на останній рядок і перераховує від нього
+        накопичені суми останніх window рядків.
+        """
+        slots = np.arange(self._count - self.window, self._count) % self.window
+        self._origin = self._values[slots[-1]].copy()
+        deviation = self._values[slots] - self._origin
+        sums = np.cumsum(deviation, axis=0)
+        squares = np.cumsum(deviation * deviation, axis=0)
+        self._sums[slots] = sums
+        self._squares[slots] = squares
+        self._sum = sums[-1]
+        self._square = squares[-1]
+
+    def update_many(self, rows):
+        """
+        Послідовно додає рядки до потокового стану.
+
+        Parameters:
+        - rows (array-like): Матриця рядків × стовпці self.columns.
+
+        Returns:
+        np.ndarray: Ознаки рядків × feature_names.
+        """
+        rows = np.asarray(rows, dtype=np.float64)
+        features = np.empty((len(rows), len(self.feature_names)))
+        for i, row in enumerate(rows):
+            features[i] = self.update(row)
+        return features
+
+    @staticmethod
+    def _moments(origin, window_sum, window_square, count):
+        """
+        Обчислює ковзне середнє і стандартне відхилення (ddof=0) із сум вікна.
+        """
+        shift = window_sum / count
+        variance = np.maximum(window_square / count - shift * shift, 0.0)
+        return origin + shift, np.sqrt(variance)
+
+    def to_dict(self):
+        """
+        Повертає конфігурацію ознак для збереження.
+        """
+        return {"columns": self.columns, "window": self.window, "lag": self.lag, "ewma_alpha": self.ewma_alpha}
+
+    def save(self, path):
+        """
+        Зберігає конфігурацію ознак у JSON-файл.
+
+        Parameters:
+        - path (str): Шлях до файлу (див. feature_config_path).
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
+        print(f"Конфігурацію ознак збережено у файл: {path}")
+
+    @classmethod
+    def load(cls, path):
+        """
+        Завантажує конфігурацію ознак із JSON-файлу.
+
+        Parameters:
+        - path (str): Шлях до файлу.
+
+        Returns:
+        FeatureEngine: Новий об'єкт із початковим потоковим станом.
+        """
+        with open(path, encoding="utf-8") as file:
+            return cls(**json.load(file))
@@ -1,19 +1,237 @@
+import atexit
 import datetime
-import pandas as pd
-import numpy as np
+import json
+import queue
+import sys
+import threading
+import time
+
+from Metrics import METRICS
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+_STOP = object()  # Маркер завершення фонового потоку
+FLUSH_POLL_INTERVAL = 0.5  # Період (с) перевірки, чи живий фоновий потік, під час flush
+
+
+def _level_value(level):
+    """
+    Повертає числове значення рівня логування.
+
+    Raises:
+    ValueError: Якщо рівень невідомий.
+    """
+    try:
+        return LEVELS[level]
+    except (KeyError, TypeError):
+        raise ValueError(f"Невідомий рівень логування: {level!r}. Допустимі: {', '.join(LEVELS)}.") from None
+
 
 class Logger:
     """
     Клас для логування повідомлень у файл та на екран з рівнями та часовими мітками.
+
+    Виклик log лише перевіряє рівень і кладе запис у чергу в пам'яті. Форматування,
+    вивід на екран і запис у файл виконує фоновий потік: файл відкривається один раз,
+    записи буферизуються і скидаються на диск за порогом розміру, за інтервалом
+    часу та під час завершення програми.
     """
-    def __init__(self, log_file):
+    def __init__(self, log_file, level="INFO", console=True, json_lines=False,
+                 flush_size=64 * 1024, flush_interval=1.0):
+        """
+        Ініціалізує об'єкт Logger.
+
+        Parameters:
+        - log_file (str): Шлях до файлу логів.
+        - level (str): Мінімальний рівень повідомлень (DEBUG, INFO, WARNING, ERROR, CRITICAL).
+        - console (bool): Чи виводити повідомлення на екран.
+        - json_lines (bool): Чи записувати повідомлення у форматі JSON Lines.
+        - flush_size (int): Кількість символів у буфері, після якої він скидається у файл.
+        - flush_interval (float): Максимальний час (с) між скиданнями буфера у файл.
+        """
         self.log_file = log_file
-        with open(self.log_file, 'w') as file:
-            file.write("Логування розпочато\n")
-
-    def log(self, message, level="INFO"):
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] [{level}] {message}"
-        print(log_message)  # Вивід на екран
-        with open(self.log_file, 'a') as file:
-            file.write(log_message + "\n")
\ No newline at end of file
+        self.level = _level_value(level)
+        self.console = console
+        self.json_lines = json_lines
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.SimpleQueue()
+        self._file = open(self.log_file, 'w', encoding="utf-8", buffering=1024 * 1024)
+        self._closed = False
+        self._timestamp_second = None  # Кеш відформатованої часової мітки поточної секунди
+        self._timestamp_text = None
+
+        if not json_lines:
+            self._file.write("Логування розпочато\n")
+
+        self._thread = threading.Thread(target=self._run, name="LoggerWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+        if json_lines:
+            self.log("Логування розпочато")
+
+    def is_enabled(self, level):
+        """
+        Перевіряє, чи буде записано повідомлення заданого рівня.
+
+        Дозволяє не будувати дороге повідомлення, якщо рівень відфільтровано.
+
+        Parameters:
+        - level (str): Рівень повідомлення.
+
+        Returns:
+        bool: True, якщо повідомлення буде записано.
+        """
+        return _level_value(level) >= self.level
+
+    def log(self, message, *args, level="INFO"):
+        """
+        Додає повідомлення до черги логування.
+
+        Рівень перевіряється до будь-якого форматування; аргументи args
+        підставляються у message (через %) лише у фоновому потоці.
+
+        Parameters:
+        - message (str): Повідомлення або шаблон повідомлення.
+        - args: Аргументи для підстановки в шаблон повідомлення.
+        - level (str): Рівень повідомлення (лише іменованим аргументом).
+
+        Raises:
+        ValueError: Якщо рівень невідомий.
+        """
+        if _level_value(level) < self.level or self._closed:
+            return
+        self._queue.put((time.time(), level, message, args))
+        METRICS.count("logger_records_total", level=level)
+
+    def flush(self):
+        """
+        Чекає, поки всі повідомлення з черги будуть записані у файл.
+
+        Raises:
+        RuntimeError: Якщо фоновий потік запису завершився і черга вже не обробляється.
+        """
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        while not done.wait(FLUSH_POLL_INTERVAL):
+            if not self._thread.is_alive():
+                raise RuntimeError(f"Фоновий потік логування завершився; записи не потрапили у {self.log_file}.")
+
+    def close(self):
+        """
+        Записує залишок черги, зупиняє фоновий потік і закриває файл.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()  # Для завершеного потоку повертається одразу
+        self._file.close()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _format(self, created, level, message, args):
+        """
+        Форматує запис логу.
+
+        Returns:
+        str: Готовий рядок без символу нового рядка.
+        """
+        second = int(created)
+        if second != self._timestamp_second:
+            self._timestamp_second = second
+            self._timestamp_text = datetime.datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S")
+        if args:
+            try:
+                message = message % args
+            except (TypeError, ValueError):
+                message = f"{message} {args}"  # Некоректний шаблон не повинен зупиняти запис логів
+        if self.json_lines:
+            return json.dumps({"time": self._timestamp_text, "level": level, "message": message}, ensure_ascii=False)
+        return f"[{self._timestamp_text}] [{level}] {message}"
+
+    def _format_safe(self, item):
+        """
+        Форматує запис логу, не даючи помилці в одному записі зупинити фоновий потік.
+
+        Returns:
+        str: Готовий рядок або повідомлення про помилку форматування.
+        """
+        try:
+            return self._format(*item)
+        except Exception as e:
+            METRICS.count("logger_format_errors_total")
+            message = f"Не вдалося відформатувати запис логу: {e!r}"
+            if self.json_lines:
+                return json.dumps({"time": self._timestamp_text, "level": "ERROR", "message": message}, ensure_ascii=False)
+            return f"[{self._timestamp_text}] [ERROR] {message}"
+
+    def _run(self):
+        """
+        Фоновий потік: забирає записи з черги, форматує їх і записує пакетами.
+        """
+        pending = 0  # Кількість символів, записаних після останнього скидання
+        last_flush = time.monotonic()
+        running = True
+
+        while running:
+            timeout = max(self.flush_interval - (time.monotonic() - last_flush), 0.0)
+            try:
+                items = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                items = []
+
+            # Забираємо все, що вже накопичилося, щоб писати пакетом
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines, waiters = [], []
+            for item in items:
+                if item is _STOP:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    lines.append(self._format_safe(item))
+
+            try:
+                if lines:
+                    text = "\n".join(lines) + "\n"
+                    with METRICS.span("logger.write", rows=len(lines)):
+                        self._file.write(text)
+                    pending += len(text)
+                    if METRICS.enabled:
+                        METRICS.count("logger_bytes_written_total", len(text.encode("utf-8")))
+                    if self.console:
+                        sys.stdout.write(text)  # Вивід на екран
+
+                if pending >= self.flush_size or waiters or not running or \
+                        time.monotonic() - last_flush >= self.flush_interval:
+                    if pending:
+                        with METRICS.span("logger.flush"):
+                            self._file.flush()
+                        if self.console:
+                            sys.stdout.flush()
+                    pending = 0
+                    last_flush = time.monotonic()
+            except (OSError, ValueError) as e:
+                # Помилка запису втрачає лише цей пакет; потік продовжує обробляти чергу
+                print(f"Помилка запису логу у {self.log_file}: {e}", file=sys.stderr)
+                METRICS.count("logger_write_errors_total")
+                pending = 0
+                last_flush = time.monotonic()
+            finally:
+                for waiter in waiters:
+                    waiter.set()
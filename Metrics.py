@@ -0,0 +1,336 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+# Межі кошиків гістограм затримки (с), як у типових клієнтах Prometheus
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = "pipeline_stage_seconds"  # Гістограма тривалості етапів (мітка stage)
+STAGE_ROWS = "pipeline_stage_rows_total"  # Кількість оброблених рядків на етапі (мітка stage)
+
+
+class _NullSpan:
+    """
+    Порожній інтервал для вимкнених метрик: нічого не вимірює і не зберігає.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """
+    Інтервал часу етапу: після завершення записує тривалість і кількість рядків.
+    """
+    __slots__ = ("registry", "stage", "rows", "started")
+
+    def __init__(self, registry, stage, rows):
+        self.registry = registry
+        self.stage = stage
+        self.rows = rows  # Можна задати всередині інтервалу, коли кількість рядків стане відома
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.started
+        self.registry.observe(STAGE_SECONDS, elapsed, stage=self.stage)
+        if self.rows:
+            self.registry.count(STAGE_ROWS, self.rows, stage=self.stage)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Клас для збору метрик виконання: інтервалів етапів, лічильників, показників і гістограм.
+
+    Вимкнений реєстр не зберігає нічого: span повертає спільний порожній інтервал,
+    а count, set_gauge та observe завершуються після однієї перевірки прапорця.
+    """
+    def __init__(self, enabled=False):
+        """
+        Ініціалізує об'єкт MetricsRegistry.
+
+        Parameters:
+        - enabled (bool): Чи збирати метрики.
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        """
+        Вмикає збір метрик.
+        """
+        self.enabled = True
+
+    def disable(self):
+        """
+        Вимикає збір метрик (зібрані значення зберігаються).
+        """
+        self.enabled = False
+
+    def reset(self):
+        """
+        Видаляє всі зібрані значення.
+        """
+        with self._lock:
+            self._counters = {}
+            self._gauges = {}
+            self._histograms = {}  # Ключ → [лічильники кошиків, сума, кількість]
+
+    def span(self, stage, rows=None):
+        """
+        Створює інтервал для вимірювання тривалості етапу.
+
+        Parameters:
+        - stage (str): Назва етапу (наприклад, "simulator.apply_long_term_failure").
+        - rows (int): Кількість оброблених рядків для обчислення швидкості.
+
+        Returns:
+        Контекстний менеджер інтервалу.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage, rows)
+
+    def timed(self, stage, rows=None):
+        """
+        Декоратор, що вимірює кожен виклик функції як інтервал етапу.
+
+        Parameters:
+        - stage (str): Назва етапу.
+        - rows (callable): Функція, що за результатом виклику повертає кількість рядків (наприклад, len).
+
+        Returns:
+        callable: Декоратор.
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self.span(stage) as span:
+                    result = function(*args, **kwargs)
+                    if rows is not None:
+                        span.rows = rows(result)
+                return result
+            return wrapper
+        return decorator
+
+    def add_rows(self, stage, rows):
+        """
+        Додає кількість оброблених рядків етапу (для етапів, виміряних декоратором timed).
+        """
+        self.count(STAGE_ROWS, rows, stage=stage)
+
+    def count(self, name, value=1, **labels):
+        """
+        Збільшує лічильник.
+
+        Parameters:
+        - name (str): Назва метрики (з суфіксом _total за правилами Prometheus).
+        - value (float): Приріст.
+        - labels: Мітки метрики.
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        """
+        Встановлює значення показника.
+
+        Parameters:
+        - name (str): Назва метрики.
+        - value (float): Значення.
+        - labels: Мітки метрики.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        """
+        Додає спостереження до гістограми (межі кошиків — LATENCY_BUCKETS).
+
+        Parameters:
+        - name (str): Назва метрики.
+        - value (float): Спостереження (зазвичай тривалість у секундах).
+        - labels: Мітки метрики.
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(LATENCY_BUCKETS, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def summary(self):
+        """
+        Повертає зведення метрик.
+
+        Для кожного етапу наводяться кількість викликів, сумарна і середня тривалість,
+        оцінки перцентилів p50/p99 (за межами кошиків) та швидкість у рядках за секунду.
+
+        Returns:
+        dict: Лічильники, показники, гістограми та етапи.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: (list(buckets), total, count) for key, (buckets, total, count) in self._histograms.items()}
+
+        stages = {}
+        for (name, labels), (buckets, total, count) in histograms.items():
+            if name != STAGE_SECONDS:
+                continue
+            stage = dict(labels)["stage"]
+            rows = counters.get((STAGE_ROWS, labels), 0)
+            stages[stage] = {
+                "calls": count,
+                "seconds_total": total,
+                "seconds_mean": total / count,
+                "seconds_p50": self._quantile(buckets, count, 0.5),
+                "seconds_p99": self._quantile(buckets, count, 0.99),
+                "rows_total": rows,
+                "rows_per_second": rows / total if rows and total else None,
+            }
+
+        return {
+            "created": time.time(),
+            "stages": stages,
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in sorted(counters.items())],
+            "gauges": [{"name": name, "labels": dict(labels), "value": value}
+                       for (name, labels), value in sorted(gauges.items())],
+            "histograms": [{"name": name, "labels": dict(labels), "buckets": list(LATENCY_BUCKETS),
+                            "counts": buckets, "sum": total, "count": count}
+                           for (name, labels), (buckets, total, count) in sorted(histograms.items())],
+        }
+
+    @staticmethod
+    def _quantile(buckets, count, q):
+        """
+        Оцінює перцентиль як верхню межу кошика, у який він потрапляє.
+        """
+        target = q * count
+        cumulative = 0
+        for bound, bucket in zip(LATENCY_BUCKETS + (float("inf"),), buckets):
+            cumulative += bucket
+            if cumulative >= target:
+                return bound if bound != float("inf") else None  # Вище за останню межу кошиків
+        return None
+
+    def to_prometheus(self):
+        """
+        Формує метрики у текстовому форматі Prometheus.
+
+        Returns:
+        str: Текст для файлу, який читає збирач метрик.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted((key, (list(b), s, c)) for key, (b, s, c) in self._histograms.items())
+
+        lines, typed = [], set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), value in gauges:
+            header(name, "gauge")
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), (buckets, total, count) in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, bucket in zip(LATENCY_BUCKETS + (float("inf"),), buckets):
+                cumulative += bucket
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        """
+        Зберігає зведення метрик у JSON-файл.
+        """
+        _write_atomic(path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path):
+        """
+        Зберігає метрики у файл текстового формату Prometheus.
+        """
+        _write_atomic(path, self.to_prometheus())
+
+    def export(self, directory, prefix="metrics"):
+        """
+        Зберігає метрики у {prefix}.json та {prefix}.prom у заданому каталозі.
+
+        Parameters:
+        - directory (str): Каталог для файлів метрик.
+        - prefix (str): Префікс імен файлів.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.write_json(os.path.join(directory, f"{prefix}.json"))
+        self.write_prometheus(os.path.join(directory, f"{prefix}.prom"))
+        print(f"Метрики збережено у каталог: {directory}")
+
+
+def _labels(labels):
+    """
+    Форматує мітки Prometheus: {name="value",...}.
+    """
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+
+def _number(value):
+    """
+    Форматує число для Prometheus.
+    """
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _write_atomic(path, text):
+    """
+    Записує файл через тимчасовий, щоб збирач метрик не прочитав його частково.
+    """
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(path + ".tmp", path)
+
+
+# Спільний реєстр процесу; вимкнений, доки його не ввімкне точка входу
+METRICS = MetricsRegistry(enabled=os.environ.get("PIPELINE_METRICS", "") not in ("", "0"))
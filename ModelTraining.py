@@ -0,0 +1,460 @@
+import argparse
+import concurrent.futures
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import classification_report, confusion_matrix
+
+from CascadeDetector import ChangeDetector, cascade_config_path
+from CompiledForest import export_forest
+from DataHandler import read_frame
+from FeatureEngine import SIGNAL_PREFIXES, FeatureEngine, feature_config_path
+from SimulationCache import CACHE_SIZE_LIMIT, SimulationCache
+
+DEFAULT_MODEL_PATH = "Data/Anomaly_Detection_Model.pkl"
+DEFAULT_COMPILED_PATH = "Data/Anomaly_Detection_Model_compiled"
+DEFAULT_CACHE_DIR = "Data/FeatureCache"
+HASH_BLOCK_SIZE = 1 << 20  # Розмір блоку читання файлу для обчислення хешу
+
+
+def resolve_shards(sources):
+    """
+    Визначає список файлів даних (шардів) для навчання.
+
+    Parameters:
+    - sources (list): Файли, шаблони (наприклад, "Data/Sweep/*.npy"), маніфести
+      manifest.json або каталоги з маніфестом (див. ScenarioSweep.run_sweep).
+
+    Returns:
+    list: Шляхи до шардів у стабільному порядку.
+    """
+    shards = []
+    for source in sources:
+        if os.path.isdir(source):
+            source = os.path.join(source, "manifest.json")
+        if os.path.basename(source) == "manifest.json":
+            with open(source, encoding="utf-8") as file:
+                manifest = json.load(file)
+            directory = os.path.dirname(source)
+            shards.extend(os.path.join(directory, shard["shard"]) for shard in manifest["shards"])
+        elif glob.has_magic(source):
+            shards.extend(sorted(path for path in glob.glob(source) if not path.endswith(".meta.json")))
+        else:
+            shards.append(source)
+    return shards
+
+
+def file_hash(path):
+    """
+    Обчислює SHA-256 вмісту шарду (разом із файлом метаданих для .npy).
+
+    Parameters:
+    - path (str): Шлях до шарду.
+
+    Returns:
+    str: Шістнадцятковий хеш.
+    """
+    digest = hashlib.sha256()
+    metadata_path = os.path.splitext(path)[0] + ".meta.json"
+    for name in (path, metadata_path) if path.endswith(".npy") else (path,):
+        with open(name, "rb") as file:
+            for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def training_state_path(model_path):
+    """
+    Повертає шлях до файлу стану навчання (для інкрементного донавчання).
+    """
+    return os.path.splitext(model_path)[0] + ".training.json"
+
+
+def metrics_path(model_path):
+    """
+    Повертає шлях до файлу з метриками якості моделі.
+    """
+    return os.path.splitext(model_path)[0] + ".metrics.json"
+
+
+def extract_features(path, content_hash, feature_config, cache_dir):
+    """
+    Обчислює ознаки шарду або бере їх із кешу.
+
+    Ключ кешу — хеш вмісту шарду разом із конфігурацією ознак і версією коду
+    (див. SimulationCache), тому змінений шард, інші параметри ознак чи змінений
+    FeatureEngine обчислюються заново. Ознаки зберігаються у float32 (саме в цьому
+    типі їх використовує RandomForestClassifier). Давні записи тут не витісняються:
+    ознаки інших шардів цього навчання ще читатимуться; train витісняє їх після навчання.
+
+    Parameters:
+    - path (str): Шлях до шарду.
+    - content_hash (str): Хеш вмісту шарду (див. file_hash).
+    - feature_config (dict): Конфігурація FeatureEngine.
+    - cache_dir (str): Каталог кешу ознак.
+
+    Returns:
+    dict: Шляхи до масивів ознак і міток, кількість рядків і ключ запису кешу.
+    """
+    cache = SimulationCache(cache_dir)
+    key = cache.key("features", content=content_hash, features=feature_config)
+    paths = cache.array_paths(key)
+
+    if paths is None:
+        feature_engine = FeatureEngine(**feature_config)
+        data = read_frame(path, columns=["Anomaly", *(f"{prefix}*" for prefix in SIGNAL_PREFIXES)])
+        # Стовпці сенсорів, відсутні у шарді, заповнюються нулями
+        data = data.reindex(columns=["Anomaly", *feature_engine.columns], fill_value=0)
+        features = feature_engine.transform(data).to_numpy(dtype=np.float32)
+        labels = data["Anomaly"].to_numpy(dtype=np.int64)
+        cache.store(key, {"features": features, "labels": labels}, "features", evict=False)
+        paths = cache.array_paths(key)
+
+    features_path, labels_path = paths["features"], paths["labels"]
+    rows = int(np.load(labels_path, mmap_mode="r").shape[0])
+    return {"path": path, "hash": content_hash, "features": features_path, "labels": labels_path, "rows": rows,
+            "cache_key": key}
+
+
+def _extract_features_star(arguments):
+    """
+    Розпаковує аргументи для обчислення ознак у пулі процесів.
+    """
+    return extract_features(*arguments)
+
+
+def _test_mask(content_hash, rows, test_size, random_state):
+    """
+    Визначає рядки шарду, що відводяться для перевірки моделі.
+
+    Вибір залежить лише від вмісту шарду і random_state, тож однаковий для
+    повторних запусків і для інкрементного донавчання.
+    """
+    rng = np.random.default_rng([int(content_hash[:16], 16), random_state])
+    return rng.random(rows) < test_size
+
+
+def _iter_training_rows(shards, chunk_rows, test_size, random_state):
+    """
+    Читає навчальні рядки шардів із кешу ознак частинами не більше chunk_rows.
+
+    Yields:
+    tuple: (features, labels) — частина навчальних рядків.
+    """
+    for shard in shards:
+        features = np.load(shard["features"], mmap_mode="r")
+        labels = np.load(shard["labels"], mmap_mode="r")
+        train = ~_test_mask(shard["hash"], shard["rows"], test_size, random_state)
+        for start in range(0, shard["rows"], chunk_rows):
+            stop = min(start + chunk_rows, shard["rows"])
+            mask = train[start:stop]
+            yield np.asarray(features[start:stop][mask]), np.asarray(labels[start:stop][mask])
+
+
+def _fit_chunk(model, features, labels, feature_names, trees_per_chunk):
+    """
+    Додає до лісу trees_per_chunk дерев, навчених на частині даних.
+    """
+    model.n_estimators += trees_per_chunk
+    model.fit(pd.DataFrame(features, columns=feature_names), labels)
+    print(f"Навчено {trees_per_chunk} дерев на {len(labels)} рядках (усього дерев: {len(model.estimators_)}).")
+
+
+def _can_fit(model, labels):
+    """
+    Перевіряє, чи містить частина всі класи моделі (для нової моделі — хоча б два класи).
+
+    Частина з одним класом змінила б classes_ і зламала усереднення ймовірностей дерев.
+    """
+    classes = np.unique(labels)
+    if hasattr(model, "classes_"):
+        return np.array_equal(classes, model.classes_)
+    return len(classes) > 1
+
+
+def calibrate_detector(detector, shards, chunk_rows, test_size, random_state):
+    """
+    Калібрує детектор змін каскаду за навчальними рядками стабільного потоку (Anomaly == 0).
+
+    Перші стовпці кешованих ознак — сирі значення сенсорів у порядку FeatureEngine.columns,
+    тому окреме читання шардів не потрібне.
+
+    Returns:
+    ChangeDetector: Той самий детектор.
+    """
+    width = len(detector.columns)
+    for features, labels in _iter_training_rows(shards, chunk_rows, test_size, random_state):
+        detector.partial_fit(features[labels == 0, :width])
+    print(f"Детектор змін каскаду калібровано за {detector.count} рядками стабільного потоку.")
+    return detector
+
+
+def evaluate(model, shards, feature_names, test_size, random_state, chunk_rows):
+    """
+    Оцінює модель на відкладених рядках шардів.
+
+    Returns:
+    dict: Звіт класифікації, матриця плутанини та кількість перевірених рядків.
+    """
+    true_labels, predictions = [], []
+    for shard in shards:
+        features = np.load(shard["features"], mmap_mode="r")
+        labels = np.load(shard["labels"], mmap_mode="r")
+        test = _test_mask(shard["hash"], shard["rows"], test_size, random_state)
+        for start in range(0, shard["rows"], chunk_rows):
+            stop = min(start + chunk_rows, shard["rows"])
+            mask = test[start:stop]
+            if not mask.any():
+                continue
+            true_labels.append(np.asarray(labels[start:stop][mask]))
+            predictions.append(model.predict(pd.DataFrame(np.asarray(features[start:stop][mask]), columns=feature_names)))
+
+    if not true_labels:
+        print("Немає рядків для перевірки моделі.")
+        return {"test_rows": 0}
+
+    true_labels, predictions = np.concatenate(true_labels), np.concatenate(predictions)
+    print("Classification Report:")
+    print(classification_report(true_labels, predictions, zero_division=0))
+    print("Confusion Matrix:")
+    cm = confusion_matrix(true_labels, predictions, labels=model.classes_)
+    print(cm)
+    return {
+        "test_rows": int(len(true_labels)),
+        "classification_report": classification_report(true_labels, predictions, output_dict=True, zero_division=0),
+        "confusion_matrix": cm.tolist(),
+        "labels": model.classes_.tolist(),
+    }
+
+
+def train(sources, model_path=DEFAULT_MODEL_PATH, compiled_path=DEFAULT_COMPILED_PATH,
+          cache_dir=DEFAULT_CACHE_DIR, chunk_rows=1_000_000, trees_per_chunk=100, incremental=False,
+          test_size=0.2, random_state=42, n_jobs=-1, max_workers=None, feature_options=None,
+          cache_size_limit=CACHE_SIZE_LIMIT):
+    """
+    Навчає модель виявлення аномалій на шардованому наборі даних без завантаження його в пам'ять.
+
+    Ознаки кожного шарду обчислюються паралельно і кешуються. Далі навчальні рядки
+    читаються частинами по chunk_rows, і для кожної частини до лісу додаються нові
+    дерева (warm_start); дерева навчаються на всіх ядрах. В інкрементному режимі
+    модель і стан завантажуються з диска, а вже використані шарди пропускаються.
+
+    Parameters:
+    - sources (list): Файли, шаблони, маніфести або каталоги з маніфестом (див. resolve_shards).
+    - model_path (str): Шлях для збереження моделі (.pkl).
+    - compiled_path (str): Каталог для скомпільованої моделі (див. CompiledForest); None — без експорту.
+    - cache_dir (str): Каталог кешу ознак.
+    - chunk_rows (int): Найбільша кількість рядків в одній частині навчання.
+    - trees_per_chunk (int): Кількість дерев, що додаються для кожної частини.
+    - incremental (bool): Чи донавчати наявну модель лише на нових шардах.
+    - test_size (float): Частка рядків кожного шарду для перевірки моделі.
+    - random_state (int): Зерно для моделі та вибору перевірочних рядків.
+    - n_jobs (int): Кількість потоків для навчання дерев (-1 — усі ядра).
+    - max_workers (int): Кількість процесів для обчислення ознак; None — кількість ядер.
+    - feature_options (dict): Параметри FeatureEngine (window, lag, ewma_alpha) для нової моделі.
+    - cache_size_limit (int): Найбільший обсяг кешу ознак (байт). Давні записи витісняються
+      після навчання; ознаки поточного навчання зберігаються, навіть якщо перевищують ліміт.
+
+    Returns:
+    dict: Метрики якості моделі.
+    """
+    started = time.perf_counter()
+    shards = resolve_shards(sources)
+    if not shards:
+        raise ValueError("Не знайдено жодного файлу даних для навчання.")
+
+    state_path = training_state_path(model_path)
+    if incremental and os.path.exists(state_path) and os.path.exists(model_path):
+        with open(state_path, encoding="utf-8") as file:
+            state = json.load(file)
+        model = joblib.load(model_path)
+        model.set_params(warm_start=True, n_jobs=n_jobs)
+        feature_engine = FeatureEngine(**state["features"])
+        test_size, random_state = state["test_size"], state["random_state"]
+    else:
+        data = read_frame(shards[0], rows=(0, 1))
+        feature_engine = FeatureEngine.from_frame(data, **(feature_options or {}))
+        model = RandomForestClassifier(n_estimators=0, warm_start=True, n_jobs=n_jobs, random_state=random_state)
+        state = {"features": feature_engine.to_dict(), "test_size": test_size,
+                 "random_state": random_state, "shards": {}}
+
+    hashes = [file_hash(path) for path in shards]
+    tasks = [(path, content_hash, feature_engine.to_dict(), cache_dir)
+             for path, content_hash in zip(shards, hashes) if content_hash not in state["shards"]]
+    if not tasks:
+        print("Нових шардів для навчання немає.")
+        return None
+
+    os.makedirs(cache_dir, exist_ok=True)
+    if max_workers == 1 or len(tasks) == 1:
+        new_shards = [_extract_features_star(task) for task in tasks]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            new_shards = list(executor.map(_extract_features_star, tasks))
+    print(f"Ознаки підготовлено для {len(new_shards)} шардів ({sum(s['rows'] for s in new_shards)} рядків).")
+
+    # Навчання частинами; частина накопичується, доки не містить усіх класів
+    buffer_features, buffer_labels, buffered = [], [], 0
+    for features, labels in _iter_training_rows(new_shards, chunk_rows, test_size, random_state):
+        buffer_features.append(features)
+        buffer_labels.append(labels)
+        buffered += len(labels)
+        if buffered >= chunk_rows and _can_fit(model, np.concatenate(buffer_labels)):
+            _fit_chunk(model, np.concatenate(buffer_features), np.concatenate(buffer_labels),
+                       feature_engine.feature_names, trees_per_chunk)
+            buffer_features, buffer_labels, buffered = [], [], 0
+
+    if buffered:
+        labels = np.concatenate(buffer_labels)
+        if _can_fit(model, labels):
+            _fit_chunk(model, np.concatenate(buffer_features), labels, feature_engine.feature_names, trees_per_chunk)
+        else:
+            print(f"Пропущено {buffered} останніх рядків: вони не містять усіх класів.")
+    if not hasattr(model, "estimators_"):
+        raise ValueError("Навчальні дані повинні містити щонайменше два класи (стовпець 'Anomaly').")
+
+    # Детектор змін донавчається разом із моделлю в інкрементному режимі
+    detector_path = cascade_config_path(model_path)
+    detector = ChangeDetector.load(detector_path) if incremental and os.path.exists(detector_path) \
+        else ChangeDetector(feature_engine.columns)
+    calibrate_detector(detector, new_shards, chunk_rows, test_size, random_state)
+
+    metrics = evaluate(model, new_shards, feature_engine.feature_names, test_size, random_state, chunk_rows)
+    metrics.update({
+        "n_estimators": len(model.estimators_),
+        "trained_shards": [shard["path"] for shard in new_shards],
+        "train_seconds": time.perf_counter() - started,
+    })
+
+    # Збереження моделі, конфігурації ознак, метрик і стану навчання
+    os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+    joblib.dump(model, model_path)
+    print(f"Модель збережено у файл: {model_path}")
+    feature_engine.save(feature_config_path(model_path))
+    detector.save(detector_path)
+    if compiled_path is not None:
+        export_forest(model, compiled_path)
+        feature_engine.save(feature_config_path(compiled_path))
+        detector.save(cascade_config_path(compiled_path))
+
+    with open(metrics_path(model_path), "w", encoding="utf-8") as file:
+        json.dump(metrics, file, ensure_ascii=False, indent=2)
+    print(f"Метрики збережено у файл: {metrics_path(model_path)}")
+
+    state["n_estimators"] = len(model.estimators_)
+    for shard in new_shards:
+        state["shards"][shard["hash"]] = {"path": shard["path"], "rows": shard["rows"]}
+    with open(state_path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(state, file, ensure_ascii=False, indent=2)
+    os.replace(state_path + ".tmp", state_path)
+
+    # Витіснення давніх ознак лише після навчання: під час нього читаються ознаки всіх шардів
+    SimulationCache(cache_dir, cache_size_limit).evict(keep=[shard["cache_key"] for shard in new_shards])
+    return metrics
+
+
+def compiled_model_path(model_path):
+    """
+    Повертає каталог скомпільованої моделі для моделі .pkl ({назва}_compiled).
+
+    Parameters:
+    - model_path (str): Шлях до моделі (.pkl).
+
+    Returns:
+    str: Шлях до каталогу скомпільованої моделі.
+    """
+    return os.path.splitext(model_path)[0] + "_compiled"
+
+
+def compile_model(model_path=DEFAULT_MODEL_PATH, compiled_path=None):
+    """
+    Експортує збережену модель .pkl у каталог скомпільованої моделі (див. CompiledForest)
+    разом із конфігураціями ознак і детектора змін.
+
+    Parameters:
+    - model_path (str): Шлях до моделі (.pkl).
+    - compiled_path (str): Каталог для скомпільованої моделі; None — compiled_model_path(model_path).
+
+    Returns:
+    str: Шлях до каталогу скомпільованої моделі.
+    """
+    compiled_path = compiled_model_path(model_path) if compiled_path is None else compiled_path
+    export_forest(joblib.load(model_path), compiled_path)
+    for source, target in ((feature_config_path(model_path), os.path.join(compiled_path, "features.json")),
+                           (cascade_config_path(model_path), os.path.join(compiled_path, "cascade.json"))):
+        if os.path.exists(source):
+            shutil.copyfile(source, target)
+    return compiled_path
+
+
+def resolve_model_path(model_path):
+    """
+    Повертає модель для оцінки: каталог скомпільованої моделі, якщо він є або його
+    вдається створити з моделі .pkl, інакше саму модель .pkl.
+
+    Скомпільована модель дає ті самі прогнози, а оцінка одного рядка в десятки разів швидша.
+
+    Parameters:
+    - model_path (str): Шлях до моделі (.pkl) або каталогу скомпільованої моделі.
+
+    Returns:
+    str: Шлях до моделі для AnomalyChecker.
+    """
+    if os.path.isdir(model_path):
+        return model_path
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Модель не знайдено: {model_path}. Спочатку навчіть її (python cli.py train).")
+    compiled_path = compiled_model_path(model_path)
+    if os.path.isdir(compiled_path):
+        return compiled_path
+    try:
+        return compile_model(model_path, compiled_path)
+    except OSError as e:
+        print(f"Не вдалося скомпілювати модель ({e}); використовується {model_path}. "
+              f"Щоб отримати скомпільовану модель, виконайте: python ModelTraining.py --compile-only --model {model_path}")
+        return model_path
+
+
+def main(argv=None):
+    """
+    Точка входу командного рядка для навчання моделі.
+    """
+    parser = argparse.ArgumentParser(description="Навчання моделі виявлення аномалій на шардованих даних.")
+    parser.add_argument("sources", nargs="*", default=["Data/Pipeline_Event_Simulation.csv"],
+                        help="Файли, шаблони, маніфести або каталоги з маніфестом.")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Шлях для збереження моделі.")
+    parser.add_argument("--compiled", default=DEFAULT_COMPILED_PATH, help="Каталог для скомпільованої моделі.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Каталог кешу ознак.")
+    parser.add_argument("--cache-size", type=float, default=CACHE_SIZE_LIMIT / 2**30,
+                        help="Найбільший обсяг кешу ознак (ГіБ).")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="Кількість рядків в одній частині навчання.")
+    parser.add_argument("--trees-per-chunk", type=int, default=100, help="Кількість дерев на частину.")
+    parser.add_argument("--incremental", action="store_true", help="Донавчати наявну модель на нових шардах.")
+    parser.add_argument("--test-size", type=float, default=0.2, help="Частка рядків для перевірки.")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно моделі та вибору перевірочних рядків.")
+    parser.add_argument("--jobs", type=int, default=-1, help="Кількість потоків навчання дерев.")
+    parser.add_argument("--workers", type=int, default=None, help="Кількість процесів для обчислення ознак.")
+    parser.add_argument("--compile-only", action="store_true",
+                        help="Лише скомпілювати наявну модель --model у каталог --compiled.")
+    args = parser.parse_args(argv)
+
+    if args.compile_only:
+        compile_model(args.model, args.compiled)
+        return
+
+    train(args.sources, model_path=args.model, compiled_path=args.compiled, cache_dir=args.cache_dir,
+          chunk_rows=args.chunk_rows, trees_per_chunk=args.trees_per_chunk, incremental=args.incremental,
+          test_size=args.test_size, random_state=args.seed, n_jobs=args.jobs, max_workers=args.workers,
+          cache_size_limit=int(args.cache_size * 2**30))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import numpy as np
 import pandas as pd
 
+from DataHandler import FrameWriter
+
 
 class Pipeline:
     """
@@ -15,18 +17,86 @@ class Pipeline:
         self.area = np.pi * (self.diameter ** 2) / 4
         self.data = None
 
-    def generate_normal_flow(self, time_steps, noise_level):
+    def generate_normal_flow(self, time_steps, noise_level, seed=None):
         """
         Генерує дані для стабільного потоку через трубопровід.
+
+        Parameters:
+        - time_steps (int): Кількість часових кроків.
+        - noise_level (float): Амплітуда рівномірного шуму.
+        - seed (int | np.random.Generator | None): Зерно або генератор випадкових чисел.
+        """
+        rng = np.random.default_rng(seed)
+        self.data = self._normal_flow_chunk(rng, 0, time_steps, time_steps, noise_level)
+
+    def iter_normal_flow(self, time_steps, noise_level, chunk_size=100_000, seed=None):
         """
-        data = {
-            "Time": np.linspace(0, time_steps, time_steps),
-        }
-        for sensor in self.sensors:
-            data[f"Pressure_{sensor}m"] = self.pressure_norm + np.random.uniform(
-                -noise_level, noise_level, time_steps
-            )
-            data[f"FlowRate_{sensor}m"] = self.flow_rate_norm + np.random.uniform(
-                -noise_level, noise_level, time_steps
-            )
-        self.data = pd.DataFrame(data)
+        Генерує дані стабільного потоку частинами фіксованого розміру.
+
+        Для однакового зерна об'єднання всіх частин збігається з результатом
+        generate_normal_flow, тож пам'ять обмежена розміром однієї частини
+        незалежно від довжини ряду.
+
+        Parameters:
+        - time_steps (int): Загальна кількість часових кроків.
+        - noise_level (float): Амплітуда рівномірного шуму.
+        - chunk_size (int): Кількість рядків в одній частині.
+        - seed (int | np.random.Generator | None): Зерно або генератор випадкових чисел.
+
+        Yields:
+        pd.DataFrame: Чергова частина даних із неперервними значеннями Time.
+        """
+        rng = np.random.default_rng(seed)
+        for start in range(0, time_steps, chunk_size):
+            stop = min(start + chunk_size, time_steps)
+            yield self._normal_flow_chunk(rng, start, stop, time_steps, noise_level)
+
+    def write_normal_flow(self, file_path, time_steps, noise_level, chunk_size=100_000, seed=None):
+        """
+        Генерує дані стабільного потоку частинами та одразу дописує їх у файл.
+
+        Формат визначається розширенням: .csv, .parquet або .npy.
+
+        Parameters:
+        - file_path (str): Шлях до файлу.
+        - time_steps (int): Загальна кількість часових кроків.
+        - noise_level (float): Амплітуда рівномірного шуму.
+        - chunk_size (int): Кількість рядків в одній частині.
+        - seed (int | np.random.Generator | None): Зерно або генератор випадкових чисел.
+        """
+        chunks = self.iter_normal_flow(time_steps, noise_level, chunk_size=chunk_size, seed=seed)
+        with FrameWriter(file_path, total_rows=time_steps) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+
+    def _normal_flow_chunk(self, rng, start, stop, time_steps, noise_level):
+        """
+        Будує частину даних стабільного потоку для рядків [start, stop).
+
+        Шум генерується у порядку час × сенсор × (тиск, витрата), тому послідовні
+        частини споживають потік випадкових чисел так само, як і генерація за один раз.
+
+        Parameters:
+        - rng (np.random.Generator): Генератор випадкових чисел.
+        - start (int): Перший рядок частини.
+        - stop (int): Рядок, що йде за останнім рядком частини.
+        - time_steps (int): Загальна кількість часових кроків.
+        - noise_level (float): Амплітуда рівномірного шуму.
+
+        Returns:
+        pd.DataFrame: Частина даних.
+        """
+        # Значення збігаються з np.linspace(0, time_steps, time_steps)[start:stop]
+        step = time_steps / (time_steps - 1) if time_steps > 1 else 0.0
+        times = np.arange(start, stop, dtype=float) * step
+        if stop == time_steps and time_steps > 1:
+            times[-1] = time_steps
+
+        noise = rng.uniform(-noise_level, noise_level, (stop - start, len(self.sensors), 2))
+        values = np.array([self.pressure_norm, self.flow_rate_norm]) + noise
+
+        data = {"Time": times}
+        for i, sensor in enumerate(self.sensors):
+            data[f"Pressure_{sensor}m"] = values[:, i, 0]
+            data[f"FlowRate_{sensor}m"] = values[:, i, 1]
+        return pd.DataFrame(data)
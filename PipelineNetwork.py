@@ -0,0 +1,357 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from DataHandler import write_frame
+from Metrics import METRICS
+from Pipeline import Pipeline
+from PressureWaveSimulator import FLOW_DECAY, FLOW_SURGE_FACTOR
+
+PRESSURE, FLOW = 0, 1  # Індекси каналів у тензорі даних
+
+
+class PipelineNetwork:
+    """
+    Клас для моделювання мережі трубопроводів із вузлами з'єднання та насосами.
+
+    Дані всіх ліній зберігаються в одному масиві форми лінії × сенсори × час × 2
+    (тиск, витрата). Лінії з меншою кількістю сенсорів доповнюються значеннями NaN,
+    тож генерація потоку й поширення подій виконуються одним векторним проходом
+    для всієї мережі, а не окремо для кожної лінії.
+    """
+
+    def __init__(self, wave_speed=1000.0, logger=None):
+        """
+        Ініціалізує об'єкт PipelineNetwork.
+
+        Parameters:
+        - wave_speed (float): Швидкість поширення хвилі тиску (м/с).
+        - logger: Об'єкт Logger для запису подій (None — без логування).
+        """
+        self.wave_speed = wave_speed
+        self.logger = logger
+        self.lines = []  # Назви ліній у порядку першого виміру тензора
+        self.pipelines = []
+        self.pump_positions = []
+        self.junctions = []  # (лінія A, позиція на A, лінія B, позиція на B)
+        self.time = None
+        self.data = None  # Форма: лінії × сенсори × час × 2
+
+    def add_line(self, name, pipeline, pump_positions=()):
+        """
+        Додає лінію до мережі.
+
+        Parameters:
+        - name (str): Унікальна назва лінії.
+        - pipeline (Pipeline): Параметри лінії: довжина, діаметр, сенсори, нормальні тиск і витрата.
+        - pump_positions (list): Позиції насосів на лінії (у метрах).
+
+        Returns:
+        int: Індекс лінії в тензорі даних.
+        """
+        if name in self.lines:
+            raise ValueError(f"Лінія {name} вже є в мережі.")
+        self.lines.append(name)
+        self.pipelines.append(pipeline)
+        self.pump_positions.append(sorted(pump_positions))
+        self.data = None  # Розмір тензора змінився
+        return len(self.lines) - 1
+
+    def connect(self, line_a, position_a, line_b, position_b):
+        """
+        З'єднує дві лінії вузлом: точка position_a лінії line_a та точка position_b лінії line_b
+        вважаються однією точкою мережі, через яку проходить хвиля тиску.
+
+        Parameters:
+        - line_a (str): Назва першої лінії.
+        - position_a (float): Позиція вузла на першій лінії (у метрах).
+        - line_b (str): Назва другої лінії.
+        - position_b (float): Позиція вузла на другій лінії (у метрах).
+        """
+        for line, position in ((line_a, position_a), (line_b, position_b)):
+            length = self.pipelines[self.line_index(line)].length
+            if not 0 <= position <= length:
+                raise ValueError(f"Позиція вузла {position} м поза лінією {line} (довжина {length} м).")
+        self.junctions.append((line_a, float(position_a), line_b, float(position_b)))
+
+    def line_index(self, name):
+        """
+        Повертає індекс лінії за назвою.
+        """
+        try:
+            return self.lines.index(name)
+        except ValueError:
+            raise ValueError(f"Лінії {name} немає в мережі.") from None
+
+    @property
+    def max_sensors(self):
+        """
+        Кількість сенсорів найбільшої лінії (розмір другого виміру тензора).
+        """
+        return max((len(pipeline.sensors) for pipeline in self.pipelines), default=0)
+
+    def sensor_layout(self):
+        """
+        Будує доповнену таблицю позицій сенсорів.
+
+        Returns:
+        tuple: (positions, mask) — масиви форми лінії × сенсори з позиціями (NaN для доповнення)
+        та ознакою наявного сенсора.
+        """
+        positions = np.full((len(self.pipelines), self.max_sensors), np.nan)
+        for i, pipeline in enumerate(self.pipelines):
+            positions[i, :len(pipeline.sensors)] = pipeline.sensors
+        return positions, ~np.isnan(positions)
+
+    def _pump_table(self):
+        """
+        Доповнена таблиця насосів: лінії × насоси (NaN для доповнення).
+        """
+        pumps = np.full((len(self.lines), max((len(p) for p in self.pump_positions), default=0)), np.nan)
+        for i, positions in enumerate(self.pump_positions):
+            pumps[i, :len(positions)] = positions
+        return pumps
+
+    @METRICS.timed("network.generate_normal_flow")
+    def generate_normal_flow(self, time_steps, noise_level, seed=None):
+        """
+        Генерує дані стабільного потоку для всіх ліній мережі одним викликом генератора.
+
+        Шкала часу збігається з Pipeline.generate_normal_flow.
+
+        Parameters:
+        - time_steps (int): Кількість часових кроків.
+        - noise_level (float): Амплітуда рівномірного шуму.
+        - seed (int | np.random.Generator | None): Зерно або генератор випадкових чисел.
+        """
+        if not self.pipelines:
+            raise ValueError("Мережа не містить жодної лінії.")
+        METRICS.add_rows("network.generate_normal_flow", time_steps * len(self.lines))
+        rng = np.random.default_rng(seed)
+        _, mask = self.sensor_layout()
+
+        norms = np.array([[pipeline.pressure_norm, pipeline.flow_rate_norm] for pipeline in self.pipelines])
+        noise = rng.uniform(-noise_level, noise_level, (len(self.lines), self.max_sensors, time_steps, 2))
+        self.data = norms[:, None, None, :] + noise
+        self.data[~mask] = np.nan
+        self.time = np.linspace(0, time_steps, time_steps)
+
+    def event_distances(self, event_lines, event_positions, pumps=True):
+        """
+        Обчислює найкоротшу відстань від кожної події до кожного сенсора мережі.
+
+        Хвиля поширюється вздовж лінії та переходить на інші лінії через вузли; відстань
+        між лініями визначається найкоротшим шляхом у графі вузлів (алгоритм Флойда-Воршелла).
+        Якщо pumps=True, ділянка з насосом (включно з кінцями) непрохідна, як у
+        PressureWaveSimulator.apply_pressure_wave.
+
+        Parameters:
+        - event_lines (array-like): Індекси ліній подій.
+        - event_positions (array-like): Позиції подій на лініях (у метрах).
+        - pumps (bool): Чи зупиняють насоси хвилю.
+
+        Returns:
+        np.ndarray: Відстані форми події × лінії × сенсори (inf — сенсор недосяжний або доповнення).
+        """
+        event_lines = np.atleast_1d(np.asarray(event_lines, dtype=np.int64))
+        event_positions = np.atleast_1d(np.asarray(event_positions, dtype=float))
+        sensor_positions, mask = self.sensor_layout()
+        pump_table = self._pump_table() if pumps else np.empty((len(self.lines), 0))
+
+        def leg(lines_from, positions_from, lines_to, positions_to):
+            # Відстань уздовж однієї лінії; inf, якщо лінії різні або на ділянці є насос
+            lower = np.minimum(positions_from, positions_to)
+            upper = np.maximum(positions_from, positions_to)
+            line_pumps = pump_table[lines_from]
+            blocked = ((line_pumps >= lower[..., None]) & (line_pumps <= upper[..., None])).any(axis=-1)
+            return np.where((lines_from == lines_to) & ~blocked, upper - lower, np.inf)
+
+        sensor_lines = np.broadcast_to(np.arange(len(self.lines))[:, None], sensor_positions.shape)
+        # Пряма відстань уздовж лінії події: події × лінії × сенсори
+        distances = leg(event_lines[:, None, None], event_positions[:, None, None],
+                        sensor_lines[None], sensor_positions[None])
+
+        if self.junctions:
+            node_lines = np.array([[self.line_index(a), self.line_index(b)] for a, _, b, _ in self.junctions]).ravel()
+            node_positions = np.array([[pa, pb] for _, pa, _, pb in self.junctions]).ravel()
+
+            # Граф вузлів: ребра вздовж ліній та нульові ребра між кінцями одного з'єднання
+            graph = leg(node_lines[:, None], node_positions[:, None], node_lines[None, :], node_positions[None, :])
+            pairs = np.arange(0, len(node_lines), 2)
+            graph[pairs, pairs + 1] = graph[pairs + 1, pairs] = 0.0
+            for k in range(len(node_lines)):
+                graph = np.minimum(graph, graph[:, k, None] + graph[None, k, :])
+
+            to_nodes = leg(event_lines[:, None], event_positions[:, None], node_lines[None, :], node_positions[None, :])
+            from_nodes = leg(node_lines[:, None, None], node_positions[:, None, None],
+                             sensor_lines[None], sensor_positions[None])
+            via = (to_nodes[:, :, None] + graph[None]).min(axis=1)  # Події × вузли (вихідні)
+            through = (via[:, :, None, None] + from_nodes[None]).min(axis=1)
+            distances = np.minimum(distances, through)
+
+        distances[:, ~mask] = np.inf
+        return distances
+
+    def _require_data(self):
+        if self.data is None:
+            raise ValueError("Дані мережі ще не згенеровані.")
+
+    @METRICS.timed("network.apply_pressure_waves")
+    def apply_pressure_waves(self, event_lines, event_positions, pressure_increases, start_times=None):
+        """
+        Моделює поширення сплесків тиску по всій мережі за один векторний прохід.
+
+        Внески накладаються так само, як у PressureWaveSimulator.apply_pressure_waves:
+        крок надходження — ціла частина затримки, до витрати додається частка сплеску.
+
+        Parameters:
+        - event_lines (array-like): Назви або індекси ліній подій.
+        - event_positions (array-like): Позиції сплесків на лініях (у метрах).
+        - pressure_increases (array-like або float): Величини сплесків тиску (атм).
+        - start_times (array-like або float): Кроки часу початку сплесків; за замовчуванням 0.
+        """
+        self._require_data()
+        event_lines = self._resolve_lines(event_lines)
+        event_count = len(event_lines)
+        lines, sensors, time_steps, _ = self.data.shape
+        METRICS.add_rows("network.apply_pressure_waves", time_steps * lines)
+        if event_count == 0:
+            return
+        pressure_increases = np.broadcast_to(np.asarray(pressure_increases, dtype=float), (event_count,))
+        start_times = np.broadcast_to(np.asarray(0 if start_times is None else start_times, dtype=float), (event_count,))
+
+        delays = self.event_distances(event_lines, event_positions) / self.wave_speed
+        arrival = np.floor(start_times[:, None, None] + delays)  # inf для недосяжних сенсорів
+        valid = np.isfinite(arrival) & (arrival >= 0) & (arrival < time_steps)
+
+        event_index, line_index, sensor_index = np.nonzero(valid)
+        flat = (line_index * sensors + sensor_index) * time_steps + arrival[valid].astype(np.int64)
+        surge = np.bincount(flat, weights=pressure_increases[event_index], minlength=lines * sensors * time_steps)
+        surge = surge.reshape(lines, sensors, time_steps)
+        self.data[..., PRESSURE] += surge
+        self.data[..., FLOW] += surge * FLOW_SURGE_FACTOR
+
+        self._log(f"Застосовано {event_count} сплеск(ів) тиску до мережі з {lines} ліній: "
+                  f"сплеск досяг {int(valid.sum())} пар сенсор-подія.")
+
+    @METRICS.timed("network.apply_long_term_failures")
+    def apply_long_term_failures(self, event_lines, event_positions, pressure_decrease_rates):
+        """
+        Моделює довготривалі аварії на лініях мережі за один векторний прохід.
+
+        Результат збігається з послідовними викликами
+        PressureWaveSimulator.apply_long_term_failure для кожної аварії: після надходження
+        хвилі кожна аварія знижує тиск на свою швидкість (з обмеженням знизу нулем)
+        і множить витрату на FLOW_DECAY. Як і в симуляторі, насоси довготривалу аварію не зупиняють.
+
+        Parameters:
+        - event_lines (array-like): Назви або індекси ліній аварій.
+        - event_positions (array-like): Позиції аварій на лініях (у метрах).
+        - pressure_decrease_rates (array-like або float): Швидкості падіння тиску (атм за одиницю часу).
+        """
+        self._require_data()
+        event_lines = self._resolve_lines(event_lines)
+        event_count = len(event_lines)
+        lines, sensors, time_steps, _ = self.data.shape
+        METRICS.add_rows("network.apply_long_term_failures", time_steps * lines)
+        if event_count == 0:
+            return
+        rates = np.broadcast_to(np.asarray(pressure_decrease_rates, dtype=float), (event_count,))
+        if (rates < 0).any():
+            raise ValueError("Швидкість падіння тиску не може бути від'ємною.")
+
+        # Перший крок t, на якому t >= затримки
+        arrival = np.ceil(self.event_distances(event_lines, event_positions, pumps=False) / self.wave_speed)
+        valid = np.isfinite(arrival) & (arrival < time_steps)
+
+        event_index, line_index, sensor_index = np.nonzero(valid)
+        flat = (line_index * sensors + sensor_index) * time_steps + np.maximum(arrival[valid], 0).astype(np.int64)
+        size = lines * sensors * time_steps
+        decrease = np.bincount(flat, weights=rates[event_index], minlength=size).reshape(lines, sensors, time_steps)
+        arrived = np.bincount(flat, minlength=size).reshape(lines, sensors, time_steps)
+        decrease = np.cumsum(decrease, axis=2)
+        arrived = np.cumsum(arrived, axis=2)
+
+        # Послідовні зниження з обмеженням нулем дорівнюють одному зниженню на суму швидкостей
+        pressure = self.data[..., PRESSURE]
+        lowered = np.maximum(pressure - decrease, 0.0)
+        self.data[..., PRESSURE] = np.where(arrived > 0, lowered, pressure)
+        self.data[..., FLOW] *= FLOW_DECAY ** arrived
+
+        self._log(f"Довготривалі аварії ({event_count}) застосовано до мережі з {lines} ліній.")
+
+    def _resolve_lines(self, event_lines):
+        """
+        Перетворює назви ліній на індекси.
+        """
+        return np.array([self.line_index(line) if isinstance(line, str) else int(line)
+                         for line in np.atleast_1d(np.asarray(event_lines, dtype=object))], dtype=np.int64)
+
+    def _log(self, message):
+        if self.logger is not None:
+            self.logger.log(message)
+
+    def line_frame(self, line):
+        """
+        Повертає дані лінії у форматі Pipeline: Time, Pressure_{сенсор}m, FlowRate_{сенсор}m.
+
+        Parameters:
+        - line (str | int): Назва або індекс лінії.
+
+        Returns:
+        pd.DataFrame: Дані лінії.
+        """
+        self._require_data()
+        index = self.line_index(line) if isinstance(line, str) else line
+        sensors = self.pipelines[index].sensors
+        values = self.data[index, :len(sensors)]
+        data = {"Time": self.time}
+        for i, sensor in enumerate(sensors):
+            data[f"Pressure_{sensor}m"] = values[i, :, PRESSURE]
+            data[f"FlowRate_{sensor}m"] = values[i, :, FLOW]
+        return pd.DataFrame(data)
+
+    def to_frames(self):
+        """
+        Повертає дані всіх ліній у форматі Pipeline.
+
+        Returns:
+        dict: Назва лінії → pd.DataFrame.
+        """
+        return {name: self.line_frame(index) for index, name in enumerate(self.lines)}
+
+    def save_frames(self, directory, extension=".csv"):
+        """
+        Зберігає дані кожної лінії в окремий файл {directory}/{назва}{extension}.
+
+        Parameters:
+        - directory (str): Каталог для файлів.
+        - extension (str): Розширення (формат) файлів: .csv, .parquet або .npy.
+
+        Returns:
+        list: Шляхи до збережених файлів.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for name, frame in self.to_frames().items():
+            path = os.path.join(directory, f"{name}{extension}")
+            write_frame(frame, path)
+            paths.append(path)
+        return paths
+
+
+if __name__ == "__main__":
+    # Приклад: магістраль із двома відгалуженнями
+    network = PipelineNetwork(wave_speed=1000)
+    network.add_line("main", Pipeline(300_000, 1.02, [0, 100_000, 250_000, 300_000], 34.0, 3.5), pump_positions=[250_000])
+    network.add_line("branch_a", Pipeline(80_000, 0.72, [0, 40_000, 80_000], 30.0, 1.2))
+    network.add_line("branch_b", Pipeline(120_000, 0.72, [0, 60_000, 120_000], 28.0, 1.0))
+    network.connect("main", 100_000, "branch_a", 0)
+    network.connect("main", 200_000, "branch_b", 0)
+
+    network.generate_normal_flow(time_steps=500, noise_level=0.01, seed=42)
+    network.apply_long_term_failures(["branch_a", "main"], [60_000, 150_000], 0.1)
+    network.apply_pressure_waves("branch_b", 90_000, 1.5, start_times=10)
+    for name, frame in network.to_frames().items():
+        print(f"Лінія {name}: {frame.shape[0]} рядків, {frame.shape[1] - 1} стовпців сенсорів.")
@@ -1,6 +1,33 @@
 import pandas as pd
 import numpy as np
 
+from Metrics import METRICS
+from SensorFrame import SensorFrame
+
+DELTA_THRESHOLD = 0.04  # Поріг дельти тиску для логування (атм)
+FLOW_DECAY = 0.95  # Коефіцієнт падіння витрати під час довготривалої аварії
+FLOW_SURGE_FACTOR = 0.01  # Частка сплеску тиску, що передається на витрату
+
+
+def pumps_between(pump_positions, lower, upper):
+    """
+    Перевіряє, чи лежить хоча б один насос на відрізку [lower, upper] (включно з кінцями).
+
+    Це правило блокування хвилі насосом: сенсор, що стоїть точно на насосі, хвилю не отримує.
+    Наявність насоса визначається бінарним пошуком (аналог bisect_left/bisect_right)
+    у відсортованому списку насосів.
+
+    Parameters:
+    - pump_positions (list): Позиції насосів (у метрах).
+    - lower (array-like): Початки відрізків.
+    - upper (array-like): Кінці відрізків (не менші за відповідні початки).
+
+    Returns:
+    np.ndarray: Ознака наявності насоса для кожного відрізка.
+    """
+    pumps = np.sort(np.asarray(pump_positions, dtype=float))
+    return np.searchsorted(pumps, upper, side="right") > np.searchsorted(pumps, lower, side="left")
+
 class PressureWaveSimulator:
     """
     Клас для моделювання поширення сплесків тиску в трубопроводі та моделювання аварійних подій.
@@ -22,7 +49,9 @@ class PressureWaveSimulator:
         self.wave_speed = wave_speed  # Швидкість поширення хвилі тиску
         self.pump_positions = pump_positions  # Позиції насосів
         self.logger = logger  # Логер для запису подій
+        self.events = []  # Застосовані події (для розмітки аномалій, див. label_anomalies)
 
+    @METRICS.timed("simulator.apply_pressure_wave")
     def apply_pressure_wave(self, event_position, pressure_increase):
         """
         Моделює поширення сплеску тиску між сенсорами.
@@ -31,58 +60,314 @@ class PressureWaveSimulator:
         - event_position: позиція сплеску (у метрах).
         - pressure_increase: величина сплеску тиску.
         """
-        time_steps = len(self.data_handler.data)
+        data = self.data_handler.data
+        time_steps = len(data)
+        METRICS.add_rows("simulator.apply_pressure_wave", time_steps)
+        available = set(self._available_sensors(data))
+        self.events.append({"kind": "pressure_wave", "position": event_position, "start_time": 0, "fractional": False})
 
         for sensor in self.sensors:
             distance = abs(event_position - sensor)
             time_delay = distance / self.wave_speed  # Час затримки у секундах
 
-            # Визначення сегменту труби
-            segment = f"між {min(event_position, sensor)} м і {max(event_position, sensor)} м"
-
             # Якщо є насос на шляху, хвиля не поширюється далі
             if any(pump <= max(event_position, sensor) and pump >= min(event_position, sensor) for pump in self.pump_positions):
-                self.logger.log(f"Сплеск зупинено насосом на сегменті {segment}.")
+                self.logger.log("Сплеск зупинено насосом на сегменті між %s м і %s м.",
+                                min(event_position, sensor), max(event_position, sensor))
                 continue
 
             # Визначаємо найближчий крок часу для затримки
             time_index = int(time_delay)
             if time_index < time_steps:
-                self.logger.log(f"Сплеск тиску на {pressure_increase} атм досягає сенсора {sensor} м через {time_delay:.2f} секунд на сегменті {segment}.")
-                if f"Pressure_{sensor}m" in self.data_handler.data.columns:
-                    self.data_handler.data.loc[time_index, f"Pressure_{sensor}m"] += pressure_increase
+                self.logger.log("Сплеск тиску на %s атм досягає сенсора %s м через %.2f секунд на сегменті між %s м і %s м.",
+                                pressure_increase, sensor, time_delay, min(event_position, sensor), max(event_position, sensor))
+                if sensor not in available:
+                    continue
+                if isinstance(data, SensorFrame):
+                    values = data.sensor(sensor)
+                    values[time_index, data.channel_index("Pressure")] += pressure_increase
+                    values[time_index, data.channel_index("FlowRate")] += pressure_increase * FLOW_SURGE_FACTOR
+                else:
+                    data.loc[time_index, f"Pressure_{sensor}m"] += pressure_increase
 
                     # Додатково впливаємо на витрату на відповідному сенсорі
-                    self.data_handler.data.loc[time_index, f"FlowRate_{sensor}m"] += pressure_increase * 0.01
+                    data.loc[time_index, f"FlowRate_{sensor}m"] += pressure_increase * FLOW_SURGE_FACTOR
+
+    def build_event_table(self, event_positions, sensors=None):
+        """
+        Будує таблицю затримок і блокування насосами для пар сенсор × подія.
+
+        Насос блокує хвилю, якщо лежить на відрізку між подією та сенсором (включно
+        з кінцями), див. pumps_between.
+
+        Parameters:
+        - event_positions (array-like): Позиції подій (у метрах).
+        - sensors (list): Позиції сенсорів; за замовчуванням усі сенсори симулятора.
+
+        Returns:
+        tuple: (time_delays, blocked) — масиви форми сенсори × події із затримками
+        у секундах та ознакою блокування хвилі насосом.
+        """
+        sensors = self.sensors if sensors is None else sensors
+        event_positions = np.asarray(event_positions, dtype=float)
+        sensor_positions = np.asarray(sensors, dtype=float)[:, None]
+
+        time_delays = np.abs(event_positions[None, :] - sensor_positions) / self.wave_speed
+
+        lower = np.minimum(event_positions[None, :], sensor_positions)
+        upper = np.maximum(event_positions[None, :], sensor_positions)
+
+        return time_delays, pumps_between(self.pump_positions, lower, upper)
 
+    @METRICS.timed("simulator.apply_pressure_waves")
+    def apply_pressure_waves(self, event_positions, pressure_increases, start_times=None, fractional_delay=False):
+        """
+        Моделює одночасне поширення багатьох сплесків тиску за один векторний прохід.
+
+        Внески всіх подій у стовпці тиску та витрати накладаються (сумуються).
+        Без fractional_delay крок надходження визначається відкиданням дробової
+        частини затримки, як у apply_pressure_wave. З fractional_delay сплеск
+        розподіляється між двома сусідніми кроками пропорційно дробовій частині.
+
+        Parameters:
+        - event_positions (array-like): Позиції сплесків (у метрах).
+        - pressure_increases (array-like або float): Величини сплесків тиску (атм).
+        - start_times (array-like або float): Кроки часу початку сплесків; за замовчуванням 0.
+        - fractional_delay (bool): Чи розподіляти сплеск між сусідніми кроками часу.
+        """
+        data = self.data_handler.data
+        time_steps = len(data)
+        METRICS.add_rows("simulator.apply_pressure_waves", time_steps)
+
+        event_positions = np.atleast_1d(np.asarray(event_positions, dtype=float))
+        event_count = len(event_positions)
+        pressure_increases = np.broadcast_to(np.asarray(pressure_increases, dtype=float), (event_count,))
+        start_times = np.broadcast_to(np.asarray(0 if start_times is None else start_times, dtype=float), (event_count,))
+        self.events.extend({"kind": "pressure_wave", "position": float(position), "start_time": float(start),
+                            "fractional": fractional_delay}
+                           for position, start in zip(event_positions, start_times))
+
+        sensors = self._available_sensors(data)
+        if not sensors or time_steps == 0 or event_count == 0:
+            return
+
+        time_delays, blocked = self.build_event_table(event_positions, sensors)
+        arrival_times = start_times[None, :] + time_delays  # Форма: сенсори × події
+        sensor_indices = np.broadcast_to(np.arange(len(sensors))[:, None], arrival_times.shape)
+
+        blocked_count = int(blocked.sum())
+
+        time_indices = np.floor(arrival_times).astype(np.int64)
+        if fractional_delay:
+            fractions = arrival_times - time_indices
+            time_indices = np.stack([time_indices, time_indices + 1])
+            weights = np.stack([1 - fractions, fractions]) * pressure_increases
+            sensor_indices = np.stack([sensor_indices, sensor_indices])
+            blocked = np.stack([blocked, blocked])
+        else:
+            weights = np.broadcast_to(pressure_increases, arrival_times.shape)
+
+        valid = ~blocked & (time_indices >= 0) & (time_indices < time_steps)
+
+        # Накладання всіх внесків у плоский масив час × сенсори
+        flat_indices = time_indices[valid] * len(sensors) + sensor_indices[valid]
+        surge = np.bincount(flat_indices, weights=weights[valid], minlength=time_steps * len(sensors))
+        surge = surge.reshape(time_steps, len(sensors))
+
+        pressure, flow = self._read_channels(data, sensors)
+        self._write_channels(data, sensors, pressure + surge, flow + surge * FLOW_SURGE_FACTOR)
+
+        self.logger.log(
+            "Застосовано %d сплеск(ів) тиску до %d сенсор(ів): %d пар сенсор-подія зупинено насосами.",
+            event_count, len(sensors), blocked_count
+        )
+
+    @METRICS.timed("simulator.apply_long_term_failure")
     def apply_long_term_failure(self, event_position, pressure_decrease_rate):
         """
         Моделює довготривалу аварію з поступовим падінням тиску.
 
+        Усі сенсори й часові кроки обробляються цілими масивами: маска надходження
+        хвилі, падіння тиску з обмеженням знизу нулем, падіння витрати та перевірка
+        порогу дельт. Перевищення порогу записуються в лог одним зведеним повідомленням.
+
         Parameters:
         - event_position: позиція аварії (у метрах).
         - pressure_decrease_rate: швидкість падіння тиску (атм за одиницю часу).
         """
         # Ресет індексів для забезпечення послідовності
-        self.data_handler.data.reset_index(drop=True, inplace=True)
-        time_steps = len(self.data_handler.data)
-        self.logger.log(f"Довготривала аварія виявлена на {event_position} м.")
+        if not isinstance(self.data_handler.data, SensorFrame):
+            self.data_handler.data.reset_index(drop=True, inplace=True)
+        data = self.data_handler.data
+        time_steps = len(data)
+        METRICS.add_rows("simulator.apply_long_term_failure", time_steps)
+        self.logger.log("Довготривала аварія виявлена на %s м.", event_position)
+        self.events.append({"kind": "long_term_failure", "position": event_position, "start_time": 0,
+                            "pressure_decrease_rate": pressure_decrease_rate})
 
-        for sensor in self.sensors:
-            distance = abs(event_position - sensor)
-            time_delay = distance / self.wave_speed  # Час затримки у секундах
+        sensors = self._available_sensors(data)
+        if not sensors or time_steps == 0:
+            return
 
-            for t in range(time_steps):
-                if t >= time_delay:
-                    if t in self.data_handler.data.index and f"Pressure_{sensor}m" in self.data_handler.data.columns:
-                        self.data_handler.data.loc[t, f"Pressure_{sensor}m"] -= pressure_decrease_rate
-                        if self.data_handler.data.loc[t, f"Pressure_{sensor}m"] < 0:
-                            self.data_handler.data.loc[t, f"Pressure_{sensor}m"] = 0  # Мінімальний тиск
+        # Час затримки у секундах для кожного сенсора
+        time_delays = np.abs(event_position - np.asarray(sensors, dtype=float)) / self.wave_speed
 
-                        # Падіння витрати
-                        self.data_handler.data.loc[t, f"FlowRate_{sensor}m"] *= 0.95
+        # Маска надходження: True, якщо хвиля досягла сенсора на кроці t (форма: час × сенсори)
+        arrived = np.arange(time_steps)[:, None] >= time_delays[None, :]
+
+        pressure, flow = self._read_channels(data, sensors)
+
+        decreased = pressure - pressure_decrease_rate
+        decreased[decreased < 0] = 0  # Мінімальний тиск
+        pressure = np.where(arrived, decreased, pressure)
+
+        # Падіння витрати
+        flow = np.where(arrived, flow * FLOW_DECAY, flow)
+
+        self._write_channels(data, sensors, pressure, flow)
+
+        # Дельти тиску відносно попереднього кроку (на першому кроці дельта нульова)
+        deltas = np.zeros_like(pressure)
+        deltas[1:] = np.diff(pressure, axis=0)
+        exceeded = arrived & (np.abs(deltas) > DELTA_THRESHOLD)
+        if exceeded.any():
+            self._log_delta_exceedances(sensors, deltas, exceeded)
+
+    def arrival_windows(self, time_steps, sensors=None, events=None):
+        """
+        Обчислює для кожної пари сенсор × подія вікно кроків часу [start, stop), у якому подія впливає на сенсор.
+
+        Вікна відповідають тому, як події змінюють дані: довготривала аварія діє
+        на сенсор від першого кроку t >= затримки до кінця даних; сплеск тиску
+        діє на кроці floor(початок + затримка) (з fractional_delay — ще й на
+        наступному) і не доходить до сенсора, якщо на відрізку є насос.
+
+        Parameters:
+        - time_steps (int): Кількість кроків часу.
+        - sensors (list): Позиції сенсорів; за замовчуванням усі сенсори симулятора.
+        - events (list): Події у форматі self.events; за замовчуванням застосовані події.
+
+        Returns:
+        tuple: (start, stop) — цілі масиви форми сенсори × події в межах [0, time_steps];
+        вікно порожнє, якщо start == stop.
+        """
+        sensors = self.sensors if sensors is None else sensors
+        events = self.events if events is None else events
+        time_delays, blocked = self.build_event_table([event["position"] for event in events], sensors)
+        arrival_times = np.array([event["start_time"] for event in events], dtype=float)[None, :] + time_delays
+
+        long_term = np.array([event["kind"] == "long_term_failure" for event in events], dtype=bool)[None, :]
+        fractional = np.array([event.get("fractional", False) for event in events], dtype=bool)[None, :]
+        wave_start = np.floor(arrival_times)
+        wave_stop = wave_start + 1 + (fractional & (arrival_times > wave_start))
+
+        start = np.where(long_term, np.ceil(arrival_times), wave_start)
+        stop = np.where(long_term, time_steps, np.where(blocked, wave_start, wave_stop))
+        start = np.clip(start, 0, time_steps).astype(np.int64)
+        stop = np.maximum(np.clip(stop, 0, time_steps).astype(np.int64), start)
+        return start, stop
+
+    def label_anomalies(self, per_sensor=False, column="Anomaly", events=None):
+        """
+        Розмічає кроки часу, на яких хоча б одна подія впливає хоча б на один сенсор.
+
+        Вікна з arrival_windows накладаються за один векторний прохід (різницевий
+        масив і кумулятивна сума по часу); кількість рядків даних не змінюється.
+        Мітка рядка записується в стовпець column (для нового стовпця — одразу після
+        Time), а з per_sensor також мітки кожного сенсора в стовпці {column}_{сенсор}m.
+
+        Parameters:
+        - per_sensor (bool): Чи записувати мітки окремих сенсорів.
+        - column (str): Назва стовпця мітки рядка.
+        - events (list): Події у форматі self.events; за замовчуванням застосовані події.
+
+        Returns:
+        np.ndarray: Мітки рядків (0 або 1).
+        """
+        data = self.data_handler.data
+        events = self.events if events is None else events
+        time_steps = len(data)
+        sensors = self._available_sensors(data)
+
+        labels = np.zeros((time_steps, len(sensors)), dtype=np.int64)
+        if sensors and events and time_steps:
+            start, stop = self.arrival_windows(time_steps, sensors, events)
+            sensor_indices = np.broadcast_to(np.arange(len(sensors))[:, None], start.shape)
+            # Різницевий масив (час + 1) × сенсори: +1 на початку вікна, -1 після його кінця
+            bounds = np.concatenate([start.ravel(), stop.ravel()]) * len(sensors) + np.tile(sensor_indices.ravel(), 2)
+            weights = np.concatenate([np.ones(start.size), -np.ones(stop.size)])
+            changes = np.bincount(bounds, weights=weights, minlength=(time_steps + 1) * len(sensors))
+            active = np.cumsum(changes.reshape(time_steps + 1, len(sensors))[:time_steps], axis=0)
+            labels = (active > 0).astype(np.int64)
+        rows = labels.any(axis=1).astype(np.int64)
+
+        if isinstance(data, SensorFrame):
+            data.extra[column] = rows
+            if per_sensor:
+                data.extra.update({f"{column}_{sensor}m": labels[:, i] for i, sensor in enumerate(sensors)})
+        else:
+            if column in data.columns:
+                data[column] = rows
+            else:
+                data.insert(1 if "Time" in data.columns else 0, column, rows)
+            if per_sensor:
+                for i, sensor in enumerate(sensors):
+                    data[f"{column}_{sensor}m"] = labels[:, i]
+
+        METRICS.count("simulator_labelled_rows_total", int(rows.sum()))
+        return rows
+
+    def _available_sensors(self, data):
+        """
+        Повертає сенсори симулятора, наявні в даних (pd.DataFrame або SensorFrame).
+        """
+        if isinstance(data, SensorFrame):
+            return [sensor for sensor in self.sensors if sensor in data]
+        return [sensor for sensor in self.sensors if f"Pressure_{sensor}m" in data.columns]
+
+    @staticmethod
+    def _read_channels(data, sensors):
+        """
+        Повертає масиви тиску та витрати (час × сенсори) для заданих сенсорів.
+        """
+        if isinstance(data, SensorFrame):
+            indices = data.sensor_indices(sensors)
+            return (data.values[:, indices, data.channel_index("Pressure")].astype(float),
+                    data.values[:, indices, data.channel_index("FlowRate")].astype(float))
+        return (data[[f"Pressure_{sensor}m" for sensor in sensors]].to_numpy(dtype=float),
+                data[[f"FlowRate_{sensor}m" for sensor in sensors]].to_numpy(dtype=float))
+
+    @staticmethod
+    def _write_channels(data, sensors, pressure, flow):
+        """
+        Записує масиви тиску та витрати (час × сенсори) назад у дані.
+        """
+        if isinstance(data, SensorFrame):
+            indices = data.sensor_indices(sensors)
+            data.values[:, indices, data.channel_index("Pressure")] = pressure
+            data.values[:, indices, data.channel_index("FlowRate")] = flow
+            return
+        data[[f"Pressure_{sensor}m" for sensor in sensors]] = pressure
+        data[[f"FlowRate_{sensor}m" for sensor in sensors]] = flow
+
+    def _log_delta_exceedances(self, sensors, deltas, exceeded):
+        """
+        Записує одне зведене повідомлення про перевищення порогу дельт тиску.
+
+        Parameters:
+        - sensors (list): Позиції сенсорів, що відповідають стовпцям масивів.
+        - deltas (np.ndarray): Дельти тиску (час × сенсори).
+        - exceeded (np.ndarray): Маска перевищень порогу (час × сенсори).
+        """
+        if not self.logger.is_enabled("INFO"):
+            return  # Зведення по сенсорах не будуємо, якщо повідомлення відфільтровано
+        counts = exceeded.sum(axis=0)
+        first_steps = exceeded.argmax(axis=0)
+        max_deltas = np.where(exceeded, np.abs(deltas), 0).max(axis=0)
 
-                        # Логування перевищення порогу дельт
-                        delta = self.data_handler.data.loc[t, f"Pressure_{sensor}m"] - self.data_handler.data.loc[t - 1, f"Pressure_{sensor}m"] if t > 0 else 0
-                        if abs(delta) > 0.04:
-                            self.logger.log(f"Дельта тиску на сенсорі {sensor} м перевищила поріг: {delta:.2f} атм на часі {t}.")
+        parts = [
+            "сенсор %s м: %d крок(ів), макс. %.2f атм, перший на часі %d" % (sensor, counts[i], max_deltas[i], first_steps[i])
+            for i, sensor in enumerate(sensors)
+            if counts[i]
+        ]
+        self.logger.log("Дельта тиску перевищила поріг %s атм: %s.", DELTA_THRESHOLD, "; ".join(parts))
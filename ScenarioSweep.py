@@ -0,0 +1,276 @@
+import argparse
+import concurrent.futures
+import itertools
+import json
+import os
+
+import numpy as np
+
+from DataHandler import DataHandler, write_frame
+from EventGenerator import EventGenerator
+from Logger import Logger
+from Pipeline import Pipeline
+from PressureWaveSimulator import PressureWaveSimulator
+from SimulationCache import SimulationCache, normal_flow
+
+# Параметри сценарію за замовчуванням (відповідають конфігурації Worker.py)
+DEFAULT_SCENARIO = {
+    "length": 300_000,
+    "diameter": 1.02,
+    "sensors": [0, 100_000, 250_000, 300_000],
+    "pressure_norm": 34.0,
+    "flow_rate_norm": 3.5,
+    "time_steps": 100,
+    "noise_level": 0.01,
+    "event_count": 5,
+    "pressure_decrease_rate": 0.1,
+    "wave_speed": 1000,
+    "pump_positions": [250_000],
+    "min_distance_from_sensors": 5000,
+    "min_event_separation": 0,
+}
+
+DISTRIBUTIONS = ("uniform", "randint", "choice")  # Підтримувані розподіли параметрів
+LIST_PARAMETERS = ("sensors", "pump_positions", "event_positions")  # Параметри, значення яких самі є списками
+
+
+def _is_distribution(value):
+    """
+    Перевіряє, чи задає значення розподіл, з якого параметр вибирається для кожного сценарію.
+    """
+    return isinstance(value, dict) and len(value) == 1 and next(iter(value)) in DISTRIBUTIONS
+
+
+def _draw(value, rng):
+    """
+    Вибирає значення параметра з розподілу або повертає фіксоване значення.
+
+    Parameters:
+    - value: Фіксоване значення або розподіл {"uniform": [low, high]},
+      {"randint": [low, high]} (межі включно) чи {"choice": [варіанти]}.
+    - rng (np.random.Generator): Генератор випадкових чисел сценарію.
+    """
+    if not _is_distribution(value):
+        return value
+    kind, arguments = next(iter(value.items()))
+    if kind == "uniform":
+        return float(rng.uniform(arguments[0], arguments[1]))
+    if kind == "randint":
+        return int(rng.integers(arguments[0], arguments[1] + 1))
+    return arguments[int(rng.integers(len(arguments)))]
+
+
+def expand_grid(grid, repeats=1):
+    """
+    Розгортає сітку параметрів у список специфікацій сценаріїв.
+
+    Списки у сітці задають осі декартового добутку; розподіли та фіксовані
+    значення переходять у специфікацію без змін і вибираються вже в процесі-виконавці.
+
+    Parameters:
+    - grid (dict): Параметри сценарію; відсутні параметри беруться з DEFAULT_SCENARIO.
+    - repeats (int): Кількість сценаріїв для кожної точки сітки.
+
+    Returns:
+    list: Специфікації сценаріїв.
+    """
+    axes = {}
+    for name, values in grid.items():
+        if name in LIST_PARAMETERS:
+            # Для списків позицій вісь сітки задається списком списків
+            if values and isinstance(values[0], list):
+                axes[name] = values
+        elif isinstance(values, list):
+            axes[name] = values
+
+    names = sorted(axes)
+    scenarios = []
+    for combination in itertools.product(*(axes[name] for name in names)):
+        spec = {**DEFAULT_SCENARIO, **grid, **dict(zip(names, combination))}
+        scenarios.extend(dict(spec) for _ in range(repeats))
+    return scenarios
+
+
+def run_scenario(index, spec, seed_sequence, output_dir, shard_format=".csv", log_dir=None, cache_dir=None):
+    """
+    Моделює один сценарій і записує його у власний файл (шард).
+
+    Усі випадкові величини сценарію беруться з незалежного потоку, породженого
+    seed_sequence, тому результат не залежить від кількості процесів і порядку виконання.
+    Якщо специфікація містить flow_seed, стабільний потік генерується з цього зерна,
+    а не з потоку сценарію: сценарії з однаковим flow_seed мають спільну основу, і
+    з кешем вона обчислюється один раз.
+
+    Parameters:
+    - index (int): Номер сценарію.
+    - spec (dict): Специфікація сценарію (див. expand_grid).
+    - seed_sequence (np.random.SeedSequence): Зерно потоку випадкових чисел сценарію.
+    - output_dir (str): Каталог для шардів.
+    - shard_format (str): Розширення файлу шарду: .csv, .parquet або .npy.
+    - log_dir (str): Каталог для логів сценаріїв; None — логи не зберігаються.
+    - cache_dir (str): Каталог кешу симуляцій (див. SimulationCache); None — без кешу.
+
+    Returns:
+    dict: Запис маніфесту для шарду.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    # Параметри вибираються у фіксованому порядку, щоб потік випадкових чисел був відтворюваним
+    params = {name: _draw(spec[name], rng) for name in sorted(spec) if name != "pressure_decrease_rate"}
+
+    log_file = os.devnull if log_dir is None else os.path.join(log_dir, f"shard_{index:06d}.log")
+    logger = Logger(log_file, level="ERROR" if log_dir is None else "INFO", console=False)
+
+    pipeline = Pipeline(
+        length=params["length"],
+        diameter=params["diameter"],
+        sensors=params["sensors"],
+        pressure_norm=params["pressure_norm"],
+        flow_rate_norm=params["flow_rate_norm"],
+    )
+    cache = None if cache_dir is None else SimulationCache(cache_dir)
+    flow_seed = int(params["flow_seed"]) if "flow_seed" in params else rng
+    base_key = normal_flow(pipeline, params["time_steps"], params["noise_level"], seed=flow_seed, cache=cache)
+    handler = DataHandler()
+
+    if "event_positions" in params:
+        event_positions = [int(position) for position in params["event_positions"]]
+    else:
+        event_generator = EventGenerator(
+            pipeline_length=params["length"],
+            sensors=params["sensors"],
+            min_distance_from_sensors=params["min_distance_from_sensors"],
+            logger=logger,
+            rng=rng,
+        )
+        event_positions = event_generator.generate_event_positions(
+            params["event_count"], min_separation=params["min_event_separation"]
+        ).tolist()
+    rates = [_draw(spec["pressure_decrease_rate"], rng) for _ in event_positions]
+
+    def simulate():
+        handler.data = pipeline.data
+        simulator = PressureWaveSimulator(
+            handler,
+            sensors=params["sensors"],
+            wave_speed=params["wave_speed"],
+            pump_positions=params["pump_positions"],
+            logger=logger,
+        )
+        for event_position, rate in zip(event_positions, rates):
+            simulator.apply_long_term_failure(event_position=event_position, pressure_decrease_rate=rate)
+        simulator.label_anomalies()
+        return handler.data
+
+    if cache is None:
+        simulate()
+    else:
+        handler.data, _ = cache.frame(
+            "long_term_failures", simulate, base=base_key, events=list(zip(event_positions, rates)),
+            sensors=params["sensors"], wave_speed=params["wave_speed"], pump_positions=params["pump_positions"],
+        )
+
+    shard = f"shard_{index:06d}{shard_format}"
+    write_frame(handler.data, os.path.join(output_dir, shard))
+    logger.close()
+
+    return {
+        "index": index,
+        "shard": shard,
+        "rows": len(handler.data),
+        "anomaly_rows": int(handler.data["Anomaly"].sum()),
+        "params": params,
+        "events": [{"position": position, "pressure_decrease_rate": rate}
+                   for position, rate in zip(event_positions, rates)],
+        "spawn_key": list(seed_sequence.spawn_key),
+    }
+
+
+def _run_scenario_star(arguments):
+    """
+    Розпаковує аргументи для виконання сценарію в пулі процесів.
+    """
+    return run_scenario(*arguments)
+
+
+def run_sweep(grid, output_dir, master_seed=0, repeats=1, max_workers=None, shard_format=".csv", log_dir=None,
+              cache_dir=None):
+    """
+    Запускає набір сценаріїв у пулі процесів і записує маніфест шардів.
+
+    Кожен сценарій отримує незалежний потік випадкових чисел, породжений від
+    головного зерна, тому повторний запуск з тим самим зерном відтворює набір
+    даних побітово незалежно від кількості процесів.
+
+    Parameters:
+    - grid (dict): Сітка або розподіли параметрів сценаріїв (див. expand_grid).
+    - output_dir (str): Каталог для шардів і маніфесту.
+    - master_seed (int): Головне зерно.
+    - repeats (int): Кількість сценаріїв для кожної точки сітки.
+    - max_workers (int): Кількість процесів; None — кількість ядер, 1 — без пулу процесів.
+    - shard_format (str): Розширення файлів шардів: .csv, .parquet або .npy.
+    - log_dir (str): Каталог для логів сценаріїв; None — логи не зберігаються.
+    - cache_dir (str): Каталог кешу симуляцій; None — без кешу.
+
+    Returns:
+    dict: Маніфест набору даних.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if log_dir is not None:
+        os.makedirs(log_dir, exist_ok=True)
+
+    scenarios = expand_grid(grid, repeats=repeats)
+    seed_sequences = np.random.SeedSequence(master_seed).spawn(len(scenarios))
+    tasks = [(index, spec, seed_sequences[index], output_dir, shard_format, log_dir, cache_dir)
+             for index, spec in enumerate(scenarios)]
+
+    if max_workers == 1:
+        shards = [_run_scenario_star(task) for task in tasks]
+    else:
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            shards = list(executor.map(_run_scenario_star, tasks, chunksize=chunksize))
+
+    manifest = {
+        "master_seed": master_seed,
+        "scenario_count": len(scenarios),
+        "shard_format": shard_format,
+        "rows": sum(shard["rows"] for shard in shards),
+        "shards": shards,
+    }
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    print(f"Згенеровано {len(scenarios)} сценаріїв, маніфест: {manifest_path}")
+    return manifest
+
+
+def main(argv=None):
+    """
+    Точка входу командного рядка для генерації набору сценаріїв.
+    """
+    parser = argparse.ArgumentParser(description="Паралельна генерація сценаріїв аварій на трубопроводі.")
+    parser.add_argument("--grid", help="JSON-файл із сіткою параметрів сценаріїв.")
+    parser.add_argument("--output-dir", default="Data/Sweep", help="Каталог для шардів і маніфесту.")
+    parser.add_argument("--seed", type=int, default=0, help="Головне зерно.")
+    parser.add_argument("--repeats", type=int, default=1, help="Кількість сценаріїв на точку сітки.")
+    parser.add_argument("--workers", type=int, default=None, help="Кількість процесів.")
+    parser.add_argument("--format", default=".csv", choices=[".csv", ".parquet", ".npy"], help="Формат шардів.")
+    parser.add_argument("--log-dir", default=None, help="Каталог для логів сценаріїв.")
+    parser.add_argument("--cache-dir", default=None, help="Каталог кешу симуляцій (див. SimulationCache).")
+    args = parser.parse_args(argv)
+
+    if args.grid:
+        with open(args.grid, encoding="utf-8") as file:
+            grid = json.load(file)
+    else:
+        grid = {"event_count": [1, 3, 5], "pressure_decrease_rate": {"uniform": [0.05, 0.2]}}
+
+    run_sweep(grid, args.output_dir, master_seed=args.seed, repeats=args.repeats,
+              max_workers=args.workers, shard_format=args.format, log_dir=args.log_dir,
+              cache_dir=args.cache_dir)
+
+
+if __name__ == "__main__":
+    main()
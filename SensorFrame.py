@@ -0,0 +1,271 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+CHANNELS = ("Pressure", "FlowRate")  # Канали сенсора в порядку третього виміру масиву
+TIME_COLUMN = "Time"
+
+_COLUMN_PATTERN = re.compile(r"^(Pressure|FlowRate)_(.+)m$")
+
+
+def _parse_sensor(label):
+    """
+    Перетворює позначку сенсора зі стовпця ("100000" у "Pressure_100000m") на позицію.
+
+    Ціле значення повертається як int, тож f"Pressure_{sensor}m" відтворює початкову назву стовпця.
+    """
+    try:
+        return int(label)
+    except ValueError:
+        return float(label)
+
+
+def _layout(columns):
+    """
+    Розбирає назви стовпців DataFrame на сенсори й канали.
+
+    Parameters:
+    - columns (list): Назви стовпців.
+
+    Returns:
+    tuple: (sensors, channels, value_columns, extra_columns) — сенсори в порядку першої появи,
+    наявні канали в порядку CHANNELS, стовпці значень у порядку сенсор × канал та інші стовпці (крім Time).
+    """
+    sensors, found, positions, extra_columns = [], set(), {}, []
+    for column in columns:
+        match = _COLUMN_PATTERN.match(str(column))
+        if match is None:
+            if column != TIME_COLUMN:
+                extra_columns.append(column)
+            continue
+        channel, sensor = match.group(1), _parse_sensor(match.group(2))
+        if sensor not in positions:
+            sensors.append(sensor)
+            positions[sensor] = {}
+        found.add(channel)
+        positions[sensor][channel] = column
+    channels = [channel for channel in CHANNELS if channel in found]
+
+    missing = [f"{channel}_{sensor}m" for sensor in sensors for channel in channels if channel not in positions[sensor]]
+    if missing:
+        raise ValueError(f"Відсутні стовпці {missing}: кожен сенсор повинен мати всі канали.")
+    value_columns = [positions[sensor][channel] for sensor in sensors for channel in channels]
+    return sensors, channels, value_columns, extra_columns
+
+
+class SensorFrame:
+    """
+    Клас для компактного зберігання даних сенсорів.
+
+    Значення зберігаються в одному суцільному масиві форми час × сенсори × канали
+    (канали — CHANNELS, наприклад тиск і витрата) разом із вектором Time та індексом
+    позицій сенсорів. Доступ до ряду сенсора чи каналу повертає представлення масиву
+    без копіювання і без форматування назв стовпців. Інші стовпці (наприклад, Anomaly)
+    зберігаються як окремі одновимірні масиви.
+    """
+
+    def __init__(self, time, sensors, values, channels=CHANNELS, extra=None):
+        """
+        Ініціалізує об'єкт SensorFrame.
+
+        Parameters:
+        - time (array-like): Вектор Time довжиною T.
+        - sensors (list): Позиції сенсорів (S).
+        - values (np.ndarray): Масив форми T × S × C.
+        - channels (tuple): Назви каналів (C).
+        - extra (dict): Інші стовпці: назва → масив довжиною T.
+        """
+        self.time = np.asarray(time, dtype=np.float64)
+        self.sensors = list(sensors)
+        self.channels = tuple(channels)
+        self.values = np.ascontiguousarray(values)
+        if self.values.shape != (len(self.time), len(self.sensors), len(self.channels)):
+            raise ValueError(f"Форма масиву {self.values.shape} не відповідає "
+                             f"{len(self.time)} крокам × {len(self.sensors)} сенсорам × {len(self.channels)} каналам.")
+        self.extra = {name: np.asarray(column) for name, column in (extra or {}).items()}
+        self._sensor_index = {sensor: i for i, sensor in enumerate(self.sensors)}
+        self._channel_index = {channel: i for i, channel in enumerate(self.channels)}
+
+    @classmethod
+    def empty(cls, time, sensors, channels=CHANNELS, dtype=np.float64):
+        """
+        Створює SensorFrame, заповнений нулями.
+        """
+        return cls(time, sensors, np.zeros((len(time), len(sensors), len(channels)), dtype=dtype), channels)
+
+    @classmethod
+    def from_frame(cls, data, dtype=np.float64):
+        """
+        Створює SensorFrame зі звичного DataFrame зі стовпцями Time, Pressure_{сенсор}m, FlowRate_{сенсор}m.
+
+        Сенсори йдуть у порядку першої появи у стовпцях. Стовпці, що не відповідають
+        жодному каналу, крім Time, переносяться в extra.
+
+        Parameters:
+        - data (pd.DataFrame): Дані.
+        - dtype: Тип значень (np.float64 або np.float32).
+
+        Returns:
+        SensorFrame: Дані у вигляді масиву час × сенсори × канали.
+        """
+        sensors, channels, value_columns, extra_columns = _layout(data.columns)
+        values = data[value_columns].to_numpy(dtype=dtype).reshape(len(data), len(sensors), len(channels))
+        time = data[TIME_COLUMN].to_numpy(dtype=np.float64) if TIME_COLUMN in data.columns \
+            else np.arange(len(data), dtype=np.float64)
+        return cls(time, sensors, values, channels, {column: data[column].to_numpy() for column in extra_columns})
+
+    @classmethod
+    def from_matrix(cls, columns, matrix, dtype=np.float64, dtypes=None):
+        """
+        Створює SensorFrame з матриці рядки × стовпці (наприклад, блоку .npy).
+
+        Parameters:
+        - columns (list): Назви стовпців матриці.
+        - matrix (np.ndarray): Значення.
+        - dtype: Тип значень сенсорів.
+        - dtypes (dict): Типи інших стовпців (назва → тип); за замовчуванням тип матриці.
+
+        Returns:
+        SensorFrame: Дані у вигляді масиву час × сенсори × канали.
+        """
+        columns = list(columns)
+        sensors, channels, value_columns, extra_columns = _layout(columns)
+        position = {column: i for i, column in enumerate(columns)}
+        values = matrix[:, [position[column] for column in value_columns]].astype(dtype, copy=False)
+        time = matrix[:, position[TIME_COLUMN]].astype(np.float64) if TIME_COLUMN in position \
+            else np.arange(len(matrix), dtype=np.float64)
+        extra = {column: matrix[:, position[column]].astype((dtypes or {}).get(column, matrix.dtype))
+                 for column in extra_columns}
+        return cls(time, sensors, values.reshape(len(matrix), len(sensors), len(channels)), channels, extra)
+
+    @property
+    def columns(self):
+        """
+        Назви стовпців у форматі DataFrame: Time, канали кожного сенсора, інші стовпці.
+        """
+        return [TIME_COLUMN] + [f"{channel}_{sensor}m" for sensor in self.sensors for channel in self.channels] + \
+               list(self.extra)
+
+    @property
+    def dtypes(self):
+        """
+        Типи стовпців у порядку columns (як DataFrame.dtypes).
+        """
+        dtypes = {TIME_COLUMN: self.time.dtype}
+        dtypes.update({column: self.values.dtype for column in self.columns[1:1 + self.values.shape[1] * self.values.shape[2]]})
+        dtypes.update({name: column.dtype for name, column in self.extra.items()})
+        return dtypes
+
+    def to_numpy(self, dtype=np.float64):
+        """
+        Повертає дані як матрицю рядки × стовпці у порядку columns.
+        """
+        matrix = np.empty((len(self), len(self.columns)), dtype=dtype)
+        matrix[:, 0] = self.time
+        width = len(self.sensors) * len(self.channels)
+        matrix[:, 1:1 + width] = self.values.reshape(len(self), width)
+        for i, column in enumerate(self.extra.values()):
+            matrix[:, 1 + width + i] = column
+        return matrix
+
+    def to_frame(self):
+        """
+        Перетворює дані на DataFrame зі стовпцями Time, Pressure_{сенсор}m, FlowRate_{сенсор}m.
+
+        Returns:
+        pd.DataFrame: Дані у звичному форматі.
+        """
+        data = {TIME_COLUMN: self.time}
+        for i, sensor in enumerate(self.sensors):
+            for c, channel in enumerate(self.channels):
+                data[f"{channel}_{sensor}m"] = self.values[:, i, c]
+        data.update(self.extra)
+        return pd.DataFrame(data)
+
+    def sensor_index(self, sensor):
+        """
+        Повертає індекс сенсора в другому вимірі масиву.
+        """
+        try:
+            return self._sensor_index[sensor]
+        except KeyError:
+            raise KeyError(f"Сенсора {sensor} м немає в даних.") from None
+
+    def sensor_indices(self, sensors):
+        """
+        Повертає масив індексів для списку сенсорів.
+        """
+        return np.array([self.sensor_index(sensor) for sensor in sensors], dtype=np.intp)
+
+    def channel_index(self, channel):
+        """
+        Повертає індекс каналу в третьому вимірі масиву.
+        """
+        try:
+            return self._channel_index[channel]
+        except KeyError:
+            raise KeyError(f"Каналу {channel} немає в даних.") from None
+
+    def sensor(self, sensor):
+        """
+        Представлення даних сенсора (час × канали) без копіювання.
+        """
+        return self.values[:, self.sensor_index(sensor), :]
+
+    def channel(self, channel):
+        """
+        Представлення каналу для всіх сенсорів (час × сенсори) без копіювання.
+        """
+        return self.values[:, :, self.channel_index(channel)]
+
+    def series(self, channel, sensor):
+        """
+        Представлення одного ряду (канал сенсора) без копіювання.
+        """
+        return self.values[:, self.sensor_index(sensor), self.channel_index(channel)]
+
+    @property
+    def pressure(self):
+        return self.channel("Pressure")
+
+    @property
+    def flow_rate(self):
+        return self.channel("FlowRate")
+
+    def rows(self, start, stop):
+        """
+        Представлення діапазону рядків [start, stop) без копіювання значень.
+        """
+        return SensorFrame(self.time[start:stop], self.sensors, self.values[start:stop], self.channels,
+                           {name: column[start:stop] for name, column in self.extra.items()})
+
+    def astype(self, dtype):
+        """
+        Повертає копію з іншим типом значень.
+        """
+        return SensorFrame(self.time.copy(), self.sensors, self.values.astype(dtype), self.channels,
+                           {name: column.copy() for name, column in self.extra.items()})
+
+    def copy(self):
+        """
+        Повертає незалежну копію.
+        """
+        return self.astype(self.values.dtype)
+
+    def __contains__(self, sensor):
+        return sensor in self._sensor_index
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def nbytes(self):
+        """
+        Обсяг пам'яті масивів (байт).
+        """
+        return self.time.nbytes + self.values.nbytes + sum(column.nbytes for column in self.extra.values())
+
+    def __repr__(self):
+        return (f"SensorFrame({len(self)} кроків × {len(self.sensors)} сенсорів × "
+                f"{len(self.channels)} каналів, {self.values.dtype})")
@@ -0,0 +1,321 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from Metrics import METRICS
+
+CACHE_DIR = "Data/Cache"
+CACHE_SIZE_LIMIT = 4 << 30  # Найбільший обсяг кешу на диску (байт)
+
+# Модулі, від яких залежать результати симуляції та ознаки: їх зміна робить кеш недійсним.
+# Worker і ScenarioSweep визначають функції simulate() записів worker_failures і long_term_failures
+SOURCE_FILES = ("Pipeline.py", "PressureWaveSimulator.py", "EventGenerator.py", "DataGenerator.py",
+                "FeatureEngine.py", "SensorFrame.py", "DataHandler.py", "Worker.py", "ScenarioSweep.py")
+
+_code_version = None
+
+
+def code_version():
+    """
+    Обчислює хеш вихідного коду модулів SOURCE_FILES (один раз за процес).
+
+    Returns:
+    str: Шістнадцятковий SHA-256.
+    """
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for name in SOURCE_FILES:
+            path = os.path.join(directory, name)
+            digest.update(name.encode())
+            if os.path.exists(path):
+                with open(path, "rb") as file:
+                    digest.update(file.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def _json_default(value):
+    """
+    Перетворює значення NumPy і генератори випадкових чисел на значення JSON для ключа кешу.
+    """
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.random.Generator):
+        return value.bit_generator.state
+    if isinstance(value, np.random.SeedSequence):
+        return {"entropy": value.entropy, "spawn_key": list(value.spawn_key)}
+    raise TypeError(f"Значення типу {type(value).__name__} не можна використати в ключі кешу.")
+
+
+class SimulationCache:
+    """
+    Клас для кешу результатів симуляції та похідних наборів даних на локальному диску.
+
+    Ключ запису — SHA-256 від виду запису, його параметрів і версії коду (code_version),
+    тож зміна конфігурації, зерна, подій чи коду симуляції дає новий ключ. Запис —
+    каталог із масивами .npy і meta.json; записи створюються атомарно (через тимчасовий
+    каталог) і можуть використовуватися кількома процесами одночасно. Коли обсяг кешу
+    перевищує size_limit, видаляються записи, які найдовше не використовувалися.
+    """
+    def __init__(self, directory=CACHE_DIR, size_limit=CACHE_SIZE_LIMIT):
+        """
+        Ініціалізує об'єкт SimulationCache.
+
+        Parameters:
+        - directory (str): Каталог кешу.
+        - size_limit (int): Найбільший обсяг кешу (байт).
+        """
+        self.directory = directory
+        self.size_limit = size_limit
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, kind, **parts):
+        """
+        Обчислює ключ запису.
+
+        Parameters:
+        - kind (str): Вид запису (наприклад, "normal_flow").
+        - parts: Параметри, від яких залежить результат.
+
+        Returns:
+        str: Шістнадцятковий SHA-256.
+        """
+        payload = json.dumps({"kind": kind, "code": code_version(), **parts}, sort_keys=True, default=_json_default)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def load(self, key, mmap_mode=None):
+        """
+        Повертає масиви та метадані запису або None, якщо запису немає.
+
+        Parameters:
+        - key (str): Ключ запису.
+        - mmap_mode (str): Режим відображення масивів у пам'ять (None — читання в пам'ять).
+
+        Returns:
+        tuple | None: (словник масивів, метадані).
+        """
+        entry = self._entry(key)
+        meta_path = os.path.join(entry, "meta.json")
+        try:
+            with open(meta_path, encoding="utf-8") as file:
+                meta = json.load(file)
+            arrays = {name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode=mmap_mode)
+                      for name in meta["arrays"]}
+            os.utime(meta_path)  # Час використання для витіснення найдавніших записів
+        except (FileNotFoundError, ValueError):
+            self._count(key, "miss", meta=None)
+            return None
+        self._count(key, "hit", meta)
+        return arrays, meta
+
+    def _count(self, key, result, meta):
+        if result == "hit":
+            self.hits += 1
+        else:
+            self.misses += 1
+        METRICS.count("cache_requests_total", result=result, kind=(meta or {}).get("kind", "unknown"))
+
+    def store(self, key, arrays, kind, meta=None, evict=True):
+        """
+        Зберігає масиви під ключем і витісняє давні записи, якщо кеш переповнено.
+
+        Parameters:
+        - key (str): Ключ запису.
+        - arrays (dict): Назва → np.ndarray.
+        - kind (str): Вид запису.
+        - meta (dict): Додаткові метадані (мають бути серіалізовані в JSON).
+        - evict (bool): Чи витісняти давні записи одразу. False — коли записи, збережені
+          раніше в тій самій задачі, ще потрібні (витіснення викликається після задачі, див. evict).
+
+        Returns:
+        str: Каталог запису.
+        """
+        entry = self._entry(key)
+        temporary = f"{entry}.tmp-{os.getpid()}"
+        os.makedirs(temporary, exist_ok=True)
+        size = 0
+        for name, values in arrays.items():
+            path = os.path.join(temporary, f"{name}.npy")
+            np.save(path, values)
+            size += os.path.getsize(path)
+        meta = {**(meta or {}), "kind": kind, "arrays": list(arrays), "bytes": size, "created": time.time()}
+        with open(os.path.join(temporary, "meta.json"), "w", encoding="utf-8") as file:
+            json.dump(meta, file, ensure_ascii=False, default=_json_default)
+        try:
+            os.rename(temporary, entry)
+        except OSError:
+            shutil.rmtree(temporary, ignore_errors=True)  # Інший процес уже зберіг той самий запис
+        METRICS.count("cache_bytes_written_total", size, kind=kind)
+        if evict:
+            self.evict()
+        return entry
+
+    def array_paths(self, key):
+        """
+        Повертає шляхи до масивів запису (None, якщо запису немає).
+        """
+        loaded = self.load(key, mmap_mode="r")
+        if loaded is None:
+            return None
+        entry = self._entry(key)
+        return {name: os.path.join(entry, f"{name}.npy") for name in loaded[1]["arrays"]}
+
+    def load_frame(self, key):
+        """
+        Повертає збережений DataFrame і метадані або None.
+        """
+        loaded = self.load(key)
+        if loaded is None:
+            return None
+        arrays, meta = loaded
+        data = pd.DataFrame(arrays["values"], columns=meta["columns"])
+        return data.astype(meta["dtypes"]), meta
+
+    def store_frame(self, key, data, kind, meta=None):
+        """
+        Зберігає DataFrame (значення як float64 та початкові типи стовпців).
+        """
+        meta = {**(meta or {}), "columns": list(data.columns),
+                "dtypes": {name: str(dtype) for name, dtype in data.dtypes.items()}}
+        return self.store(key, {"values": data.to_numpy(dtype=np.float64)}, kind, meta)
+
+    def frame(self, kind, compute, **parts):
+        """
+        Повертає DataFrame із кешу або обчислює та зберігає його.
+
+        Parameters:
+        - kind (str): Вид запису.
+        - compute (callable): Функція без аргументів, що обчислює DataFrame.
+        - parts: Параметри ключа.
+
+        Returns:
+        tuple: (DataFrame, ключ запису).
+        """
+        key = self.key(kind, **parts)
+        cached = self.load_frame(key)
+        if cached is not None:
+            return cached[0], key
+        data = compute()
+        self.store_frame(key, data, kind)
+        return data, key
+
+    def _entries(self):
+        """
+        Перелічує записи кешу: (час використання, обсяг, каталог).
+        """
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for prefix in os.scandir(self.directory):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if not entry.is_dir() or ".tmp-" in entry.name:
+                    continue
+                try:
+                    used = os.stat(os.path.join(entry.path, "meta.json")).st_mtime
+                    size = sum(item.stat().st_size for item in os.scandir(entry.path))
+                except FileNotFoundError:
+                    continue  # Запис видаляє інший процес
+                entries.append((used, size, entry.path))
+        return entries
+
+    def size(self):
+        """
+        Загальний обсяг записів кешу (байт).
+        """
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, keep=()):
+        """
+        Видаляє записи, які найдовше не використовувалися, доки обсяг кешу не стане меншим за size_limit.
+
+        Parameters:
+        - keep (iterable): Ключі записів, які не видаляються (наприклад, записи поточного навчання),
+          навіть якщо без них кеш залишається переповненим.
+
+        Returns:
+        int: Кількість видалених записів.
+        """
+        keep = set(keep)
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.size_limit:
+                break
+            if os.path.basename(path) in keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        if removed:
+            METRICS.count("cache_evictions_total", removed)
+        return removed
+
+    def clear(self):
+        """
+        Видаляє всі записи кешу.
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def pipeline_config(pipeline):
+    """
+    Параметри Pipeline, від яких залежить згенерований потік.
+    """
+    return {"length": pipeline.length, "diameter": pipeline.diameter, "sensors": list(pipeline.sensors),
+            "pressure_norm": pipeline.pressure_norm, "flow_rate_norm": pipeline.flow_rate_norm}
+
+
+def normal_flow(pipeline, time_steps, noise_level, seed=None, cache=None):
+    """
+    Генерує стабільний потік (Pipeline.generate_normal_flow) або бере його з кешу.
+
+    Якщо seed — генератор np.random.Generator, ключем є його стан; після влучання
+    в кеш стан генератора встановлюється таким, яким він був би після генерації,
+    тож подальші випадкові величини не змінюються. Без зерна кеш не використовується.
+
+    Parameters:
+    - pipeline (Pipeline): Трубопровід; результат записується в pipeline.data.
+    - time_steps (int): Кількість часових кроків.
+    - noise_level (float): Амплітуда рівномірного шуму.
+    - seed (int | np.random.Generator | None): Зерно або генератор випадкових чисел.
+    - cache (SimulationCache): Кеш; None — без кешу.
+
+    Returns:
+    str | None: Ключ запису кешу (None без кешу).
+    """
+    if cache is None or seed is None:
+        pipeline.generate_normal_flow(time_steps=time_steps, noise_level=noise_level, seed=seed)
+        return None
+
+    rng = seed if isinstance(seed, np.random.Generator) else None
+    key = cache.key("normal_flow", pipeline=pipeline_config(pipeline), time_steps=time_steps,
+                    noise_level=noise_level, seed=seed)
+    cached = cache.load_frame(key)
+    if cached is not None:
+        pipeline.data, meta = cached
+        if rng is not None:
+            rng.bit_generator.state = meta["rng_state"]
+        return key
+
+    pipeline.generate_normal_flow(time_steps=time_steps, noise_level=noise_level, seed=seed)
+    cache.store_frame(key, pipeline.data, "normal_flow",
+                      meta={"rng_state": rng.bit_generator.state} if rng is not None else None)
+    return key
@@ -0,0 +1,601 @@
+import asyncio
+import collections
+import concurrent.futures
+import heapq
+import json
+import math
+import time
+
+import numpy as np
+
+from DataHandler import read_sensor_frame
+from Metrics import METRICS, STAGE_SECONDS
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9900
+MAX_DATAGRAM = 65_507  # Найбільший корисний обсяг датаграми UDP (байт)
+READ_SIZE = 4096  # Обсяг одного читання з TCP-з'єднання (байт): ~146 записів в одному елементі черги
+REPLAY_BATCH_ROWS = 1024  # Найбільша кількість рядків в одному записі клієнта відтворення
+LATENCY_WINDOW = 10_000  # Кількість останніх рядків для статистики затримки
+UDP_DRAIN_QUIET = 0.05  # Під час зупинки сокет UDP закривається після такої паузи без датаграм (с)
+UDP_REPLAY_RATE = 2000.0  # Швидкість відправлення UDP без заданих speed і rate (рядків/с)
+UDP_LOSS_WARNING = 0.01  # Частка втрачених рядків UDP, вище якої результат навантажувального тесту недостовірний
+
+# Бінарний запис показу сенсора, як struct "<dIdd": час, позиція сенсора, тиск, витрата (28 байт)
+RECORD_DTYPE = np.dtype([("time", "<f8"), ("sensor", "<u4"), ("pressure", "<f8"), ("flow", "<f8")])
+
+
+def encode_json(time_value, sensor, pressure, flow):
+    """
+    Кодує показ сенсора як рядок JSON, що завершується символом нового рядка.
+    """
+    return (json.dumps({"time": time_value, "sensor": sensor, "pressure": pressure, "flow": flow}) + "\n").encode()
+
+
+def decode_json(line):
+    """
+    Декодує рядок JSON у масив з одного запису RECORD_DTYPE.
+    """
+    reading = json.loads(line)
+    return np.array([(reading["time"], reading["sensor"], reading["pressure"], reading["flow"])], dtype=RECORD_DTYPE)
+
+
+def decode_datagram(data):
+    """
+    Декодує датаграму UDP: рядки JSON (якщо починається з "{") або послідовність бінарних записів.
+
+    Returns:
+    np.ndarray: Записи RECORD_DTYPE.
+    """
+    if data[:1] == b"{":
+        lines = [line for line in data.split(b"\n") if line.strip()]
+        return np.concatenate([decode_json(line) for line in lines]) if lines else np.empty(0, RECORD_DTYPE)
+    if len(data) % RECORD_DTYPE.itemsize:
+        raise ValueError(f"Довжина датаграми {len(data)} не кратна розміру запису {RECORD_DTYPE.itemsize}.")
+    return np.frombuffer(data, dtype=RECORD_DTYPE)
+
+
+class RowAssembler:
+    """
+    Клас для збирання показів окремих сенсорів у рядки за часовими мітками.
+
+    Рядок передається далі, щойно отримано покази всіх сенсорів, або коли минув
+    max_wait секунд від першого показу (для сенсорів, що запізнюються, підставляється
+    останнє відоме значення). Рядки передаються в порядку часу: показ для вже
+    переданої часової мітки відкидається як запізнілий.
+    """
+    def __init__(self, sensors, max_wait=0.05):
+        """
+        Ініціалізує об'єкт RowAssembler.
+
+        Parameters:
+        - sensors (list): Позиції сенсорів.
+        - max_wait (float): Найбільший час очікування сенсорів, що запізнюються (с).
+        """
+        self.sensors = list(sensors)
+        self.max_wait = max_wait
+        self.columns = ["Time"] + [f"{channel}_{sensor}m" for sensor in self.sensors
+                                   for channel in ("Pressure", "FlowRate")]
+        self._index = {sensor: i for i, sensor in enumerate(self.sensors)}
+        self._pending = {}  # Часова мітка → [рядок, кількість сенсорів, час першого показу]
+        self._order = []  # Купа часових міток у _pending
+        self._last = np.zeros(2 * len(self.sensors))  # Останні відомі значення сенсорів
+        self._emitted_until = -np.inf
+        self.rows = 0
+        self.incomplete_rows = 0
+        self.late_readings = 0
+        self.unknown_readings = 0
+        self.invalid_readings = 0
+
+    def add(self, records, arrival):
+        """
+        Додає покази та повертає рядки, готові до оцінки.
+
+        Parameters:
+        - records (np.ndarray): Записи RECORD_DTYPE.
+        - arrival (float): Час отримання показів (time.monotonic()).
+
+        Returns:
+        list: Пари (рядок у порядку columns, час першого показу рядка).
+        """
+        sensor_count = len(self.sensors)
+        for time_value, sensor, pressure, flow in records.tolist():
+            index = self._index.get(sensor)
+            if index is None:
+                self.unknown_readings += 1
+                continue
+            if not math.isfinite(time_value):
+                self.invalid_readings += 1
+                continue
+            if time_value <= self._emitted_until:
+                self.late_readings += 1
+                continue
+            entry = self._pending.get(time_value)
+            if entry is None:
+                row = np.full(1 + 2 * sensor_count, np.nan)
+                row[0] = time_value
+                entry = self._pending[time_value] = [row, 0, arrival]
+                heapq.heappush(self._order, time_value)
+            row = entry[0]
+            if np.isnan(row[1 + 2 * index]):
+                entry[1] += 1
+            row[1 + 2 * index] = pressure
+            row[2 + 2 * index] = flow
+        return self.flush(arrival)
+
+    def flush(self, now, force=False):
+        """
+        Повертає найстаріші рядки, що зібрані повністю або чекали довше за max_wait.
+
+        Parameters:
+        - now (float): Поточний час (time.monotonic()).
+        - force (bool): Передати всі незавершені рядки (під час зупинки).
+
+        Returns:
+        list: Пари (рядок, час першого показу рядка).
+        """
+        ready = []
+        while self._order:
+            time_value = self._order[0]
+            row, filled, first = self._pending[time_value]
+            if filled < len(self.sensors) and not force and now - first < self.max_wait:
+                break
+            heapq.heappop(self._order)
+            del self._pending[time_value]
+            values = row[1:]
+            if filled < len(self.sensors):
+                self.incomplete_rows += 1
+                missing = np.isnan(values)
+                values[missing] = self._last[missing]
+            self._last = values.copy()
+            self._emitted_until = time_value
+            self.rows += 1
+            ready.append((row, first))
+        return ready
+
+    def next_deadline(self):
+        """
+        Час, коли найстаріший незавершений рядок потрібно передати без очікування (None — рядків немає).
+        """
+        if not self._order:
+            return None
+        return self._pending[self._order[0]][2] + self.max_wait
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    """
+    Приймає датаграми UDP. UDP не має керування потоком: коли черга заповнена, покази відкидаються.
+    """
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, address):
+        self.server.datagrams += 1
+        try:
+            records = decode_datagram(data)
+        except ValueError:
+            self.server.malformed += 1
+            return
+        try:
+            self.server._readings.put_nowait((records, time.monotonic()))
+        except asyncio.QueueFull:
+            self.server.dropped_readings += len(records)
+
+
+class TelemetryServer:
+    """
+    Клас для приймання показів сенсорів через локальні TCP/UDP і потокової оцінки моделлю.
+
+    Покази надходять як рядки JSON ({"time", "sensor", "pressure", "flow"}) або бінарні
+    записи RECORD_DTYPE. Етапи з'єднані обмеженими чергами: приймання → збирання рядків
+    (RowAssembler) → оцінка мікропакетами (StreamingScorer в окремому потоці). Коли оцінка
+    не встигає, черги заповнюються і TCP-з'єднання перестають читатися, тож відправник
+    сповільнюється (зворотний тиск); покази UDP у цьому разі відкидаються з підрахунком.
+    """
+    def __init__(self, scorer, sensors, host=DEFAULT_HOST, port=DEFAULT_PORT, udp_port=None, max_wait=0.05,
+                 batch_size=256, queue_size=256, on_result=None, report_interval=1.0):
+        """
+        Ініціалізує об'єкт TelemetryServer.
+
+        Parameters:
+        - scorer (StreamingScorer): Оцінювач, створений для стовпців RowAssembler.columns
+          (див. AnomalyChecker.scorer).
+        - sensors (list): Позиції сенсорів, з яких збираються рядки.
+        - host (str): Адреса для прослуховування.
+        - port (int): Порт TCP (None — без TCP).
+        - udp_port (int): Порт UDP (None — без UDP).
+        - max_wait (float): Найбільший час очікування сенсорів, що запізнюються (с).
+        - batch_size (int): Найбільша кількість рядків в одному виклику оцінки.
+        - queue_size (int): Місткість кожної черги між етапами (пакетів показів і рядків); обмежує
+          затримку під перевантаженням.
+        - on_result (callable): Викликається як on_result(rows, predictions) після кожного пакета.
+        - report_interval (float): Інтервал між звітами про пропускну здатність (с); None — без звітів.
+        """
+        self.scorer = scorer
+        self.assembler = RowAssembler(sensors, max_wait=max_wait)
+        self.host = host
+        self.port = port
+        self.udp_port = udp_port
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.on_result = on_result
+        self.report_interval = report_interval
+
+        self.scored_rows = 0
+        self.anomalies = 0
+        self.dropped_readings = 0
+        self.malformed = 0
+        self.datagrams = 0
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self._tcp = None
+        self._udp = None
+        self._tasks = []
+        self._connections = {}  # Задача обробки з'єднання → StreamWriter
+        self._executor = None
+        self._started = None
+
+    async def start(self):
+        """
+        Запускає прослуховування портів і етапи обробки.
+        """
+        self._readings = asyncio.Queue(self.queue_size)
+        self._rows = asyncio.Queue(self.queue_size)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)  # Оцінка не блокує приймання
+        self._started = time.monotonic()
+        self._tasks = [asyncio.create_task(self._assemble()), asyncio.create_task(self._score())]
+
+        loop = asyncio.get_running_loop()
+        if self.port is not None:
+            self._tcp = await asyncio.start_server(self._handle_tcp, self.host, self.port)
+            self.port = self._tcp.sockets[0].getsockname()[1]  # Фактичний порт, якщо задано 0
+        if self.udp_port is not None:
+            self._udp, _ = await loop.create_datagram_endpoint(lambda: _DatagramProtocol(self),
+                                                               local_addr=(self.host, self.udp_port))
+            self.udp_port = self._udp.get_extra_info("sockname")[1]
+        print(f"Сервер телеметрії слухає {self.host}: TCP {self.port}, UDP {self.udp_port}.")
+
+    async def stop(self, timeout=1.0):
+        """
+        Зупиняє приймання, передає всі незавершені рядки на оцінку та чекає завершення етапів.
+
+        Сокет UDP закривається лише після паузи UDP_DRAIN_QUIET без нових датаграм, щоб
+        прочитати датаграми, які вже надіслано, але ще не оброблено.
+
+        Parameters:
+        - timeout (float): Скільки чекати, доки відкриті TCP-з'єднання дочитають надіслані дані
+          і доки надходять датаграми UDP (с); None — без обмеження.
+        """
+        if self._tcp is not None:
+            self._tcp.close()
+            if self._connections:
+                await asyncio.wait(list(self._connections), timeout=timeout)
+            for writer in list(self._connections.values()):
+                writer.close()
+        if self._udp is not None:
+            started = time.monotonic()
+            while timeout is None or time.monotonic() - started < timeout:
+                received = self.datagrams
+                await asyncio.sleep(UDP_DRAIN_QUIET)
+                if self.datagrams == received:
+                    break
+            self._udp.close()
+        await self._readings.put(None)
+        await asyncio.gather(*self._tasks)
+        self._executor.shutdown()
+
+    async def run(self, duration=None):
+        """
+        Запускає сервер і обробляє дані до завершення duration секунд (None — до переривання).
+
+        Returns:
+        dict: Статистика роботи (див. stats).
+        """
+        await self.start()
+        try:
+            if duration is None:
+                await asyncio.Event().wait()
+            else:
+                await asyncio.sleep(duration)
+        finally:
+            await self.stop()
+        return self.stats()
+
+    async def _handle_tcp(self, reader, writer):
+        """
+        Обробляє TCP-з'єднання: формат визначається першим байтом ("{" — рядки JSON, інакше бінарні записи).
+        """
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            first = await reader.read(1)
+            if first == b"{":
+                pending = first
+                while True:
+                    line = pending + await reader.readline()
+                    pending = b""
+                    if not line.strip():
+                        if reader.at_eof():
+                            break
+                        continue
+                    try:
+                        records = decode_json(line)
+                    except (ValueError, KeyError):
+                        self.malformed += 1
+                        continue
+                    await self._readings.put((records, time.monotonic()))  # Чекає, доки в черзі є місце
+            else:
+                buffer = first
+                record_size = RECORD_DTYPE.itemsize
+                while True:
+                    data = await reader.read(READ_SIZE)
+                    if not data:
+                        break
+                    buffer += data
+                    complete = len(buffer) - len(buffer) % record_size
+                    if complete:
+                        records = np.frombuffer(buffer[:complete], dtype=RECORD_DTYPE)
+                        buffer = buffer[complete:]
+                        await self._readings.put((records, time.monotonic()))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def _assemble(self):
+        """
+        Етап збирання рядків: читає покази з черги та передає готові рядки на оцінку.
+        """
+        while True:
+            # Спершу забираємо покази, що вже чекають у черзі: інакше під навантаженням рядок
+            # вважався б незавершеним через затримку в самій черзі, а не через сенсор
+            try:
+                item = self._readings.get_nowait()
+            except asyncio.QueueEmpty:
+                deadline = self.assembler.next_deadline()
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+                try:
+                    item = await asyncio.wait_for(self._readings.get(), timeout)
+                except asyncio.TimeoutError:
+                    item = False
+            if item is False:
+                ready = self.assembler.flush(time.monotonic())
+            else:
+                if item is None:
+                    for row in self.assembler.flush(time.monotonic(), force=True):
+                        await self._rows.put(row)
+                    await self._rows.put(None)
+                    return
+                ready = self.assembler.add(*item)
+            for row in ready:
+                await self._rows.put(row)  # Зворотний тиск: чекає, доки оцінка звільнить місце
+
+    async def _score(self):
+        """
+        Етап оцінки: збирає доступні рядки в мікропакет і оцінює його в окремому потоці.
+        """
+        loop = asyncio.get_running_loop()
+        report_started, report_rows = None, 0  # Звітний інтервал починається з першого пакета
+        finished = False
+        while not finished:
+            batch = [await self._rows.get()]
+            while len(batch) < self.batch_size and not self._rows.empty():
+                batch.append(self._rows.get_nowait())
+            if batch[-1] is None:
+                batch.pop()
+                finished = True
+            if not batch:
+                continue
+
+            rows = np.stack([row for row, _ in batch])
+            predictions, _ = await loop.run_in_executor(self._executor, self.scorer.score, rows)
+            now = time.monotonic()
+            for _, first in batch:
+                latency = now - first
+                self._latencies.append(latency)
+                METRICS.observe(STAGE_SECONDS, latency, stage="telemetry.end_to_end")
+            METRICS.add_rows("telemetry.end_to_end", len(batch))
+            self.scored_rows += len(batch)
+            self.anomalies += int((predictions == 1).sum())
+            if self.on_result is not None:
+                self.on_result(rows, predictions)
+
+            if report_started is None:
+                report_started = batch[0][1]  # Час першого показу першого рядка
+            report_rows += len(batch)
+            if self.report_interval and now - report_started >= self.report_interval:
+                stats = self.stats()
+                print(f"Телеметрія: {report_rows / (now - report_started):.0f} рядків/с, "
+                      f"затримка p99 {stats['p99_ms']:.1f} мс, черги {self._readings.qsize()}/{self._rows.qsize()}, "
+                      f"відкинуто {self.dropped_readings}, аномалій {self.anomalies}.")
+                METRICS.set_gauge("telemetry_queue_depth", self._readings.qsize(), queue="readings")
+                METRICS.set_gauge("telemetry_queue_depth", self._rows.qsize(), queue="rows")
+                report_started, report_rows = now, 0
+
+    def stats(self):
+        """
+        Повертає статистику роботи сервера.
+
+        Returns:
+        dict: Кількість рядків, пропускна здатність, затримка від першого показу до оцінки (p50/p99)
+        та лічильники незавершених, запізнілих і відкинутих показів.
+        """
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        if self._latencies:
+            p50, p99 = np.percentile(np.fromiter(self._latencies, dtype=float), [50, 99]) * 1000
+        else:
+            p50 = p99 = None
+        return {
+            "rows": self.scored_rows,
+            "seconds": elapsed,
+            "rows_per_second": self.scored_rows / elapsed if elapsed else None,
+            "p50_ms": None if p50 is None else float(p50),
+            "p99_ms": None if p99 is None else float(p99),
+            "anomalies": self.anomalies,
+            "incomplete_rows": self.assembler.incomplete_rows,
+            "late_readings": self.assembler.late_readings,
+            "unknown_readings": self.assembler.unknown_readings,
+            "invalid_readings": self.assembler.invalid_readings,
+            "dropped_readings": self.dropped_readings,
+            "malformed": self.malformed,
+        }
+
+
+async def replay(data_path, host=DEFAULT_HOST, port=DEFAULT_PORT, speed=1.0, protocol="tcp", encoding="binary",
+                 rows=None, rate=None):
+    """
+    Відтворює файл симуляції як потік показів сенсорів із заданим прискоренням.
+
+    Інтервали між рядками беруться зі стовпця Time (секунди) і діляться на speed.
+    Через TCP відправник чекає, доки сервер прочитає дані (зворотний тиск), тож
+    фактична швидкість може бути нижчою за задану; звіт показує відставання.
+    UDP зворотного тиску не має: датаграми, які сервер не встиг прочитати, губляться
+    в буфері сокета. Тому через UDP без speed і rate рядки надсилаються зі швидкістю
+    UDP_REPLAY_RATE, а не якнайшвидше.
+
+    Частота в результаті — це швидкість відправлення на боці клієнта: дані, передані
+    в буфери сокета, ще не прочитані сервером, тож без пауз вона не відображає
+    пропускну здатність сервера (див. load_test).
+
+    Parameters:
+    - data_path (str): Файл даних (.csv, .parquet або .npy).
+    - host (str): Адреса сервера.
+    - port (int): Порт сервера (TCP або UDP відповідно до protocol).
+    - speed (float): Прискорення відносно реального часу (наприклад, 1–1000); None — без пауз.
+    - protocol (str): "tcp" або "udp".
+    - encoding (str): "binary" (записи RECORD_DTYPE) або "json".
+    - rows (tuple): Діапазон рядків файлу (start, stop); None — усі рядки.
+    - rate (float): Найбільша швидкість відправлення (рядків/с); None — без обмеження
+      (для UDP без speed — UDP_REPLAY_RATE).
+
+    Returns:
+    dict: Кількість рядків і показів, тривалість, частота відправлення рядків і найбільше відставання (с).
+    """
+    if speed is not None and speed <= 0:
+        raise ValueError("Прискорення має бути додатним.")
+    if rate is not None and rate <= 0:
+        raise ValueError("Швидкість відправлення має бути додатною.")
+    if protocol not in ("tcp", "udp"):
+        raise ValueError(f"Невідомий протокол: {protocol}")
+    if encoding not in ("binary", "json"):
+        raise ValueError(f"Невідоме кодування: {encoding}")
+
+    frame = read_sensor_frame(data_path, columns=["Time", "Pressure_*", "FlowRate_*"], rows=rows)
+    time_steps, sensor_count = len(frame), len(frame.sensors)
+    records = np.empty((time_steps, sensor_count), dtype=RECORD_DTYPE)
+    records["time"] = frame.time[:, None]
+    records["sensor"] = np.asarray(frame.sensors, dtype=np.uint32)[None, :]
+    records["pressure"] = frame.pressure
+    records["flow"] = frame.flow_rate
+
+    if encoding == "binary":
+        payloads = [row.tobytes() for row in records]
+    else:
+        payloads = [b"".join(encode_json(*reading) for reading in row.tolist()) for row in records]
+
+    loop = asyncio.get_running_loop()
+    if protocol == "tcp":
+        _, writer = await asyncio.open_connection(host, port)
+        send = writer.write
+    else:
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+        send = transport.sendto
+
+    if protocol == "udp" and not speed and rate is None:
+        rate = UDP_REPLAY_RATE
+    offsets = (frame.time - frame.time[0]) / speed if speed else np.zeros(time_steps)
+    if rate:
+        # Розклад за часом даних, але не швидше за rate рядків/с
+        offsets = np.maximum(offsets, np.arange(time_steps) / rate)
+    paced = bool(speed or rate)
+    started = time.monotonic()
+    lag, row = 0.0, 0
+    try:
+        while row < time_steps:
+            elapsed = time.monotonic() - started
+            if offsets[row] > elapsed:
+                await asyncio.sleep(offsets[row] - elapsed)
+                elapsed = time.monotonic() - started
+            if paced:
+                lag = max(lag, elapsed - offsets[row])
+
+            # Рядки, час яких уже настав, надсилаються пакетами до REPLAY_BATCH_ROWS рядків
+            stop = int(np.searchsorted(offsets, elapsed, side="right"))
+            stop = min(max(stop, row + 1), row + REPLAY_BATCH_ROWS, time_steps)
+            if protocol == "tcp":
+                send(b"".join(payloads[row:stop]))
+                await writer.drain()
+            else:
+                datagram = b""
+                for payload in payloads[row:stop]:
+                    if len(datagram) + len(payload) > MAX_DATAGRAM:
+                        send(datagram)
+                        datagram = b""
+                    datagram += payload
+                send(datagram)
+                await asyncio.sleep(0)
+            row = stop
+    finally:
+        if protocol == "tcp":
+            writer.close()
+            await writer.wait_closed()
+        else:
+            transport.close()
+
+    seconds = time.monotonic() - started
+    result = {"rows": time_steps, "readings": time_steps * sensor_count, "seconds": seconds,
+              "send_rows_per_second": time_steps / seconds if seconds else None, "max_lag_seconds": float(lag)}
+    message = f"Клієнт надіслав {time_steps} рядків за {seconds:.2f} с"
+    if paced:
+        message += f", найбільше відставання від розкладу {lag:.3f} с"
+    print(message + " (швидкість відправлення, а не обробки сервером).")
+    return result
+
+
+async def load_test(data_path, checker, speed=None, protocol="tcp", encoding="binary", rows=None, rate=None,
+                    **server_options):
+    """
+    Навантажувальний тест на одній машині: сервер і клієнт відтворення в одному циклі подій.
+
+    Parameters:
+    - data_path (str): Файл даних для відтворення.
+    - checker (AnomalyChecker): Завантажена модель.
+    - speed (float): Прискорення відтворення; None — без пауз (найбільша пропускна здатність).
+    - protocol (str): "tcp" або "udp".
+    - encoding (str): "binary" або "json".
+    - rows (tuple): Діапазон рядків файлу.
+    - rate (float): Найбільша швидкість відправлення клієнта (рядків/с), див. replay.
+    - server_options: Додаткові параметри TelemetryServer (max_wait, batch_size, queue_size...).
+
+    Рядки, надіслані клієнтом, але не оцінені сервером (відкинуті переповненою чергою
+    або втрачені в буфері сокета UDP), повертаються як lost_rows.
+
+    Через UDP тест вимірює пропускну здатність сервера лише за заданої швидкості
+    відправлення: сервер не сповільнює клієнта, і надлишок датаграм просто губиться.
+    Якщо втрачено більше UDP_LOSS_WARNING рядків, результат позначається як
+    недостовірний (reliable = False) і виводиться попередження.
+
+    Returns:
+    dict: Статистика сервера та клієнта, кількість втрачених рядків і ознака достовірності.
+    """
+    frame = read_sensor_frame(data_path, columns=["Time", "Pressure_*", "FlowRate_*"], rows=(0, 1))
+    assembler = RowAssembler(frame.sensors)
+    ports = {"port": 0, "udp_port": None} if protocol == "tcp" else {"port": None, "udp_port": 0}
+    server = TelemetryServer(checker.scorer(columns=assembler.columns), frame.sensors, **ports, **server_options)
+    await server.start()
+    try:
+        client = await replay(data_path, port=server.port if protocol == "tcp" else server.udp_port,
+                              speed=speed, protocol=protocol, encoding=encoding, rows=rows, rate=rate)
+    finally:
+        await server.stop(timeout=None)  # Дочекатися, доки сервер прочитає все надіслане
+    stats = server.stats()
+    lost_rows = client["rows"] - stats["rows"]
+    print(f"Оцінено {stats['rows']} з {client['rows']} надісланих рядків: втрачено {lost_rows} рядків, "
+          f"незавершених рядків {stats['incomplete_rows']}, відкинуто показів {stats['dropped_readings']}.")
+    if stats["rows"]:
+        print(f"Затримка p50 {stats['p50_ms']:.1f} мс, p99 {stats['p99_ms']:.1f} мс.")
+    reliable = protocol == "tcp" or lost_rows <= UDP_LOSS_WARNING * client["rows"]
+    if not reliable:
+        print(f"Попередження: через UDP втрачено {lost_rows / client['rows']:.1%} рядків; результат відображає "
+              f"швидкість клієнта, а не пропускну здатність сервера. Зменште швидкість (--speed або --rate).")
+    return {"server": stats, "client": client, "lost_rows": lost_rows, "reliable": reliable}
@@ -0,0 +1,257 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+ATM = 101_325.0  # Паскалів в одній атмосфері
+DENSITY = 850  # Густина нафти в кг/м³
+LEAK_DISCHARGE_COEFFICIENT = 0.61  # Коефіцієнт витрати отвору витоку
+
+
+class TransientSolver:
+    """
+    Клас для моделювання неусталеного руху рідини (гідроудару) в трубопроводі
+    методом характеристик.
+
+    Труба розбивається на рівномірну сітку вузлів; на кожному кроці часу всі
+    вузли оновлюються векторними операціями NumPy. Враховуються тертя (Дарсі-Вейсбах),
+    відбиття від граничних умов, насосні станції та вузли витоку або крадіжки.
+    Граничні умови: на вході задано тиск, на виході — витрату. Кавітація та
+    розрив суцільності потоку не моделюються.
+    """
+
+    def __init__(self, pipeline, wave_speed, dx=1000.0, dt=None, friction_factor=0.02,
+                 density=DENSITY, pump_positions=(), logger=None):
+        """
+        Ініціалізація об'єкта TransientSolver.
+
+        Parameters:
+        - pipeline (Pipeline): Трубопровід (довжина, діаметр, площа, сенсори, нормальні тиск і витрата).
+        - wave_speed (float): Швидкість поширення хвилі тиску (м/с).
+        - dx (float): Бажаний крок сітки (м); уточнюється, щоб ціла кількість ділянок покривала трубу.
+        - dt (float): Крок часу (с); за замовчуванням dx / wave_speed. Не може перевищувати dx / wave_speed.
+        - friction_factor (float): Коефіцієнт тертя Дарсі-Вейсбаха.
+        - density (float): Густина рідини (кг/м³).
+        - pump_positions (list): Позиції проміжних насосних станцій (м).
+        - logger (Logger): Об'єкт логера для запису подій (необов'язковий).
+        """
+        self.pipeline = pipeline
+        self.wave_speed = wave_speed
+        self.friction_factor = friction_factor
+        self.density = density
+        self.logger = logger
+
+        self.reaches = max(1, int(round(pipeline.length / dx)))  # Кількість ділянок сітки
+        self.dx = pipeline.length / self.reaches
+        self.dt = self.dx / wave_speed if dt is None else dt
+        if self.dt > self.dx / wave_speed * (1 + 1e-12):
+            raise ValueError(
+                f"Крок часу {self.dt} с порушує умову Куранта: dt має бути не більше dx / wave_speed = "
+                f"{self.dx / wave_speed:.6f} с."
+            )
+        self.courant = wave_speed * self.dt / self.dx  # Частка ділянки, яку хвиля проходить за крок
+
+        area = pipeline.area
+        # Коефіцієнти рівнянь характеристик у формі тиск-витрата
+        self.impedance = density * wave_speed / area
+        self.resistance = friction_factor * density * wave_speed * self.dt / (2 * pipeline.diameter * area ** 2)
+        self.reach_loss = friction_factor * density * self.dx / (2 * pipeline.diameter * area ** 2)
+
+        self.positions = np.linspace(0, pipeline.length, self.reaches + 1)
+        self.pump_nodes = np.unique([
+            node for node in (self._node(position) for position in pump_positions)
+            if 0 < node < self.reaches
+        ]).astype(np.int64)
+        self.sensor_nodes = np.array([self._node(sensor) for sensor in pipeline.sensors], dtype=np.int64)
+
+        self.leak_nodes = np.empty(0, dtype=np.int64)
+        self.leak_coefficients = np.empty(0)
+        self.leak_start_times = np.empty(0)
+
+        self.data = None
+        self.reset()
+
+    def _node(self, position):
+        """
+        Повертає індекс найближчого до позиції вузла сітки.
+
+        Parameters:
+        - position (float): Позиція вздовж труби (м).
+
+        Returns:
+        int: Індекс вузла.
+        """
+        if not 0 <= position <= self.pipeline.length:
+            raise ValueError(f"Позиція {position} м лежить поза межами трубопроводу.")
+        return int(round(position / self.dx))
+
+    def add_leak(self, position, orifice_area, start_time=0.0, discharge_coefficient=LEAK_DISCHARGE_COEFFICIENT):
+        """
+        Додає вузол витоку або несанкціонованого відбору (крадіжки).
+
+        Витрата через отвір визначається як Cd·A·sqrt(2p/ρ) і з'являється стрибком у момент start_time.
+
+        Parameters:
+        - position (float): Позиція витоку (м).
+        - orifice_area (float): Площа отвору (м²).
+        - start_time (float): Час відкриття витоку від початку симуляції (с).
+        - discharge_coefficient (float): Коефіцієнт витрати отвору.
+        """
+        node = self._node(position)
+        if not 0 < node < self.reaches:
+            raise ValueError(f"Витік на {position} м збігається з граничним вузлом трубопроводу.")
+        if node in self.pump_nodes:
+            raise ValueError(f"Витік на {position} м збігається з вузлом насосної станції.")
+
+        coefficient = discharge_coefficient * orifice_area * np.sqrt(2 / self.density)
+        self.leak_nodes = np.append(self.leak_nodes, node)
+        self.leak_coefficients = np.append(self.leak_coefficients, coefficient)
+        self.leak_start_times = np.append(self.leak_start_times, start_time)
+
+    def reset(self):
+        """
+        Встановлює усталений стан: однакова витрата по всій трубі та лінійне падіння
+        тиску від тертя. Кожна насосна станція компенсує втрати на наступній за нею
+        ділянці, тож перед кожним насосом і на виході тиск дорівнює нормальному.
+        """
+        flow = self.pipeline.flow_rate_norm
+        loss = self.reach_loss * flow * abs(flow)  # Падіння тиску на одній ділянці сітки
+        pressure_norm = self.pipeline.pressure_norm * ATM
+
+        boundaries = np.concatenate([[0], self.pump_nodes, [self.reaches]])
+        nodes = np.arange(self.reaches + 1)
+        # Кінець ділянки між насосами, до якої належить вузол (для правої сторони вузла)
+        segment_ends = boundaries[np.searchsorted(boundaries, nodes, side="right").clip(max=len(boundaries) - 1)]
+        segment_ends[-1] = self.reaches
+
+        self.pressure_right = pressure_norm + loss * (segment_ends - nodes)
+        self.pressure_left = self.pressure_right.copy()
+        self.pressure_left[self.pump_nodes] = pressure_norm  # Тиск на вході насосів
+        self.flow_left = np.full(self.reaches + 1, float(flow))
+        self.flow_right = self.flow_left.copy()
+
+        # Робочі буфери для рівнянь характеристик
+        self._c_plus = np.empty(self.reaches)
+        self._c_minus = np.empty(self.reaches)
+        self._work = np.empty(self.reaches)
+
+        self.pump_pressure_rise = self.pressure_right[self.pump_nodes] - self.pressure_left[self.pump_nodes]
+        self.inlet_pressure = self.pressure_right[0]
+        self.outlet_flow = float(flow)
+        self.time = 0.0
+
+    def step(self):
+        """
+        Виконує один крок методу характеристик для всіх вузлів сітки.
+        """
+        p_left, p_right = self.pressure_left, self.pressure_right
+        q_left, q_right = self.flow_left, self.flow_right
+        theta = self.courant
+        impedance, resistance = self.impedance, self.resistance
+
+        # Значення в основах характеристик: C+ приходить з лівого сусіда, C- — з правого.
+        # При theta < 1 значення інтерполюються між вузлом і сусідом.
+        if theta == 1:
+            p_a, q_a = p_right[:-1], q_right[:-1]
+            p_b, q_b = p_left[1:], q_left[1:]
+        else:
+            p_a = p_left[1:] + theta * (p_right[:-1] - p_left[1:])
+            q_a = q_left[1:] + theta * (q_right[:-1] - q_left[1:])
+            p_b = p_right[:-1] + theta * (p_left[1:] - p_right[:-1])
+            q_b = q_right[:-1] + theta * (q_left[1:] - q_right[:-1])
+
+        # C+ = p_a + B·q_a - R·q_a·|q_a| (для вузлів 1..n), C- = p_b - B·q_b + R·q_b·|q_b| (для вузлів 0..n-1).
+        # Обчислюються в попередньо виділених буферах, щоб не створювати тимчасових масивів.
+        c_plus, c_minus, work = self._c_plus, self._c_minus, self._work
+        np.abs(q_a, out=c_plus)
+        c_plus *= q_a
+        c_plus *= -resistance
+        c_plus += p_a
+        np.multiply(q_a, impedance, out=work)
+        c_plus += work
+
+        np.abs(q_b, out=c_minus)
+        c_minus *= q_b
+        c_minus *= resistance
+        c_minus += p_b
+        np.multiply(q_b, impedance, out=work)
+        c_minus -= work
+
+        # Внутрішні вузли
+        cp, cm = c_plus[:-1], c_minus[1:]
+        np.add(cp, cm, out=p_left[1:-1])
+        p_left[1:-1] *= 0.5
+        p_right[1:-1] = p_left[1:-1]
+        np.subtract(cp, cm, out=q_left[1:-1])
+        q_left[1:-1] *= 1 / (2 * impedance)
+        q_right[1:-1] = q_left[1:-1]
+
+        # Насосні станції: сталий приріст тиску, одна витрата через насос
+        if len(self.pump_nodes):
+            cp, cm = c_plus[self.pump_nodes - 1], c_minus[self.pump_nodes]
+            flow = (self.pump_pressure_rise + cp - cm) / (2 * impedance)
+            p_left[self.pump_nodes] = cp - impedance * flow
+            p_right[self.pump_nodes] = cm + impedance * flow
+            q_left[self.pump_nodes] = flow
+            q_right[self.pump_nodes] = flow
+
+        # Витоки та крадіжки: витрата через отвір Q = k·sqrt(p)
+        if len(self.leak_nodes):
+            cp, cm = c_plus[self.leak_nodes - 1], c_minus[self.leak_nodes]
+            k = np.where(self.time + self.dt >= self.leak_start_times, self.leak_coefficients, 0.0)
+            total = np.maximum(cp + cm, 0.0)
+            root = (-impedance * k + np.sqrt((impedance * k) ** 2 + 8 * total)) / 4
+            pressure = root ** 2
+            p_left[self.leak_nodes] = pressure
+            p_right[self.leak_nodes] = pressure
+            q_left[self.leak_nodes] = (cp - pressure) / impedance
+            q_right[self.leak_nodes] = (pressure - cm) / impedance
+
+        # Вхід: заданий тиск
+        p_left[0] = p_right[0] = self.inlet_pressure
+        q_left[0] = q_right[0] = (self.inlet_pressure - c_minus[0]) / impedance
+
+        # Вихід: задана витрата
+        q_left[-1] = q_right[-1] = self.outlet_flow
+        p_left[-1] = p_right[-1] = c_plus[-1] - impedance * self.outlet_flow
+
+        self.time += self.dt
+
+    def run(self, time_steps, sample_interval=1.0):
+        """
+        Моделює перехідний процес від усталеного стану та записує значення на сенсорах.
+
+        Parameters:
+        - time_steps (int): Кількість записаних кроків часу (рядків результату).
+        - sample_interval (float): Інтервал між записами (с).
+
+        Returns:
+        pd.DataFrame: Дані у форматі Time, Pressure_{x}m, FlowRate_{x}m.
+        """
+        self.reset()
+        sample_steps = np.round(np.arange(time_steps) * sample_interval / self.dt).astype(np.int64)
+        sensors = self.pipeline.sensors
+        samples = np.empty((time_steps, len(sensors), 2))
+
+        started = time.perf_counter()
+        step = 0
+        for row, target in enumerate(sample_steps):
+            while step < target:
+                self.step()
+                step += 1
+            samples[row, :, 0] = self.pressure_right[self.sensor_nodes] / ATM
+            samples[row, :, 1] = self.flow_right[self.sensor_nodes]
+        elapsed = time.perf_counter() - started
+
+        if self.logger is not None:
+            self.logger.log(
+                f"Метод характеристик: {self.reaches + 1} вузлів, {step} кроків по {self.dt:.4f} с "
+                f"за {elapsed:.2f} с."
+            )
+
+        data = {"Time": np.arange(time_steps) * sample_interval}
+        for i, sensor in enumerate(sensors):
+            data[f"Pressure_{sensor}m"] = samples[:, i, 0]
+            data[f"FlowRate_{sensor}m"] = samples[:, i, 1]
+        self.data = pd.DataFrame(data)
+        return self.data
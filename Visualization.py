@@ -1,6 +1,209 @@
-import matplotlib.pyplot as plt
+import os
 
+import numpy as np
 
+from SensorFrame import SensorFrame
+
+FIGURE_DIR = "Data/Figures"  # Каталог для графіків у режимі без вікон
+
+_headless = False  # Режим без вікон: бекенд Agg, графіки зберігаються у файли
+_figure_dir = FIGURE_DIR
+
+ANOMALY_DELTA = 0.04  # Поріг зміни тиску між кроками, що позначається на графіку
+MIN_POINTS = 200  # Найменша кількість точок лінії після проріджування
+
+
+def set_headless(enabled=True, figure_dir=FIGURE_DIR):
+    """
+    Вмикає або вимикає режим без вікон.
+
+    У цьому режимі matplotlib використовує бекенд Agg і жодне вікно не відкривається:
+    кожен графік зберігається у файл PNG у каталозі figure_dir.
+
+    Parameters:
+    - enabled (bool): Чи ввімкнути режим без вікон.
+    - figure_dir (str): Каталог для файлів графіків.
+    """
+    global _headless, _figure_dir
+    _headless = enabled
+    _figure_dir = figure_dir
+    if enabled:
+        os.environ["MPLBACKEND"] = "Agg"  # Діє і на matplotlib, ще не імпортований на цей момент
+
+
+def pyplot():
+    """
+    Імпортує matplotlib.pyplot лише тоді, коли потрібно побудувати графік.
+
+    Returns:
+    module: matplotlib.pyplot.
+    """
+    if _headless:
+        import matplotlib
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def show_figure(name):
+    """
+    Показує поточний графік або, у режимі без вікон, зберігає його у файл.
+
+    Parameters:
+    - name (str): Назва графіка (ім'я файлу без розширення).
+    """
+    plt = pyplot()
+    if not _headless:
+        plt.show()
+        return
+    os.makedirs(_figure_dir, exist_ok=True)
+    path = os.path.join(_figure_dir, f"{name}.png")
+    plt.savefig(path)
+    plt.close()
+    print(f"Графік збережено у файл: {path}")
+
+
+def _new_figure(figsize, offscreen=False):
+    """
+    Створює фігуру matplotlib.
+
+    Фігура поза pyplot (offscreen) малюється бекендом Agg і не потребує дисплея
+    незалежно від налаштованого бекенда.
+    """
+    if offscreen:
+        from matplotlib.figure import Figure
+        return Figure(figsize=figsize)
+    return pyplot().figure(figsize=figsize)
+
+
+def _save_figure(figure, path):
+    """
+    Зберігає фігуру у файл зображення (формат визначається розширенням).
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    figure.savefig(path)
+    print(f"Графік збережено у файл: {path}")
+
+
+def _pixel_points(axis):
+    """
+    Кількість точок, достатня для лінії на осях: по дві (мінімум і максимум) на піксель ширини.
+    """
+    return max(2 * int(axis.get_window_extent().width), MIN_POINTS)
+
+
+def _series(data, channel, sensor):
+    """
+    Повертає ряд каналу сенсора з pd.DataFrame або SensorFrame як масив float.
+    """
+    if isinstance(data, SensorFrame):
+        return data.series(channel, sensor).astype(float, copy=False)
+    return data[f"{channel}_{sensor}m"].to_numpy(dtype=float)
+
+
+def _time(data):
+    """
+    Повертає вектор Time з pd.DataFrame або SensorFrame.
+    """
+    return data.time if isinstance(data, SensorFrame) else data["Time"].to_numpy()
+
+
+def decimate_minmax(x, y, buckets):
+    """
+    Проріджує ряд, залишаючи мінімум і максимум кожного кошика.
+
+    Ряд ділиться на кошики однакової довжини; з кожного беруться дві точки у порядку часу.
+    На графіку з шириною не більше buckets пікселів результат не відрізняється
+    від повного ряду: жоден сплеск не губиться.
+
+    Parameters:
+    - x (array-like): Значення осі X.
+    - y (array-like): Значення ряду.
+    - buckets (int): Кількість кошиків.
+
+    Returns:
+    tuple: (x, y) проріджені (не більше 2 * buckets точок).
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if buckets <= 0 or n <= 2 * buckets:
+        return x, y
+
+    size = -(-n // buckets)
+    buckets = -(-n // size)
+    padded = np.empty(buckets * size)
+    padded[:n] = y
+    padded[n:] = y[-1]  # Доповнення останнім значенням не змінює мінімуму й максимуму кошика
+    blocks = padded.reshape(buckets, size)
+    low = blocks.argmin(axis=1)
+    high = blocks.argmax(axis=1)
+    offsets = np.arange(buckets) * size
+    index = np.column_stack((np.minimum(low, high), np.maximum(low, high))) + offsets[:, None]
+    index = np.minimum(index.ravel(), n - 1)
+    return x[index], y[index]
+
+
+def lttb(x, y, n_out):
+    """
+    Проріджує ряд алгоритмом Largest-Triangle-Three-Buckets.
+
+    З кожного кошика вибирається точка, що утворює найбільший трикутник із попередньою
+    вибраною точкою та середнім наступного кошика; форма кривої зберігається краще,
+    ніж при рівномірному проріджуванні.
+
+    Parameters:
+    - x (array-like): Значення осі X.
+    - y (array-like): Значення ряду.
+    - n_out (int): Кількість точок результату (разом із першою та останньою).
+
+    Returns:
+    tuple: (x, y) проріджені.
+    """
+    x_values = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return x_values, y
+
+    x = x_values.astype(float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)  # n_out - 2 кошики між першою та останньою точкою
+    index = np.empty(n_out, dtype=int)
+    index[0], index[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        following = slice(stop, edges[bucket + 2]) if bucket + 2 < len(edges) else slice(n - 1, n)
+        mean_x, mean_y = x[following].mean(), y[following].mean()
+        area = np.abs((x[previous] - mean_x) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (mean_y - y[previous]))
+        previous = start + int(np.nanargmax(area)) if not np.isnan(area).all() else start
+        index[bucket + 1] = previous
+    return x_values[index], y[index]
+
+
+def decimate(x, y, max_points, method="minmax"):
+    """
+    Проріджує ряд до max_points точок вибраним способом.
+
+    Parameters:
+    - x (array-like): Значення осі X.
+    - y (array-like): Значення ряду.
+    - max_points (int): Найбільша кількість точок; 0 або None — без проріджування.
+    - method (str): "minmax" (зберігає всі сплески) або "lttb" (зберігає форму кривої).
+
+    Returns:
+    tuple: (x, y) проріджені.
+    """
+    if not max_points:
+        return np.asarray(x), np.asarray(y)
+    if method == "minmax":
+        return decimate_minmax(x, y, max_points // 2)
+    if method == "lttb":
+        return lttb(x, y, max_points)
+    raise ValueError(f"Невідомий спосіб проріджування: {method}")
 
 
 class Visualization:
@@ -10,48 +213,56 @@ class Visualization:
     def __init__(self, data_handler):
         self.data_handler = data_handler
 
-    def plot_data(self, sensors):
+    def plot_data(self, sensors, max_points=None, method="minmax", output_path=None):
         """
-        Побудова графіків для перевірки даних трубопроводу.
+        Побудова графіків для перевірки даних трубопроводу (pd.DataFrame або SensorFrame).
+
+        Довгі ряди проріджуються до роздільної здатності графіка (див. decimate),
+        тож побудова мільйонів рядків не перевантажує matplotlib, а сплески залишаються видимими.
+
+        Parameters:
+        - sensors (list): Позиції сенсорів.
+        - max_points (int): Найбільша кількість точок на лінію; None — подвоєна ширина осей у пікселях.
+        - method (str): Спосіб проріджування: "minmax" або "lttb".
+        - output_path (str): Файл зображення; якщо задано, графік зберігається у файл без відкриття вікна.
         """
-        if self.data_handler.data is None:
+        data = self.data_handler.data
+        if data is None:
             print("Дані ще не згенеровані.")
             return
 
-        plt.figure(figsize=(14, 12))
+        figure = _new_figure((14, 12), offscreen=output_path is not None)
+        pressure_axis, flow_axis, delta_axis = figure.subplots(3, 1)
+        if max_points is None:
+            max_points = _pixel_points(pressure_axis)
+        time = _time(data)
 
-        plt.subplot(3, 1, 1)
         for sensor in sensors:
-            plt.plot(self.data_handler.data["Time"], self.data_handler.data[f"Pressure_{sensor}m"], label=f"Тиск на {sensor} м")
-        plt.title("Тиск у часі")
-        plt.xlabel("Час")
-        plt.ylabel("Тиск (атм)")
-        plt.legend()
-        plt.grid()
+            pressure = _series(data, "Pressure", sensor)
+            flow = _series(data, "FlowRate", sensor)
+            # Те саме, що Series.diff().fillna(0), але без проміжних Series
+            deltas = np.diff(pressure, prepend=pressure[:1])  # Нова копія: pressure може бути представленням
+            deltas[np.isnan(deltas)] = 0.0
+            pressure_axis.plot(*decimate(time, pressure, max_points, method), label=f"Тиск на {sensor} м")
+            flow_axis.plot(*decimate(time, flow, max_points, method), label=f"Витрата на {sensor} м")
+            delta_axis.plot(*decimate(time, deltas, max_points, method), label=f"Дельта тиску на {sensor} м")
+        delta_axis.axhline(ANOMALY_DELTA, color='red', linestyle='--', label="Поріг аномалій")
+        delta_axis.axhline(-ANOMALY_DELTA, color='red', linestyle='--')
 
-        plt.subplot(3, 1, 2)
-        for sensor in sensors:
-            plt.plot(self.data_handler.data["Time"], self.data_handler.data[f"FlowRate_{sensor}m"], label=f"Витрата на {sensor} м")
-        plt.title("Об'ємна витрата у часі")
-        plt.xlabel("Час")
-        plt.ylabel("Витрата (м³/с)")
-        plt.legend()
-        plt.grid()
+        for axis, title, ylabel in ((pressure_axis, "Тиск у часі", "Тиск (атм)"),
+                                    (flow_axis, "Об'ємна витрата у часі", "Витрата (м³/с)"),
+                                    (delta_axis, "Дельта тиску у часі", "Дельта тиску (атм)")):
+            axis.set_title(title)
+            axis.set_xlabel("Час")
+            axis.set_ylabel(ylabel)
+            axis.legend()
+            axis.grid()
 
-        plt.subplot(3, 1, 3)
-        for sensor in sensors:
-            deltas = self.data_handler.data[f"Pressure_{sensor}m"].diff().fillna(0)
-            plt.plot(self.data_handler.data["Time"], deltas, label=f"Дельта тиску на {sensor} м")
-            plt.axhline(0.04, color='red', linestyle='--', label="Поріг аномалій")
-            plt.axhline(-0.04, color='red', linestyle='--')
-        plt.title("Дельта тиску у часі")
-        plt.xlabel("Час")
-        plt.ylabel("Дельта тиску (атм)")
-        plt.legend()
-        plt.grid()
-
-        plt.tight_layout()
-        plt.show()
+        figure.tight_layout()
+        if output_path is not None:
+            _save_figure(figure, output_path)
+        else:
+            show_figure("pipeline_data")
 
     def plot_single_iteration(self, sensors):
         """
@@ -65,6 +276,7 @@ class Visualization:
             print("Дані для одиничної ітерації відсутні або некоректні.")
             return
 
+        plt = pyplot()
         plt.figure(figsize=(14, 8))
 
         # Графік тиску
@@ -72,7 +284,7 @@ class Visualization:
         for sensor in sensors:
             plt.plot(
                 [0],  # Симуляція одного моменту часу
-                [data[f"Pressure_{sensor}m"].iloc[0]],
+                [_series(data, "Pressure", sensor)[0]],
                 marker="o",
                 label=f"Тиск на {sensor} м",
             )
@@ -87,7 +299,7 @@ class Visualization:
         for sensor in sensors:
             plt.plot(
                 [0],
-                [data[f"FlowRate_{sensor}m"].iloc[0]],
+                [_series(data, "FlowRate", sensor)[0]],
                 marker="o",
                 label=f"Витрата на {sensor} м",
             )
@@ -98,4 +310,141 @@ class Visualization:
         plt.grid(True)
 
         plt.tight_layout()
-        plt.show()
+        show_figure("single_iteration")
+
+
+class LiveView:
+    """
+    Графік останнього вікна потоку даних, що оновлюється на місці.
+
+    Лінії створюються один раз; нові рядки записуються в кільцевий буфер розміром
+    window, і під час оновлення перемальовується лише це вікно (set_data існуючих ліній),
+    а не весь накопичений ряд.
+    """
+    def __init__(self, sensors, window=2000, max_points=None, method="minmax", output_path=None):
+        """
+        Ініціалізує об'єкт LiveView.
+
+        Parameters:
+        - sensors (list): Позиції сенсорів.
+        - window (int): Кількість останніх рядків на графіку.
+        - max_points (int): Найбільша кількість точок на лінію; None — за шириною осей.
+        - method (str): Спосіб проріджування: "minmax" або "lttb".
+        - output_path (str): Файл зображення, що перезаписується під час кожного оновлення.
+          У режимі без вікон за замовчуванням — live_view.png у каталозі графіків.
+        """
+        if window <= 0:
+            raise ValueError("Розмір вікна має бути додатним.")
+        self.sensors = list(sensors)
+        self.window = window
+        self.max_points = max_points
+        self.method = method
+        if output_path is None and _headless:
+            output_path = os.path.join(_figure_dir, "live_view.png")
+        self.output_path = output_path
+        self.columns = [f"Pressure_{sensor}m" for sensor in self.sensors] + \
+                       [f"FlowRate_{sensor}m" for sensor in self.sensors]
+
+        self._time = np.full(window, np.nan)
+        self._values = np.full((window, len(self.columns)), np.nan)
+        self._count = 0  # Загальна кількість отриманих рядків
+        self._figure = None
+        self._axes = None
+        self._lines = None
+
+    def append(self, frame):
+        """
+        Додає нові рядки до вікна без перемальовування.
+
+        Parameters:
+        - frame (pd.DataFrame | SensorFrame): Рядки зі стовпцями Time і Pressure_/FlowRate_ сенсорів.
+        """
+        time = np.asarray(_time(frame), dtype=float)
+        if isinstance(frame, SensorFrame):
+            values = np.column_stack([_series(frame, channel, sensor)
+                                      for channel in ("Pressure", "FlowRate") for sensor in self.sensors])
+        else:
+            values = frame[self.columns].to_numpy(dtype=float)
+        received = len(time)
+        if received > self.window:
+            time, values = time[-self.window:], values[-self.window:]
+        positions = (self._count + received - len(time) + np.arange(len(time))) % self.window
+        self._time[positions] = time
+        self._values[positions] = values
+        self._count += received
+
+    def _ordered(self):
+        """
+        Повертає рядки вікна в порядку надходження.
+        """
+        if self._count <= self.window:
+            return self._time[:self._count], self._values[:self._count]
+        start = self._count % self.window
+        return (np.concatenate((self._time[start:], self._time[:start])),
+                np.concatenate((self._values[start:], self._values[:start])))
+
+    def _build(self):
+        """
+        Створює фігуру й лінії (один раз).
+        """
+        offscreen = self.output_path is not None
+        if not offscreen:
+            pyplot().ion()  # Вікно оновлюється без блокування циклу
+        self._figure = _new_figure((14, 8), offscreen=offscreen)
+        pressure_axis, flow_axis = self._axes = self._figure.subplots(2, 1)
+        self._lines = [pressure_axis.plot([], [], label=f"Тиск на {sensor} м")[0] for sensor in self.sensors] + \
+                      [flow_axis.plot([], [], label=f"Витрата на {sensor} м")[0] for sensor in self.sensors]
+        for axis, title, ylabel in ((pressure_axis, "Тиск (останнє вікно)", "Тиск (атм)"),
+                                    (flow_axis, "Витрата (останнє вікно)", "Витрата (м³/с)")):
+            axis.set_title(title)
+            axis.set_xlabel("Час")
+            axis.set_ylabel(ylabel)
+            axis.legend(loc="upper left")
+            axis.grid(True)
+        self._figure.tight_layout()
+        if self.max_points is None:
+            self.max_points = _pixel_points(pressure_axis)
+        if not offscreen:
+            pyplot().show(block=False)
+
+    def render(self):
+        """
+        Перемальовує вікно: оновлює дані існуючих ліній і масштаб осей.
+        """
+        if self._count == 0:
+            return
+        if self._figure is None:
+            self._build()
+        time, values = self._ordered()
+        for line, column in zip(self._lines, values.T):
+            line.set_data(*decimate(time, column, self.max_points, self.method))
+        for axis in self._axes:
+            axis.relim()
+            axis.autoscale_view()
+
+        if self.output_path is not None:
+            directory = os.path.dirname(self.output_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._figure.savefig(self.output_path)
+        else:
+            self._figure.canvas.draw_idle()
+            self._figure.canvas.flush_events()
+
+    def update(self, frame):
+        """
+        Додає нові рядки й перемальовує вікно.
+
+        Parameters:
+        - frame (pd.DataFrame): Нові рядки.
+        """
+        self.append(frame)
+        self.render()
+
+    def close(self):
+        """
+        Закриває фігуру.
+        """
+        if self._figure is not None and self.output_path is None:
+            pyplot().close(self._figure)
+        self._figure = None
@@ -1,8 +1,149 @@
-import pandas as pd
-import joblib
-from sklearn.metrics import classification_report, confusion_matrix
-import matplotlib.pyplot as plt
-import seaborn as sns
+import collections
+import copy
+import os
+import time
+
+import numpy as np
+from CompiledForest import CompiledForest
+from DataHandler import read_frame
+from FeatureEngine import FeatureEngine, feature_config_path
+from Metrics import METRICS, STAGE_SECONDS
+
+LATENCY_WINDOW = 10_000  # Кількість останніх викликів для статистики затримки
+
+
+class StreamingScorer:
+    """
+    Клас для потокової оцінки окремих рядків або мікропакетів даних без pandas.
+
+    Відповідність між стовпцями вхідних даних і ознаками моделі (feature_names_in_)
+    визначається один раз під час створення; відсутні ознаки заповнюються нулями.
+    Якщо задано FeatureEngine, вхідні рядки містять сирі значення сенсорів, а часові
+    ознаки оновлюються інкрементно для кожного рядка в порядку надходження.
+    """
+    def __init__(self, model, columns=None, feature_engine=None):
+        """
+        Ініціалізує об'єкт StreamingScorer.
+
+        Parameters:
+        - model: Навчена модель із feature_names_in_, classes_ та predict_proba.
+        - columns (list): Порядок стовпців у вхідних масивах; за замовчуванням — порядок
+          стовпців FeatureEngine або ознак моделі.
+        - feature_engine (FeatureEngine): Обчислювач часових ознак; None — модель на сирих значеннях.
+        """
+        self.feature_names = list(model.feature_names_in_)
+        self.feature_engine = feature_engine
+        self.input_names = self.feature_names if feature_engine is None else feature_engine.columns
+        self.columns = self.input_names if columns is None else list(columns)
+        self.classes = np.asarray(model.classes_)
+
+        self._indices, self._missing = self._mapping(self.columns, self.input_names)
+        self._identity = self.columns == self.input_names
+        if feature_engine is not None:
+            self._feature_indices, self._feature_missing = self._mapping(feature_engine.feature_names, self.feature_names)
+
+        # Копія моделі без імен ознак: масиви NumPy приймаються без перевірки імен і попереджень
+        self.model = copy.copy(model)
+        if hasattr(self.model, "feature_names_in_"):
+            del self.model.feature_names_in_
+
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+
+    @staticmethod
+    def _mapping(source, target):
+        """
+        Обчислює індекси стовпців source для кожного імені target.
+
+        Returns:
+        tuple: (indices, missing) — індекси та маска імен, відсутніх у source.
+        """
+        positions = {name: i for i, name in enumerate(source)}
+        indices = np.array([positions.get(name, -1) for name in target], dtype=np.int64)
+        missing = indices < 0
+        return np.where(missing, 0, indices), missing
+
+    def _to_matrix(self, rows):
+        """
+        Перетворює рядок або мікропакет (масив чи словники) на матрицю вхідних стовпців.
+
+        Parameters:
+        - rows: Масив форми (стовпці,) чи (рядки, стовпці), словник або список словників.
+
+        Returns:
+        np.ndarray: Матриця у порядку input_names.
+        """
+        if isinstance(rows, dict):
+            rows = [rows]
+        if isinstance(rows, (list, tuple)) and rows and isinstance(rows[0], dict):
+            return np.array([[row.get(name, 0.0) for name in self.input_names] for row in rows], dtype=float)
+
+        matrix = np.asarray(rows, dtype=float)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        if self._identity:
+            return matrix
+        matrix = matrix[:, self._indices]
+        matrix[:, self._missing] = 0.0
+        return matrix
+
+    def features(self, rows):
+        """
+        Перетворює рядок або мікропакет на ознаки моделі, оновлюючи стан часових ознак.
+
+        Parameters:
+        - rows: Масив форми (стовпці,) чи (рядки, стовпці), словник або список словників.
+
+        Returns:
+        tuple: (inputs, features) — матриця вхідних стовпців (input_names) і матриця ознак моделі.
+        """
+        inputs = self._to_matrix(rows)
+        if self.feature_engine is None:
+            return inputs, inputs
+        features = self.feature_engine.update_many(inputs)[:, self._feature_indices]
+        features[:, self._feature_missing] = 0.0
+        return inputs, features
+
+    def predict(self, features):
+        """
+        Оцінює матрицю ознак моделі (див. features).
+
+        Returns:
+        tuple: (predictions, probabilities) — прогнозовані класи та ймовірності класів.
+        """
+        probabilities = self.model.predict_proba(features)
+        return self.classes.take(np.argmax(probabilities, axis=1)), probabilities
+
+    def score(self, rows):
+        """
+        Оцінює рядок або мікропакет даних.
+
+        Parameters:
+        - rows: Масив форми (стовпці,) чи (рядки, стовпці), словник або список словників.
+
+        Returns:
+        tuple: (predictions, probabilities) — прогнозовані класи та ймовірності класів.
+        """
+        started = time.perf_counter()
+        _, matrix = self.features(rows)
+        predictions, probabilities = self.predict(matrix)
+        elapsed = time.perf_counter() - started
+        self._latencies.append(elapsed)
+        METRICS.observe(STAGE_SECONDS, elapsed, stage="checker.score")
+        METRICS.add_rows("checker.score", len(matrix))
+        return predictions, probabilities
+
+    def latency_stats(self):
+        """
+        Повертає статистику затримки викликів score за останні LATENCY_WINDOW викликів.
+
+        Returns:
+        dict: Кількість викликів і перцентилі p50/p99 у мілісекундах.
+        """
+        if not self._latencies:
+            return {"calls": 0, "p50_ms": None, "p99_ms": None}
+        p50, p99 = np.percentile(np.fromiter(self._latencies, dtype=float), [50, 99]) * 1000
+        return {"calls": len(self._latencies), "p50_ms": float(p50), "p99_ms": float(p99)}
+
 
 class AnomalyChecker:
     """
@@ -13,38 +154,97 @@ class AnomalyChecker:
         Ініціалізує об'єкт AnomalyChecker.
 
         Parameters:
-        - model_path (str): Шлях до збереженої моделі.
+        - model_path (str): Шлях до збереженої моделі (.pkl) або каталогу скомпільованої моделі.
         """
-        self.model = joblib.load(model_path)  # Завантаження моделі
+        self.model_path = model_path
+        # Завантаження моделі: каталог містить ліс, експортований CompiledForest.export_forest
+        started = time.perf_counter()
+        if os.path.isdir(model_path):
+            self.model = CompiledForest.load(model_path)
+        else:
+            import joblib  # Разом із моделлю підвантажує sklearn, тому імпортується лише за потреби
+            self.model = joblib.load(model_path)
+        METRICS.set_gauge("model_load_seconds", time.perf_counter() - started,
+                          format="compiled" if os.path.isdir(model_path) else "pickle")
+
+        # Конфігурація часових ознак, збережена під час навчання (відсутня для моделей на сирих значеннях)
+        config_path = feature_config_path(model_path)
+        self.feature_engine = FeatureEngine.load(config_path) if os.path.exists(config_path) else None
         self.expected_features = self.model.feature_names_in_  # Зберігаємо ознаки, використані під час навчання
 
-    def check_data(self, data_path):
+    def scorer(self, columns=None):
+        """
+        Створює потоковий оцінювач для моделі з власним станом часових ознак.
+
+        Parameters:
+        - columns (list): Порядок стовпців у вхідних масивах; за замовчуванням — порядок
+          стовпців сенсорів (або ознак моделі без FeatureEngine).
+
+        Returns:
+        StreamingScorer: Оцінювач рядків і мікропакетів.
+        """
+        feature_engine = None if self.feature_engine is None else FeatureEngine(**self.feature_engine.to_dict())
+        return StreamingScorer(self.model, columns=columns, feature_engine=feature_engine)
+
+    @METRICS.timed("checker.check_data", rows=len)
+    def check_data(self, data_path, evaluate=True, plot=True):
         """
         Перевіряє дані на наявність аномалій.
 
         Parameters:
-        - data_path (str): Шлях до файлу з даними.
+        - data_path (str): Шлях до файлу з даними (.csv, .parquet або .npy).
+        - evaluate (bool): Чи порівнювати прогнози зі стовпцем 'Anomaly' і виводити звіт.
+        - plot (bool): Чи будувати матрицю плутанини (лише разом з evaluate).
+
+        Returns:
+        np.ndarray: Прогнози моделі для кожного рядка.
         """
         # Завантаження даних
-        data = pd.read_csv(data_path)
+        data = read_frame(data_path)
 
-        if "Anomaly" not in data.columns:
+        if evaluate and "Anomaly" not in data.columns:
             raise ValueError("Стовпець 'Anomaly' відсутній у даних. Перевірте структуру файлу.")
 
-        features = data.drop(columns=["Anomaly", "Time"], errors='ignore')
+        features = self.features(data)
 
-        # Перевірка відповідності набору ознак
-        for missing_feature in set(self.expected_features) - set(features.columns):
-            features[missing_feature] = 0  # Додаємо відсутні ознаки з нульовими значеннями
+        # Прогнозування
+        predictions = self.model.predict(features)
 
-        features = features[self.expected_features]  # Упорядковуємо стовпці відповідно до моделі
+        if evaluate:
+            self.evaluate(data["Anomaly"], predictions, plot=plot)
+        return predictions
 
-        true_labels = data["Anomaly"]
+    def features(self, data):
+        """
+        Обчислює ознаки моделі для DataFrame так само, як під час навчання.
 
-        # Прогнозування
-        predictions = self.model.predict(features)
+        Стовпці сенсорів і ознаки, відсутні у даних, заповнюються нулями.
+
+        Parameters:
+        - data (pd.DataFrame): Дані.
+
+        Returns:
+        pd.DataFrame: Ознаки у порядку expected_features.
+        """
+        if self.feature_engine is None:
+            features = data
+        else:
+            features = self.feature_engine.transform(data.reindex(columns=self.feature_engine.columns, fill_value=0))
+
+        # Упорядковуємо стовпці відповідно до моделі, відсутні ознаки заповнюємо нулями
+        return features.reindex(columns=self.expected_features, fill_value=0)
+
+    def evaluate(self, true_labels, predictions, plot=True):
+        """
+        Виводить звіт класифікації та матрицю плутанини.
+
+        Parameters:
+        - true_labels (array-like): Справжні мітки.
+        - predictions (array-like): Прогнозовані мітки.
+        - plot (bool): Чи будувати графік матриці плутанини.
+        """
+        from sklearn.metrics import classification_report, confusion_matrix
 
-        # Оцінка
         print("Classification Report:")
         print(classification_report(true_labels, predictions))
 
@@ -52,13 +252,20 @@ class AnomalyChecker:
         cm = confusion_matrix(true_labels, predictions)
         print(cm)
 
+        if not plot:
+            return
+
         # Візуалізація матриці плутанини
+        import seaborn as sns
+        from Visualization import pyplot, show_figure
+
+        plt = pyplot()
         plt.figure(figsize=(8, 6))
         sns.heatmap(cm, annot=True, fmt="d", cmap="Blues", xticklabels=["Normal", "Anomaly"], yticklabels=["Normal", "Anomaly"])
         plt.title("Confusion Matrix")
         plt.xlabel("Predicted")
         plt.ylabel("Actual")
-        plt.show()
+        show_figure("confusion_matrix")
 
 if __name__ == "__main__":
     # Ініціалізація об'єкта
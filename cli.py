@@ -0,0 +1,216 @@
+import argparse
+import sys
+
+# Модулі з matplotlib, seaborn і sklearn імпортуються всередині підкоманд, яким вони потрібні,
+# тому запуск короткої задачі не витрачає час на імпорт непотрібних бібліотек.
+
+
+def _simulate(args):
+    """
+    Підкоманда simulate: симуляція аварій і збереження даних для навчання.
+    """
+    from Worker import run_simulation
+    run_simulation(time_steps=args.time_steps, event_count=args.events, plot=not args.no_plot, seed=args.seed,
+                   cache_dir=args.cache_dir)
+
+
+def _train(args):
+    """
+    Підкоманда train: навчання моделі (аргументи передаються ModelTraining).
+    """
+    from ModelTraining import main
+    main(args.arguments)
+
+
+def _checker(args, compiled=False):
+    """
+    Завантажує модель: каскад (детектор змін і модель) з --cascade або лише модель.
+
+    З compiled=True замість моделі .pkl використовується скомпільована модель поруч із нею
+    (створюється під час першого завантаження, див. ModelTraining.resolve_model_path).
+    """
+    model_path = args.model
+    if compiled:
+        from ModelTraining import resolve_model_path
+        try:
+            model_path = resolve_model_path(model_path)
+        except FileNotFoundError as e:
+            sys.exit(str(e))
+    if getattr(args, "cascade", False):
+        from CascadeDetector import CascadeChecker
+        return CascadeChecker(model_path=model_path)
+    from check_anomalies import AnomalyChecker
+    return AnomalyChecker(model_path=model_path)
+
+
+def _check(args):
+    """
+    Підкоманда check: перевірка файлу даних навченою моделлю.
+    """
+    checker = _checker(args)
+    predictions = checker.check_data(args.data, evaluate=not args.no_evaluate, plot=not args.no_plot)
+    print(f"Перевірено {len(predictions)} рядків, виявлено аномалій: {int((predictions == 1).sum())}.")
+    if args.cascade:
+        print(f"Каскад: моделі передано {checker.routed_rows} з {checker.rows} рядків.")
+
+
+def _sweep(args):
+    """
+    Підкоманда sweep: паралельна генерація сценаріїв (аргументи передаються ScenarioSweep).
+    """
+    from ScenarioSweep import main
+    main(args.arguments)
+
+
+def _sensors(text):
+    """
+    Розбирає список позицій сенсорів, розділених комами.
+    """
+    return [int(value) for value in text.split(",") if value.strip()]
+
+
+def _serve(args):
+    """
+    Підкоманда serve: сервер телеметрії з потоковою оцінкою моделлю.
+    """
+    import asyncio
+    from TelemetryServer import RowAssembler, TelemetryServer
+    checker = _checker(args, compiled=True)
+    columns = RowAssembler(args.sensors).columns
+    server = TelemetryServer(checker.scorer(columns=columns), args.sensors, host=args.host, port=args.port,
+                             udp_port=args.udp_port, max_wait=args.max_wait, batch_size=args.batch_size,
+                             queue_size=args.queue_size)
+    try:
+        stats = asyncio.run(server.run(duration=args.duration))
+        print(f"Сервер зупинено: оцінено {stats['rows']} рядків, аномалій {stats['anomalies']}.")
+    except KeyboardInterrupt:
+        print("Сервер зупинено користувачем.")
+
+
+def _replay(args):
+    """
+    Підкоманда replay: відтворення файлу симуляції як потоку показів сенсорів.
+    """
+    import asyncio
+    from TelemetryServer import replay
+    asyncio.run(replay(args.data, host=args.host, port=args.port, speed=args.speed,
+                       protocol=args.protocol, encoding=args.encoding, rate=args.rate))
+
+
+def _load_test(args):
+    """
+    Підкоманда loadtest: сервер і відтворення в одному процесі для вимірювання пропускної здатності й затримки.
+    """
+    import asyncio
+    from TelemetryServer import load_test
+    checker = _checker(args, compiled=True)
+    result = asyncio.run(load_test(args.data, checker, speed=args.speed, protocol=args.protocol,
+                                   encoding=args.encoding, rate=args.rate, max_wait=args.max_wait,
+                                   batch_size=args.batch_size, queue_size=args.queue_size))
+    if not result["reliable"]:
+        sys.exit(1)
+
+
+def build_parser():
+    """
+    Будує парсер аргументів командного рядка.
+
+    Returns:
+    argparse.ArgumentParser: Парсер із підкомандами simulate, train, check, sweep, serve, replay і loadtest.
+    """
+    parser = argparse.ArgumentParser(description="Моделювання трубопроводу та виявлення аномалій.")
+    parser.add_argument("--headless", action="store_true",
+                        help="Не відкривати вікон: графіки зберігаються у файли PNG.")
+    parser.add_argument("--figure-dir", default="Data/Figures", help="Каталог для графіків у режимі --headless.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    simulate = subparsers.add_parser("simulate", help="Симуляція аварій і збереження даних.")
+    simulate.add_argument("--time-steps", type=int, default=100, help="Кількість часових кроків.")
+    simulate.add_argument("--events", type=int, default=5, help="Кількість аварій.")
+    simulate.add_argument("--seed", type=int, default=None, help="Зерно симуляції.")
+    simulate.add_argument("--cache-dir", default=None, help="Каталог кешу симуляцій (лише разом із --seed).")
+    simulate.add_argument("--no-plot", action="store_true", help="Не будувати графіки.")
+    simulate.set_defaults(handler=_simulate)
+
+    # Аргументи train і sweep розбирають відповідні модулі (див. --help підкоманди)
+    train = subparsers.add_parser("train", add_help=False, help="Навчання моделі (див. ModelTraining.py).")
+    train.set_defaults(handler=_train, forward=True)
+
+    check = subparsers.add_parser("check", help="Перевірка даних на аномалії.")
+    check.add_argument("data", nargs="?", default="Data/Pipeline_Event_Simulation.csv", help="Файл даних.")
+    check.add_argument("--model", default="Data/Anomaly_Detection_Model.pkl",
+                       help="Модель (.pkl) або каталог скомпільованої моделі.")
+    check.add_argument("--no-evaluate", action="store_true", help="Лише прогноз, без звіту за стовпцем Anomaly.")
+    check.add_argument("--no-plot", action="store_true", help="Не будувати матрицю плутанини.")
+    check.add_argument("--cascade", action="store_true",
+                       help="Передавати моделі лише рядки, позначені детектором змін (CUSUM/EWMA).")
+    check.set_defaults(handler=_check)
+
+    sweep = subparsers.add_parser("sweep", add_help=False, help="Генерація сценаріїв (див. ScenarioSweep.py).")
+    sweep.set_defaults(handler=_sweep, forward=True)
+
+    def stream_options(command):
+        # Параметри сервера, спільні для serve і loadtest
+        command.add_argument("--max-wait", type=float, default=0.05, help="Очікування сенсорів, що запізнюються (с).")
+        command.add_argument("--batch-size", type=int, default=256, help="Найбільший пакет рядків для оцінки.")
+        command.add_argument("--queue-size", type=int, default=256, help="Місткість черг між етапами.")
+        command.add_argument("--cascade", action="store_true",
+                             help="Передавати моделі лише рядки, позначені детектором змін (CUSUM/EWMA).")
+
+    def replay_options(command):
+        command.add_argument("--speed", type=float, default=None,
+                             help="Прискорення відносно реального часу (1–1000); без параметра — без пауз.")
+        command.add_argument("--rate", type=float, default=None,
+                             help="Найбільша швидкість відправлення (рядків/с); для UDP без --speed — 2000.")
+        command.add_argument("--protocol", choices=("tcp", "udp"), default="tcp",
+                             help="Транспорт. UDP не має зворотного тиску: надлишок датаграм губиться.")
+        command.add_argument("--encoding", choices=("binary", "json"), default="binary", help="Формат показів.")
+
+    serve = subparsers.add_parser("serve", help="Сервер телеметрії з потоковою оцінкою.")
+    serve.add_argument("--model", default="Data/Anomaly_Detection_Model.pkl",
+                       help="Модель (.pkl; оцінюється скомпільована копія) або каталог скомпільованої моделі.")
+    serve.add_argument("--sensors", type=_sensors, default=[0, 100_000, 250_000, 300_000],
+                       help="Позиції сенсорів через кому.")
+    serve.add_argument("--host", default="127.0.0.1", help="Адреса для прослуховування.")
+    serve.add_argument("--port", type=int, default=9900, help="Порт TCP.")
+    serve.add_argument("--udp-port", type=int, default=None, help="Порт UDP (без параметра — лише TCP).")
+    serve.add_argument("--duration", type=float, default=None, help="Тривалість роботи (с).")
+    stream_options(serve)
+    serve.set_defaults(handler=_serve)
+
+    replay = subparsers.add_parser("replay", help="Відтворення файлу симуляції на сервер телеметрії.")
+    replay.add_argument("data", nargs="?", default="Data/Pipeline_Event_Simulation.csv", help="Файл даних.")
+    replay.add_argument("--host", default="127.0.0.1", help="Адреса сервера.")
+    replay.add_argument("--port", type=int, default=9900, help="Порт сервера.")
+    replay_options(replay)
+    replay.set_defaults(handler=_replay)
+
+    load = subparsers.add_parser("loadtest", help="Навантажувальний тест сервера телеметрії на одній машині.")
+    load.add_argument("data", nargs="?", default="Data/Pipeline_Event_Simulation.csv", help="Файл даних.")
+    load.add_argument("--model", default="Data/Anomaly_Detection_Model.pkl",
+                      help="Модель (.pkl; оцінюється скомпільована копія) або каталог скомпільованої моделі.")
+    replay_options(load)
+    stream_options(load)
+    load.set_defaults(handler=_load_test)
+    return parser
+
+
+def main(argv=None):
+    """
+    Точка входу командного рядка.
+    """
+    parser = build_parser()
+    args, arguments = parser.parse_known_args(argv)
+    if getattr(args, "forward", False):
+        args.arguments = arguments  # Решту аргументів розбирає модуль підкоманди
+    elif arguments:
+        parser.error(f"невідомі аргументи: {' '.join(arguments)}")
+    if args.headless:
+        from Visualization import set_headless
+        set_headless(True, args.figure_dir)
+    args.handler(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())